@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Company, Test, Question, Option, Session, Snapshot, ProctorEvent, HRUser, GeneratedQuestion
+from .models import Company, Test, Question, Option, Session, Snapshot, ProctorEvent, HRUser, GeneratedQuestion, ExamBundle, Answer, QuestionStat, GenerationCacheEntry, GenerationJob
 
 # Register your models here.
 admin.site.register(Company)
@@ -11,3 +11,8 @@ admin.site.register(Snapshot)
 admin.site.register(ProctorEvent)
 admin.site.register(HRUser)
 admin.site.register(GeneratedQuestion)
+admin.site.register(ExamBundle)
+admin.site.register(Answer)
+admin.site.register(QuestionStat)
+admin.site.register(GenerationCacheEntry)
+admin.site.register(GenerationJob)
@@ -3,8 +3,17 @@ AI Question Generation Service
 Uses OpenAI API to generate questions based on topics
 """
 import os
-import json
-from typing import List, Dict
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+from . import generation_cache
+from .json_stream import ArrayItemParser
 
 # Try to import OpenAI (install with: pip install openai)
 try:
@@ -15,12 +24,30 @@ except ImportError:
     print("OpenAI library not installed. Using mock questions. Install with: pip install openai")
 
 # Initialize OpenAI client
-# Set OPENAI_API_KEY in environment variables or settings
+# Set OPENAI_API_KEY in environment variables or settings.
+# OPENAI_BASE_URL points the client at any OpenAI-compatible server (e.g. a local fake for testing).
 if OPENAI_AVAILABLE:
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY', ''))
+    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY', ''), base_url=os.getenv('OPENAI_BASE_URL') or None)
+
+DEFAULTS = {
+    "MODEL": "gpt-3.5-turbo",  # or "gpt-4" for better quality
+    "CHUNK_SIZE": 10,  # questions per completion request
+    "MAX_WORKERS": 4,  # concurrent requests
+    "TIMEOUT": 60,  # seconds per request
+    "RETRIES": 2,  # extra attempts per chunk
+    "ROUNDS": 2,  # passes made to top up questions lost to failures or duplicates
+    "STREAM": True,  # parse questions from the token stream as they arrive
+}
+
+SYSTEM_PROMPT = "You are an expert technical interviewer. Generate realistic, practical interview questions."
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "AI_GENERATION", {})}
 
 
-def generate_questions(topic: str, count: int = 50, difficulty: str = "medium") -> List[Dict]:
+def generate_questions(topic: str, count: int = 50, difficulty: str = "medium", client=None,
+                       fresh: bool = False) -> List[Dict]:
     """
     Generate questions using OpenAI API
     
@@ -28,19 +55,236 @@ def generate_questions(topic: str, count: int = 50, difficulty: str = "medium")
         topic: Programming language or technology (e.g., "Python", "Java")
         count: Number of questions to generate (default: 50)
         difficulty: Difficulty level (easy, medium, hard)
+        client: OpenAI-compatible client to use instead of the module default
+        fresh: Skip the generation cache and always call the API
     
     Returns:
         List of question dictionaries
     """
-    
+    return list(iter_questions(topic, count, difficulty, client=client, fresh=fresh))
+
+
+def iter_questions(topic: str, count: int = 50, difficulty: str = "medium", client=None,
+                   stats: Optional[Dict] = None, fresh: bool = False,
+                   on_attempt: Optional[Callable[[], None]] = None) -> Iterator[Dict]:
+    """
+    Yield generated questions as soon as each one is parsed.
+
+    The request is split into CHUNK_SIZE pieces sent concurrently, each with
+    its own timeout and retries.  Completions are streamed and every array
+    element is validated and yielded when its closing brace arrives; invalid
+    elements are dropped without affecting the rest of the chunk.  Questions are de-duplicated on normalized
+    text; if failures or duplicates leave a shortfall, up to ROUNDS passes are
+    made to top it up.  Mock questions are only used when the API is not
+    configured or no chunk succeeded at all.  Closing the generator early
+    cancels the chunks not yet sent and stops retries; requests already in
+    flight finish on their own.  If stats is given it is filled
+    with counters and the wall-clock time.  on_attempt, if given, is called on
+    the caller's thread each time a chunk request starts, retries included.
+
+    Complete API results are stored in the generation cache and served from
+    it on the next identical request unless fresh is set.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"requested": count, "generated": 0, "chunks": 0, "failed_chunks": 0,
+                  "retries": 0, "duplicates": 0, "invalid": 0, "first_question_ms": None,
+                  "wall_time_ms": 0, "source": "openai"})
+    started = time.perf_counter()
+
     # If no API key or OpenAI not available, return mock questions for development
-    api_key = os.getenv('OPENAI_API_KEY', '')
-    if not OPENAI_AVAILABLE or not api_key:
-        return _generate_mock_questions(topic, count, difficulty)
-    
+    if client is None:
+        if not OPENAI_AVAILABLE or not os.getenv('OPENAI_API_KEY', ''):
+            questions = _generate_mock_questions(topic, count, difficulty)
+            stats.update({"source": "mock", "generated": len(questions)})
+            yield from questions
+            stats["wall_time_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return
+        client = globals()["client"]
+
+    config = _config()
+    use_cache = generation_cache.enabled()
+    if use_cache:
+        cache_key = generation_cache.cache_key(topic, count, difficulty, config["MODEL"])
+        cached = None if fresh else generation_cache.get(cache_key)
+        stats["cache"] = "bypass" if fresh else ("hit" if cached is not None else "miss")
+        if cached is not None:
+            stats.update({"source": "cache", "generated": len(cached)})
+            yield from cached
+            stats["wall_time_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return
+
+    stats_lock = threading.Lock()
+    stop = threading.Event()
+    seen = set()
+    produced = []
+    pool = ThreadPoolExecutor(max_workers=config["MAX_WORKERS"], thread_name_prefix="ai-generate")
     try:
-        # Create prompt for OpenAI
-        prompt = f"""Generate {count} high-quality interview questions about {topic} programming language/technology.
+        for round_no in range(config["ROUNDS"]):
+            remaining = count - len(produced)
+            if remaining <= 0:
+                break
+            sizes = [min(config["CHUNK_SIZE"], remaining - i) for i in range(0, remaining, config["CHUNK_SIZE"])]
+            results = queue.Queue()
+            for i, size in enumerate(sizes):
+                pool.submit(_run_chunk, client, config, topic, size, difficulty, stats["chunks"] + i,
+                            stats, stats_lock, stop, results.put)
+            stats["chunks"] += len(sizes)
+
+            # Workers put ("attempt", None) as each request starts, ("question", q) as each
+            # object is parsed and ("done", error) when they finish
+            pending = len(sizes)
+            while pending:
+                kind, value = results.get()
+                if kind == "attempt":
+                    if on_attempt is not None:
+                        on_attempt()
+                    continue
+                if kind == "done":
+                    pending -= 1
+                    if value is not None:
+                        stats["failed_chunks"] += 1
+                        print(f"Error generating questions with OpenAI: {value}")
+                    continue
+                key = _normalize(value["question_text"])
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                if len(produced) >= count:
+                    continue
+                seen.add(key)
+                produced.append(value)
+                if len(produced) == 1:
+                    stats["first_question_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                yield value
+            if stats["failed_chunks"] == stats["chunks"]:
+                break  # nothing is getting through; don't keep hammering the API
+    finally:
+        # If the caller stopped early: drop the chunks not yet sent, and let running
+        # workers abandon their streams and retries without waiting for them
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    stats["generated"] = len(produced)
+    if use_cache and len(produced) == count:
+        generation_cache.put(cache_key, topic, count, difficulty, config["MODEL"], produced)
+    if not produced:
+        # Fallback to mock questions
+        questions = _generate_mock_questions(topic, count, difficulty)
+        stats.update({"source": "mock", "generated": len(questions)})
+        yield from questions
+    stats["wall_time_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _run_chunk(client, config, topic, count, difficulty, index, stats, stats_lock, stop, put):
+    """
+    Request one chunk of questions and put() each valid one as soon as it is parsed.
+
+    On an error the chunk is retried with backoff, asking only for the
+    questions it has not delivered yet, so partial output is never lost.
+    """
+    delivered = 0
+    error = None
+    for attempt in range(config["RETRIES"] + 1):
+        if stop.is_set():
+            break
+        try:
+            put(("attempt", None))
+            prompt = _build_prompt(topic, count - delivered, difficulty, index)
+            for question in _request_questions(client, config, prompt, count - delivered, stats, stats_lock):
+                if stop.is_set():
+                    break
+                put(("question", question))
+                delivered += 1
+                if delivered >= count:
+                    break
+            error = None
+            break
+        except Exception as e:
+            error = e
+            if attempt == config["RETRIES"] or stop.is_set():
+                break
+            with stats_lock:
+                stats["retries"] += 1
+            if stop.wait(0.5 * 2 ** attempt):
+                break
+    put(("done", error if not delivered else None))
+
+
+def _request_questions(client, config, prompt, count, stats, stats_lock):
+    """Yield validated questions from one completion, incrementally when STREAM is on."""
+    parser = ArrayItemParser()
+    response = client.chat.completions.create(
+        model=config["MODEL"],
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=min(4000, 300 * count + 200),
+        timeout=config["TIMEOUT"],
+        stream=config["STREAM"],
+    )
+    if config["STREAM"]:
+        pieces = (chunk.choices[0].delta.content for chunk in response if chunk.choices)
+    else:
+        pieces = [response.choices[0].message.content]
+
+    invalid = 0
+    try:
+        for piece in pieces:
+            if not piece:
+                continue
+            for item in parser.feed(piece):
+                question = validate_question(item)
+                if question is None:
+                    invalid += 1
+                else:
+                    yield question
+    finally:
+        with stats_lock:
+            stats["invalid"] += invalid + parser.errors
+
+
+def validate_question(item) -> Optional[Dict]:
+    """
+    Check a parsed object against the question schema and return it in
+    normalized form, or None if it is unusable.  MCQs need at least two
+    options with exactly one correct; subjective questions need an answer.
+    """
+    if not isinstance(item, dict):
+        return None
+    text = item.get("question_text")
+    if not isinstance(text, str) or not text.strip():
+        return None
+    qtype = item.get("type") or ("mcq" if item.get("options") else "subjective")
+    difficulty = item.get("difficulty")
+    question = {
+        "question_text": text.strip(),
+        "type": qtype,
+        "difficulty": difficulty if difficulty in ("easy", "medium", "hard") else "medium",
+    }
+
+    if qtype == "mcq":
+        options = item.get("options")
+        if not isinstance(options, list) or len(options) < 2:
+            return None
+        if not all(isinstance(o, dict) and isinstance(o.get("text"), str) for o in options):
+            return None
+        if sum(o.get("is_correct") is True for o in options) != 1:
+            return None
+        question["options"] = [{"text": o["text"], "is_correct": o.get("is_correct") is True} for o in options]
+    elif qtype == "subjective":
+        answer = item.get("correct_answer")
+        if not isinstance(answer, str) or not answer.strip():
+            return None
+        question["correct_answer"] = answer
+    else:
+        return None
+    return question
+
+
+def _build_prompt(topic, count, difficulty, index):
+    return f"""Generate {count} high-quality interview questions about {topic} programming language/technology.
         
 Requirements:
 - Mix of Multiple Choice Questions (MCQ) and Subjective questions
@@ -49,6 +293,7 @@ Requirements:
 - For MCQ: Provide 4 options with exactly one correct answer
 - For Subjective: Provide a clear, concise answer
 - Questions should test practical knowledge, not just theory
+- This is batch {index + 1} of a larger set: vary the sub-topics so batches don't overlap
 
 Format the response as a JSON array where each question has:
 {{
@@ -61,40 +306,10 @@ Format the response as a JSON array where each question has:
 
 Return ONLY valid JSON, no additional text."""
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",  # or "gpt-4" for better quality
-            messages=[
-                {"role": "system", "content": "You are an expert technical interviewer. Generate realistic, practical interview questions."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4000
-        )
-        
-        # Parse response
-        content = response.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        questions = json.loads(content)
-        
-        # Ensure we have exactly the requested count
-        if isinstance(questions, list):
-            return questions[:count]
-        else:
-            return [questions] if questions else []
-            
-    except Exception as e:
-        print(f"Error generating questions with OpenAI: {e}")
-        # Fallback to mock questions
-        return _generate_mock_questions(topic, count, difficulty)
+
+def _normalize(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form used for de-duplication."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
 
 
 def _generate_mock_questions(topic: str, count: int, difficulty: str) -> List[Dict]:
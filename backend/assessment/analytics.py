@@ -0,0 +1,69 @@
+"""
+Database-side aggregation for the HR analytics endpoints.
+
+Everything here is computed with aggregate()/annotate() so the number of
+queries does not depend on how many sessions (or tests) exist.
+"""
+from django.db.models import Avg, Count, Q
+
+from .models import Test, Question, Session
+
+SCORE_BUCKETS = [
+    ("90-100", Q(score_mcq__gte=90, score_mcq__lte=100)),
+    ("80-89", Q(score_mcq__gte=80, score_mcq__lt=90)),
+    ("70-79", Q(score_mcq__gte=70, score_mcq__lt=80)),
+    ("60-69", Q(score_mcq__gte=60, score_mcq__lt=70)),
+    ("0-59", Q(score_mcq__gte=0, score_mcq__lt=60)),
+]
+
+
+def _session_totals():
+    return {
+        "total_attempts": Count("pk"),
+        "completed": Count("pk", filter=Q(ended__isnull=False)),
+        # submitted, MCQ-scored, subjective answers still queued (see grading_queue.py)
+        "grading_pending": Count("pk", filter=Q(grading_status__in=["pending", "grading"])),
+        "average_score": Avg("score_mcq"),
+    }
+
+
+def test_summary(test):
+    """Attempt counts, average MCQ score and score distribution for one test (one query)."""
+    totals = Session.objects.filter(test=test).aggregate(
+        **_session_totals(),
+        **{f"bucket_{label}": Count("pk", filter=condition) for label, condition in SCORE_BUCKETS},
+    )
+    return {
+        "total_attempts": totals["total_attempts"],
+        "completed": totals["completed"],
+        "in_progress": totals["total_attempts"] - totals["completed"],
+        "grading_pending": totals["grading_pending"],
+        "average_score": round(totals["average_score"] or 0, 2),
+        "score_distribution": {label: totals[f"bucket_{label}"] for label, _ in SCORE_BUCKETS},
+    }
+
+
+def all_tests_summary():
+    """Per-test attempt counts, averages and question counts (three grouped queries)."""
+    session_stats = {
+        row["test_id"]: row
+        for row in Session.objects.order_by().values("test_id").annotate(**_session_totals())
+    }
+    question_counts = dict(
+        Question.objects.order_by().values("test_id").annotate(n=Count("pk")).values_list("test_id", "n")
+    )
+
+    analytics = []
+    for test in Test.objects.select_related("company").order_by("pk"):
+        stats = session_stats.get(test.pk, {})
+        analytics.append({
+            "test_id": test.test_id,
+            "test_title": test.title,
+            "company": test.company.name,
+            "total_attempts": stats.get("total_attempts", 0),
+            "completed": stats.get("completed", 0),
+            "grading_pending": stats.get("grading_pending", 0),
+            "average_score": round(stats.get("average_score") or 0, 2),
+            "question_count": question_counts.get(test.pk, 0),
+        })
+    return analytics
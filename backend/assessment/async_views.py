@@ -0,0 +1,158 @@
+"""
+Native async versions of the candidate endpoints that a cohort hits hardest:
+start session, log event(s), snapshot upload and submit.
+
+Served by an ASGI server (see exam_backend/asgi.py), each of these holds no
+thread while it waits: session lookups and event writes go through the async
+ORM, and a buffered event is queued without blocking the event loop.  The
+work that has to be synchronous runs in a worker thread: a submit's grading
+and write transaction (the async ORM has no transactions) and snapshot
+decoding, re-encoding and file storage (CPU-bound and file I/O).
+
+They take the same JSON (or multipart) bodies and return the same responses
+as their DRF counterparts in views.py.  exam_backend/asgi_urls.py routes the
+ASGI process to them (see ASYNC_SERVING.md).
+
+Sync work that touches the ORM runs thread-sensitive, on the request's own
+worker thread, so its connection is closed when the request finishes.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from PIL import Image
+
+from . import ingest, session_cache, snapshots
+from .models import ProctorEvent, Session, Test
+from .views import EVENT_TYPE_ERROR, MAX_EVENT_BATCH, _build_events, submit_answers, valid_event_type
+
+
+def _error(message, status, headers=None):
+    return JsonResponse({"error": message}, status=status, headers=headers)
+
+
+def _session_not_found():
+    return _error("Session not found", 404)
+
+
+def _payload(request):
+    """The request's JSON body (or form fields). Raises ValueError for a malformed body."""
+    if request.content_type == "application/json":
+        data = json.loads(request.body or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        return data
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+async def start_session(request):
+    try:
+        data = _payload(request)
+    except ValueError:
+        return _error("Malformed request body", 400)
+    try:
+        test = await Test.objects.aget(test_id=data.get("test_id"))
+    except Test.DoesNotExist:
+        return _error("Test not found", 404)
+    session = await Session.objects.acreate(test=test, username=data.get("username"))
+    session_cache.remember(session)
+    return JsonResponse({"session_id": str(session.session_id)})
+
+
+@csrf_exempt
+@require_POST
+async def submit_test(request):
+    try:
+        data = _payload(request)
+    except ValueError:
+        return _error("Malformed request body", 400)
+    try:
+        session = await session_cache.alookup(data.get("session_id"))
+    except Session.DoesNotExist:
+        return _session_not_found()
+    if session.ended:
+        return _error("Session already submitted", 409)
+
+    result = await sync_to_async(submit_answers)(session, data.get("answers"))
+    if result is None:
+        return _error("Session already submitted", 409)
+    return JsonResponse(result)
+
+
+@csrf_exempt
+@require_POST
+async def log_event(request):
+    try:
+        data = _payload(request)
+    except ValueError:
+        return _error("Malformed request body", 400)
+    event_type = data.get("event")
+    if not valid_event_type(event_type):
+        return _error(EVENT_TYPE_ERROR, 400)
+    try:
+        session = await session_cache.alookup(data.get("session_id"))
+    except Session.DoesNotExist:
+        return _session_not_found()
+
+    if not ingest.enabled():
+        await ProctorEvent.objects.acreate(session_id=session.pk, event_type=event_type)
+        return JsonResponse({"status": "ok"})
+
+    if not ingest.get_buffer().submit(session.pk, event_type, timeout=0):
+        return _error("Event queue full, retry shortly", 503, headers={"Retry-After": "1"})
+    return JsonResponse({"status": "queued"}, status=202)
+
+
+@csrf_exempt
+@require_POST
+async def log_events_batch(request):
+    try:
+        data = _payload(request)
+    except ValueError:
+        return _error("Malformed request body", 400)
+    records = data.get("events")
+    if not isinstance(records, list) or not records:
+        return _error("events must be a non-empty list", 400)
+    if len(records) > MAX_EVENT_BATCH:
+        return _error(f"Maximum {MAX_EVENT_BATCH} events per batch", 400)
+    try:
+        session = await session_cache.alookup(data.get("session_id"))
+    except Session.DoesNotExist:
+        return _session_not_found()
+
+    events, results = _build_events(session.pk, records)
+    await ProctorEvent.objects.abulk_create(events)
+    return JsonResponse({
+        "accepted": len(events),
+        "rejected": len(records) - len(events),
+        "results": results
+    })
+
+
+def _parse_multipart(request):
+    return request.POST, request.FILES
+
+
+@csrf_exempt
+@require_POST
+async def upload_snapshot(request):
+    # parsing the multipart body, decoding and storage all block; keep them off the event loop
+    post, files = await sync_to_async(_parse_multipart)(request)
+    upload = files.get("image")
+    if upload is None:
+        return _error("image is required", 400)
+    try:
+        info = await session_cache.alookup(post.get("session_id"))
+    except Session.DoesNotExist:
+        return _session_not_found()
+    # Unsaved stand-in carrying just the fields snapshot storage needs
+    session = Session(pk=info.pk, session_id=info.session_id, test_id=info.test_pk, username=info.username)
+    try:
+        snapshot = await sync_to_async(snapshots.store)(session, upload)
+    except (OSError, Image.DecompressionBombError):  # not an image, truncated, or a decompression bomb
+        return _error("image is not a valid picture", 400)
+    return JsonResponse({"status": "ok", "stored": snapshot is not None})
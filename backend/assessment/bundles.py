@@ -0,0 +1,76 @@
+"""
+Published exam bundles.
+
+A bundle is the candidate-facing JSON for one Test (no is_correct flags),
+rendered once and stored gzip-compressed in the ExamBundle table.  get_test
+serves the stored bytes as-is.  Any change to the test, its questions or
+their options deletes the bundle on commit; it is rebuilt on the next
+request, or eagerly by callers that publish questions.
+
+A build that read the rows before an edit committed can still store its
+bundle after that delete, so each bundle also records the test's
+content_version it was rendered from, which the same edit replaces, and
+get() only serves a bundle whose version is still current.
+"""
+import gzip
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from .models import Test, Question, ExamBundle
+from .serializers import CandidateTestSerializer
+
+
+def build(test):
+    """Render, compress and store the bundle for a Test instance."""
+    # content_version comes with the Test row, before the questions are read, so it never runs ahead of them
+    test = Test.objects.prefetch_related(
+        Prefetch("questions", queryset=Question.objects.prefetch_related("options"))
+    ).get(pk=test.pk)
+    body = JSONRenderer().render(CandidateTestSerializer(test).data)
+    bundle, _ = ExamBundle.objects.update_or_create(
+        test=test,
+        defaults={
+            "payload": gzip.compress(body, compresslevel=9),
+            "raw_size": len(body),
+            "etag": '"%s"' % hashlib.sha1(body).hexdigest(),
+            "content_version": test.content_version,
+        },
+    )
+    return bundle
+
+
+def get(test_id):
+    """
+    Return (gzip_payload, etag) for the public test_id, building the bundle
+    on first use or when it is out of date. Raises Test.DoesNotExist for
+    unknown tests.
+    """
+    rows = ExamBundle.objects.filter(
+        test__test_id=test_id, content_version=F("test__content_version")
+    ).values_list("payload", "etag")
+    row = rows.first()
+    if row is not None:
+        return bytes(row[0]), row[1]
+    test = Test.objects.get(test_id=test_id)
+    try:
+        bundle = build(test)
+    except IntegrityError:
+        # another request built the first bundle at the same time; serve theirs
+        row = rows.first()
+        if row is None:
+            raise
+        return bytes(row[0]), row[1]
+    return bytes(bundle.payload), bundle.etag
+
+
+def mark_stale(test_pk=None):
+    """Drop the bundle for test_pk (or all bundles when None) on commit."""
+    def drop():
+        bundles = ExamBundle.objects.all()
+        if test_pk is not None:
+            bundles = bundles.filter(test_id=test_pk)
+        bundles.delete()
+    transaction.on_commit(drop)
@@ -0,0 +1,78 @@
+"""
+Catalog read path for the company/test listing endpoints.
+
+The whole Company -> Test -> Question -> Option tree is loaded with a fixed
+number of queries (one per level) and the rendered JSON is kept in an
+in-process cache.  The listings are public, so they are rendered with the
+candidate serializers and never carry is_correct.  The cache is versioned:
+any save/delete of a catalog model bumps the version (see signals.py) and
+the next request rebuilds the body.
+"""
+import hashlib
+import threading
+
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from .models import Company, Test, Question
+
+_lock = threading.Lock()
+_version = 0
+_cache = {}  # name -> (version, body, etag)
+
+
+def invalidate():
+    """Drop every cached catalog body. Called from model signals."""
+    global _version
+    with _lock:
+        _version += 1
+        _cache.clear()
+
+
+def version():
+    return _version
+
+
+def _test_queryset():
+    return Test.objects.prefetch_related(
+        Prefetch("questions", queryset=Question.objects.prefetch_related("options"))
+    )
+
+
+def _build_companies():
+    from .serializers import CandidateCompanySerializer
+    companies = Company.objects.prefetch_related(Prefetch("tests", queryset=_test_queryset()))
+    return CandidateCompanySerializer(companies, many=True).data
+
+
+def _build_tests():
+    from .serializers import CandidateTestSerializer
+    return CandidateTestSerializer(_test_queryset(), many=True).data
+
+
+_BUILDERS = {
+    "companies": _build_companies,
+    "tests": _build_tests,
+}
+
+
+def get(name):
+    """
+    Return (body, etag) for a catalog listing, building it if needed.
+
+    The ETag is a hash of the body, so it is stable across processes and
+    restarts as long as the catalog content does not change.
+    """
+    entry = _cache.get(name)
+    if entry and entry[0] == _version:
+        return entry[1], entry[2]
+
+    with _lock:
+        entry = _cache.get(name)
+        if entry and entry[0] == _version:
+            return entry[1], entry[2]
+        built_at = _version
+        body = JSONRenderer().render(_BUILDERS[name]())
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        _cache[name] = (built_at, body, etag)
+        return body, etag
@@ -0,0 +1,116 @@
+"""
+Persistent cache of AI-generated question sets.
+
+A set is stored under the sha256 of its prompt parameters (topic,
+difficulty, count) and the model name, so asking for "Python / medium / 50"
+again is a single indexed SELECT instead of an LLM round trip.  Entries
+expire after TTL seconds; when there are more than MAX_ENTRIES the least
+recently used ones are deleted.  Callers pass fresh=True to ai_service to
+skip the lookup (the new result still replaces the cached one).
+
+A hit returns questions that were already saved to the pool when the set
+was generated, so callers look those rows up with saved_questions() and
+hand them back rather than inserting copies (which the near-duplicate check
+would flag).
+"""
+import hashlib
+import json
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GeneratedQuestion, GenerationCacheEntry
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TTL": 7 * 24 * 3600,  # seconds
+    "MAX_ENTRIES": 500,
+}
+
+_lock = threading.Lock()
+counters = {"hits": 0, "misses": 0, "stores": 0, "expirations": 0, "evictions": 0}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "GENERATION_CACHE", {})}
+
+
+def _count(name, n=1):
+    with _lock:
+        counters[name] += n
+
+
+def enabled():
+    return _config()["ENABLED"]
+
+
+def cache_key(topic, count, difficulty, model):
+    params = {"topic": topic.strip().lower(), "count": count, "difficulty": difficulty.strip().lower(), "model": model}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def get(key):
+    """Cached questions for key, or None on a miss or an expired entry."""
+    entry = GenerationCacheEntry.objects.filter(key=key).only("pk", "questions", "created_at").first()
+    if entry is None:
+        _count("misses")
+        return None
+    if entry.created_at < timezone.now() - timedelta(seconds=_config()["TTL"]):
+        GenerationCacheEntry.objects.filter(pk=entry.pk).delete()
+        _count("expirations")
+        _count("misses")
+        return None
+    GenerationCacheEntry.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    _count("hits")
+    return entry.questions
+
+
+def saved_questions(topic, texts):
+    """
+    Pool rows (unselected GeneratedQuestions) for these question texts under
+    topic, keyed by text.  Where a text was saved more than once, the
+    original (not itself a duplicate, oldest) wins.
+    """
+    found = {}
+    for question in (
+        GeneratedQuestion.objects.filter(topic=topic, question_text__in=set(texts), is_selected=False).order_by("pk")
+    ):
+        current = found.get(question.question_text)
+        if current is None or (current.duplicate_of_id is not None and question.duplicate_of_id is None):
+            found[question.question_text] = question
+    return found
+
+
+def put(key, topic, count, difficulty, model, questions):
+    GenerationCacheEntry.objects.update_or_create(key=key, defaults={
+        "topic": topic, "count": count, "difficulty": difficulty, "model": model,
+        "questions": questions, "created_at": timezone.now(), "last_used_at": timezone.now(),
+    })
+    _count("stores")
+    _evict()
+
+
+def _evict():
+    limit = _config()["MAX_ENTRIES"]
+    stale = list(
+        GenerationCacheEntry.objects.order_by("-last_used_at", "-pk").values_list("pk", flat=True)[limit:]
+    )
+    if stale:
+        GenerationCacheEntry.objects.filter(pk__in=stale).delete()
+        _count("evictions", len(stale))
+
+
+def clear():
+    GenerationCacheEntry.objects.all().delete()
+
+
+def stats():
+    with _lock:
+        snapshot = dict(counters)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+    snapshot["size"] = GenerationCacheEntry.objects.count()
+    return snapshot
@@ -0,0 +1,131 @@
+"""
+Compiled answer keys for grading submissions.
+
+The key for a test is a list of (question_pk, qid, type, correct_option_id)
+tuples in question order, built with two queries and cached in-process until the
+test's questions or options change (see signals.py).  Like catalog.py the cache
+is versioned, so a key built while the test was being edited is not stored.
+Signals only reach the worker that made the edit, so cached keys also expire
+after TTL seconds; that bounds how long other workers can grade against an old
+key.  Grading a submission
+against a cached key is a pure Python pass; subjective answers are scored by
+subjective.py against the questions' reference answers (also cached), either
+here or later in a batch by grading_queue.py.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from . import subjective
+from .models import Question, Option
+
+DEFAULTS = {
+    "TTL": 60,  # seconds a cached answer key is trusted without a signal
+}
+
+GradedItem = namedtuple("GradedItem", ["question_pk", "type", "response", "is_correct", "score"])
+
+_lock = threading.Lock()
+_version = 0
+_keys = {}  # test pk -> (expires at, [(question_pk, qid, type, correct_option_id), ...])
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "ANSWER_KEYS", {})}
+
+
+def answer_key(test_pk):
+    entry = _keys.get(test_pk)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    built_at = _version
+    key = _build(test_pk)
+    with _lock:
+        # an invalidate() since the build started means the key may be stale
+        if _version == built_at:
+            _keys[test_pk] = (time.monotonic() + _config()["TTL"], key)
+    return key
+
+
+def _build(test_pk):
+    correct = {}
+    for question_pk, option_id in (
+        Option.objects.filter(question__test_id=test_pk, is_correct=True)
+        .order_by("pk")
+        .values_list("question_id", "option_id")
+    ):
+        correct.setdefault(question_pk, option_id)
+
+    key = [
+        (question_pk, qid, qtype, correct.get(question_pk))
+        for question_pk, qid, qtype in (
+            Question.objects.filter(test_id=test_pk).order_by("pk").values_list("pk", "qid", "type")
+        )
+    ]
+    return key
+
+
+def invalidate(test_pk=None):
+    global _version
+    with _lock:
+        _version += 1
+        if test_pk is None:
+            _keys.clear()
+        else:
+            _keys.pop(test_pk, None)
+
+
+def grade(key, answers, defer_subjective=False):
+    """
+    Score answers ({qid: answer}) against a compiled key.
+
+    Returns (mcq_percent, subjective_scores, items) with the same scoring
+    semantics the submit endpoint has always had: MCQs without a correct
+    option still count towards the total.  Subjective answers are scored by
+    TF-IDF similarity to the reference answer (questions without one keep
+    the flat baseline).  items holds one GradedItem per question in the key.
+
+    With defer_subjective, subjective answers are left unscored (score None,
+    no entry in subjective_scores) for grading_queue.py to fill in.
+    """
+    answers = answers or {}
+    total_mcq = 0
+    correct_mcq = 0
+    subjective_scores = {}
+    items = []
+    subjective_items = []  # (index in items, question pk, qid, answer)
+
+    for question_pk, qid, qtype, correct_option in key:
+        response = answers.get(qid)
+        if qtype == "mcq":
+            total_mcq += 1
+            is_correct = correct_option is not None and response == correct_option
+            if is_correct:
+                correct_mcq += 1
+            items.append(GradedItem(question_pk, qtype, response, is_correct, 100 if is_correct else 0))
+        elif qtype == "subjective":
+            subjective_items.append((len(items), question_pk, qid, response))
+            items.append(None)
+
+    if subjective_items and defer_subjective:
+        for index, question_pk, qid, response in subjective_items:
+            items[index] = GradedItem(question_pk, "subjective", response, None, None)
+    elif subjective_items:
+        scores = subjective.score_many({pk: [answer if isinstance(answer, str) else ""]
+                                        for _, pk, _, answer in subjective_items})
+        for index, question_pk, qid, response in subjective_items:
+            subjective_scores[qid] = scores[question_pk][0]
+            items[index] = GradedItem(question_pk, "subjective", response, None, subjective_scores[qid])
+
+    percent_mcq = round((correct_mcq / total_mcq) * 100, 2) if total_mcq else 0
+    return percent_mcq, subjective_scores, items
+
+
+def overall_score(percent_mcq, subjective_scores):
+    """Returns (subjective_avg, overall_score) using the 70/30 MCQ/subjective weighting."""
+    sub_scores = [v for v in (subjective_scores or {}).values() if isinstance(v, (int, float))]
+    subjective_avg = sum(sub_scores) / len(sub_scores) if sub_scores else 0
+    return round(subjective_avg, 2), round((percent_mcq or 0) * 0.7 + subjective_avg * 0.3, 2)
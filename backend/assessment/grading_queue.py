@@ -0,0 +1,241 @@
+"""
+Deferred grading of subjective answers.
+
+submit_test scores MCQs straight away and stores the raw answers, leaving the
+session's grading_status "pending" when the test has subjective questions.
+This module grades pending sessions afterwards, in batches: a batch claims up
+to BATCH_SIZE sessions, and every answer to the same question across the
+batch is scored in one subjective.py call, so a cohort submitting together is
+graded as a handful of matrix operations instead of one request at a time.
+Scoring can be spread over a process pool (PROCESSES > 0); references are
+loaded in the parent and the workers never touch the database.
+
+Batches run on a daemon thread that submit wakes after commit and that also
+polls every POLL_INTERVAL seconds, and/or from `manage.py grade_pending`.  A
+claim is a conditional UPDATE stamped with the claim time, and results are
+only written while the claim still holds, so several processes can share
+the queue; claims older than STALE_AFTER seconds are handed back.
+shutdown() stops the thread and the scoring pool.
+"""
+import logging
+import multiprocessing
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import bulk, grading, item_stats, subjective
+from .models import Answer, Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "WORKER": True,  # grade on a thread in this process; False leaves it to `manage.py grade_pending`
+    "BATCH_SIZE": 200,  # sessions graded per batch
+    "PROCESSES": 0,  # scoring worker processes; 0 scores on the grading thread
+    "POLL_INTERVAL": 5.0,  # seconds between looks at the queue when nothing wakes the thread
+    "STALE_AFTER": 300,  # seconds before a claimed batch is assumed abandoned
+}
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_thread = None
+_process_pool = None
+
+counters = {
+    "batches": 0,
+    "graded": 0,
+    "lost_claims": 0,
+    "failed_batches": 0,
+    "recovered": 0,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "DEFERRED_GRADING", {})}
+
+
+def enabled():
+    return _config()["ENABLED"]
+
+
+def pending_count():
+    return Session.objects.filter(grading_status__in=["pending", "grading"]).count()
+
+
+def recover():
+    """Hand sessions from abandoned claims back to the queue. Returns how many."""
+    stale = timezone.now() - timedelta(seconds=_config()["STALE_AFTER"])
+    recovered = Session.objects.filter(grading_status="grading", grading_claimed_at__lt=stale).update(
+        grading_status="pending", grading_claimed_at=None
+    )
+    counters["recovered"] += recovered
+    return recovered
+
+
+def _claim(batch_size):
+    # The claim time doubles as the claim's identity: it is what the results are written against
+    claimed_at = timezone.now()
+    oldest = Session.objects.filter(grading_status="pending").order_by("ended").values("pk")[:batch_size]
+    Session.objects.filter(pk__in=oldest, grading_status="pending").update(
+        grading_status="grading", grading_claimed_at=claimed_at
+    )
+    sessions = list(
+        Session.objects.filter(grading_status="grading", grading_claimed_at=claimed_at)
+        .values_list("pk", "test_id", "score_mcq")
+    )
+    return claimed_at, sessions
+
+
+def _score(answers_by_question, pool):
+    if pool is None:
+        return subjective.score_many(answers_by_question)
+    references = subjective.load(list(answers_by_question))
+    futures = {
+        pk: pool.submit(subjective.score_against, references[pk], answers)
+        for pk, answers in answers_by_question.items()
+    }
+    return {pk: future.result() for pk, future in futures.items()}
+
+
+def grade_batch(batch_size=None, pool=None):
+    """Claim and grade one batch of pending sessions. Returns how many sessions were graded."""
+    claimed_at, sessions = _claim(batch_size or _config()["BATCH_SIZE"])
+    if not sessions:
+        return 0
+
+    session_pks = [pk for pk, _, _ in sessions]
+    keys = {test_pk: grading.answer_key(test_pk) for test_pk in {test_pk for _, test_pk, _ in sessions}}
+    stored = {
+        (session_pk, question_pk): (answer_pk, text)
+        for answer_pk, session_pk, question_pk, text in Answer.objects.filter(
+            session_id__in=session_pks, question__type="subjective"
+        ).values_list("pk", "session_id", "question_id", "text")
+    }
+
+    # every answer to a question across the batch, in session order
+    members = defaultdict(list)  # question pk -> [(session pk, qid)]
+    for session_pk, test_pk, _ in sessions:
+        for question_pk, qid, qtype, _ in keys[test_pk]:
+            if qtype == "subjective":
+                members[question_pk].append((session_pk, qid))
+    scores = _score({
+        question_pk: [stored.get((session_pk, question_pk), (None, ""))[1] for session_pk, _ in entries]
+        for question_pk, entries in members.items()
+    }, pool)
+
+    subjective_scores = defaultdict(dict)  # session pk -> {qid: score}
+    answer_scores = []  # (session pk, answer pk, score) for stored answers
+    for question_pk, entries in members.items():
+        for (session_pk, qid), value in zip(entries, scores[question_pk]):
+            subjective_scores[session_pk][qid] = value
+            answer_pk = stored.get((session_pk, question_pk), (None, None))[0]
+            if answer_pk is not None:
+                answer_scores.append((session_pk, answer_pk, value))
+
+    with transaction.atomic():
+        # a claim handed back by recover() may already belong to someone else
+        still_claimed = set(
+            Session.objects.select_for_update()
+            .filter(pk__in=session_pks, grading_status="grading", grading_claimed_at=claimed_at)
+            .values_list("pk", flat=True)
+        )
+        updates = []
+        for session_pk, _, score_mcq in sessions:
+            if session_pk in still_claimed:
+                subjective_avg, overall_score = grading.overall_score(score_mcq, subjective_scores[session_pk])
+                updates.append((subjective_scores[session_pk], subjective_avg, overall_score, session_pk))
+        bulk.update_rows(Session, ["score_subjective", "subjective_avg", "overall_score"], updates,
+                         grading_status="graded", grading_claimed_at=None)
+        bulk.update_rows(Answer, ["score"], [
+            (value, answer_pk) for session_pk, answer_pk, value in answer_scores if session_pk in still_claimed
+        ])
+        item_stats.record_deferred_scores({
+            question_pk: [value for (session_pk, _), value in zip(entries, scores[question_pk])
+                          if session_pk in still_claimed]
+            for question_pk, entries in members.items()
+        })
+
+    counters["batches"] += 1
+    counters["graded"] += len(updates)
+    counters["lost_claims"] += len(sessions) - len(updates)
+    return len(updates)
+
+
+def grade_pending(batch_size=None, pool=None):
+    """Grade batches until the queue is empty. Returns how many sessions were graded."""
+    recover()
+    graded = 0
+    while True:
+        done = grade_batch(batch_size, pool)
+        if not done and not Session.objects.filter(grading_status="pending").exists():
+            return graded
+        graded += done
+
+
+def process_pool(processes=None):
+    """The shared scoring pool, or None when scoring runs in-process."""
+    global _process_pool
+    processes = _config()["PROCESSES"] if processes is None else processes
+    if processes <= 0:
+        return None
+    with _lock:
+        if _process_pool is None:
+            # spawn rather than fork: the parent has live threads and database connections
+            _process_pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+            )
+    return _process_pool
+
+
+def wake():
+    """Ask the grading thread to look at the queue now (starting it if needed)."""
+    ensure_started()
+    _wake.set()
+
+
+def ensure_started():
+    global _thread
+    if _thread is not None or not _config()["WORKER"]:
+        return
+    with _lock:
+        if _thread is None:
+            _stop.clear()
+            _thread = threading.Thread(target=_run, name="subjective-grader", daemon=True)
+            _thread.start()
+
+
+def _run():
+    while not _stop.is_set():
+        _wake.wait(_config()["POLL_INTERVAL"])
+        _wake.clear()
+        if _stop.is_set():
+            return
+        try:
+            grade_pending(pool=process_pool())
+        except Exception:
+            counters["failed_batches"] += 1
+            logger.exception("Deferred grading failed")
+        finally:
+            close_old_connections()
+
+
+def shutdown():
+    """Stop the grading thread after its current batch, and the scoring pool."""
+    global _thread, _process_pool
+    with _lock:
+        thread, _thread = _thread, None
+        pool, _process_pool = _process_pool, None
+    if thread is not None:
+        _stop.set()
+        _wake.set()
+        thread.join()
+    if pool is not None:
+        pool.shutdown()
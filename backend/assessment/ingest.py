@@ -0,0 +1,257 @@
+"""
+Write-behind ingestion for proctoring events.
+
+log_event enqueues (session pk, event type, received-at) into a bounded
+in-process queue and returns straight away.  A daemon thread drains the queue
+and writes ProctorEvent rows with bulk_create, flushing whenever a batch
+fills up or FLUSH_INTERVAL seconds pass after the first queued event.
+
+When the queue is full, submit() waits briefly and then refuses the event so
+the endpoint can tell the client to back off.  Anything still queued at
+interpreter exit is flushed by an atexit hook, and shutdown() does the same
+on demand (the test runner calls it before dropping the test database).
+
+A batch that hits an OperationalError (a locked or briefly unreachable
+database) is retried WRITE_RETRIES times with backoff and then put back on
+the queue for the next flush.  Any other error means a bad row: the batch is
+split in half and each half written on its own, so the row only costs
+itself.  Callers validate the event type before submit(); the split is the
+backstop.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, close_old_connections, connection
+from django.utils import timezone
+
+from .models import ProctorEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "MAX_QUEUE": 10000,       # events held in memory before backpressure kicks in
+    "BATCH_SIZE": 500,        # rows per bulk_create
+    "FLUSH_INTERVAL": 1.0,    # seconds an event may wait before it is written
+    "PUT_TIMEOUT": 0.05,      # seconds a request waits for room in a full queue
+    "WRITE_RETRIES": 3,       # further attempts at a batch the database refused before it is requeued
+    "RETRY_BACKOFF": 0.1,     # seconds before the first retry, doubling each time
+}
+
+
+class EventBuffer:
+    def __init__(self, max_queue, batch_size, flush_interval, put_timeout, write_retries=3, retry_backoff=0.1):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.write_retries = write_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {
+            "enqueued": 0,
+            "rejected": 0,
+            "written": 0,
+            "failed": 0,
+            "retries": 0,
+            "requeued": 0,
+            "flushes": 0,
+            "flush_ms_total": 0.0,
+            "flush_ms_max": 0.0,
+            "flush_ms_last": 0.0,
+            "queue_high_water": 0,
+        }
+
+    def submit(self, session_pk, event_type, received_at=None, timeout=None):
+        """
+        Queue one event. Returns False if the queue stayed full (backpressure).
+        timeout overrides PUT_TIMEOUT; async callers pass 0 so a full queue never blocks the event loop.
+        """
+        self._ensure_started()
+        item = (session_pk, event_type, received_at or timezone.now())
+        try:
+            self._queue.put(item, timeout=self.put_timeout if timeout is None else timeout)
+        except queue.Full:
+            with self._counter_lock:
+                self.counters["rejected"] += 1
+            return False
+        depth = self._queue.qsize()
+        with self._counter_lock:
+            self.counters["enqueued"] += 1
+            if depth > self.counters["queue_high_water"]:
+                self.counters["queue_high_water"] = depth
+        return True
+
+    def flush(self):
+        """Drain everything queued right now on the calling thread. Returns rows written."""
+        written = 0
+        remaining = self._queue.qsize()  # not what a failed write puts back
+        while remaining > 0:
+            batch = []
+            while len(batch) < min(self.batch_size, remaining):
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            remaining -= len(batch)
+            written += self._write(batch)
+        return written
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["flush_ms_avg"] = stats["flush_ms_total"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="proctor-event-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+                close_old_connections()
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        with self._write_lock:
+            error = self._insert(batch)
+        if error is None:
+            self._count_flush(len(batch), (time.perf_counter() - start) * 1000)
+            return len(batch)
+        if isinstance(error, OperationalError):
+            self._requeue(batch)
+            return 0
+        if len(batch) > 1:
+            half = len(batch) // 2
+            return self._write(batch[:half]) + self._write(batch[half:])
+        logger.error("Dropping proctoring event %r: %s", batch[0], error)
+        with self._counter_lock:
+            self.counters["failed"] += 1
+        return 0
+
+    def _insert(self, batch):
+        """bulk_create the batch, retrying OperationalErrors with backoff. Returns None, or the error."""
+        delay = self.retry_backoff
+        error = None
+        for attempt in range(self.write_retries + 1):
+            if attempt:
+                with self._counter_lock:
+                    self.counters["retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+                if not connection.in_atomic_block:
+                    close_old_connections()  # reconnect if the failure broke the connection
+            try:
+                ProctorEvent.objects.bulk_create([
+                    ProctorEvent(session_id=session_pk, event_type=event_type, timestamp=received_at)
+                    for session_pk, event_type, received_at in batch
+                ])
+                return None
+            except OperationalError as e:
+                logger.warning("Failed to write %d proctoring events (attempt %d): %s", len(batch), attempt + 1, e)
+                error = e
+            except (DatabaseError, ValueError, TypeError) as e:
+                return e
+        return error
+
+    def _requeue(self, batch):
+        """Put a batch the database refused back on the queue; what no longer fits is lost."""
+        requeued = 0
+        for item in batch:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                break
+            requeued += 1
+        if requeued < len(batch):
+            logger.error("Dropping %d proctoring events: queue full after failed write", len(batch) - requeued)
+        with self._counter_lock:
+            self.counters["requeued"] += requeued
+            self.counters["failed"] += len(batch) - requeued
+
+    def _count_flush(self, rows, elapsed):
+        with self._counter_lock:
+            self.counters["written"] += rows
+            self.counters["flushes"] += 1
+            self.counters["flush_ms_total"] += elapsed
+            self.counters["flush_ms_last"] = elapsed
+            self.counters["flush_ms_max"] = max(self.counters["flush_ms_max"], elapsed)
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "PROCTOR_EVENT_BUFFER", {})}
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def enabled():
+    return _config()["ENABLED"]
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = _config()
+                _buffer = EventBuffer(
+                    max_queue=config["MAX_QUEUE"],
+                    batch_size=config["BATCH_SIZE"],
+                    flush_interval=config["FLUSH_INTERVAL"],
+                    put_timeout=config["PUT_TIMEOUT"],
+                    write_retries=config["WRITE_RETRIES"],
+                    retry_backoff=config["RETRY_BACKOFF"],
+                )
+    return _buffer
+
+
+def shutdown():
+    """Stop the writer thread after flushing what is queued. The next submit starts a fresh buffer."""
+    global _buffer
+    with _buffer_lock:
+        buffer, _buffer = _buffer, None
+    if buffer is not None:
+        buffer.stop()
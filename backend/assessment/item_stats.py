@@ -0,0 +1,143 @@
+"""
+Per-question answer storage and item statistics.
+
+record_submission() stores each candidate's answers with one bulk_create and
+folds the submission into the QuestionStat row of every question.  The rows
+hold running sums, so the statistics below are exact at any point without
+rescanning sessions:
+
+  p-value         share of submissions that answered correctly (MCQ)
+  discrimination  point-biserial correlation between getting the item right
+                  and the candidate's MCQ score
+  distractors     how often each option was picked; responses that are not
+                  one of the question's options share one OTHER_RESPONSES
+                  count, so a client cannot grow the row with made-up ids
+"""
+import math
+
+from django.db import transaction
+
+from . import bulk
+from .models import Answer, Option, QuestionStat
+
+OTHER_RESPONSES = "other"  # option_counts key for MCQ responses that match no option
+
+
+def record_submission(session_pk, total_score, items):
+    """Store answers for a graded submission and update the question stats."""
+    total_score = total_score or 0
+    with transaction.atomic():
+        Answer.objects.bulk_create([
+            Answer(
+                session_id=session_pk,
+                question_id=item.question_pk,
+                option_id=item.response[:100] if item.type == "mcq" else "",
+                text=item.response if item.type != "mcq" else "",
+                is_correct=item.is_correct,
+                score=item.score,
+            )
+            for item in items
+            if item.response not in (None, "") and isinstance(item.response, str)
+        ])
+
+        question_pks = [item.question_pk for item in items]
+        QuestionStat.objects.bulk_create(
+            [QuestionStat(question_id=pk) for pk in question_pks], ignore_conflicts=True
+        )
+        stats = QuestionStat.objects.select_for_update().in_bulk(question_pks, field_name="question_id")
+        option_ids = set(Option.objects.filter(
+            question_id__in=[item.question_pk for item in items if item.type == "mcq"]
+        ).values_list("question_id", "option_id"))
+
+        for item in items:
+            stat = stats[item.question_pk]
+            answered = isinstance(item.response, str) and item.response != ""
+            stat.attempts += 1
+            stat.answered += answered
+            stat.item_score_sum += item.score or 0
+            stat.total_score_sum += total_score
+            stat.total_score_sq_sum += total_score * total_score
+            if item.is_correct:
+                stat.correct += 1
+                stat.correct_total_score_sum += total_score
+            if item.type == "mcq" and answered:
+                choice = item.response if (item.question_pk, item.response) in option_ids else OTHER_RESPONSES
+                stat.option_counts[choice] = stat.option_counts.get(choice, 0) + 1
+
+        fields = ["attempts", "answered", "correct", "item_score_sum", "total_score_sum",
+                  "total_score_sq_sum", "correct_total_score_sum", "option_counts"]
+        bulk.update_rows(QuestionStat, fields, [
+            (*(getattr(stat, name) for name in fields), stat.pk) for stat in stats.values()
+        ])
+
+
+def record_deferred_scores(scores_by_question):
+    """Add subjective scores graded after submission ({question_pk: [scores]}) to the question stats."""
+    with transaction.atomic():
+        stats = QuestionStat.objects.select_for_update().in_bulk(list(scores_by_question), field_name="question_id")
+        for question_pk, scores in scores_by_question.items():
+            stat = stats.get(question_pk)
+            if stat is not None:
+                stat.item_score_sum += sum(scores)
+        bulk.update_rows(QuestionStat, ["item_score_sum"], [(stat.item_score_sum, stat.pk) for stat in stats.values()])
+
+
+def p_value(stat):
+    return stat.correct / stat.attempts if stat.attempts else None
+
+
+def discrimination(stat):
+    """Point-biserial correlation; None while it is undefined (no spread yet)."""
+    n = stat.attempts
+    if not n or stat.correct in (0, n):
+        return None
+    mean = stat.total_score_sum / n
+    variance = stat.total_score_sq_sum / n - mean * mean
+    if variance <= 1e-12:
+        return None
+    p = stat.correct / n
+    mean_correct = stat.correct_total_score_sum / stat.correct
+    return (mean_correct - mean) / math.sqrt(variance) * math.sqrt(p / (1 - p))
+
+
+def difficulty_label(p):
+    if p is None:
+        return "unknown"
+    if p >= 0.7:
+        return "easy"
+    if p < 0.3:
+        return "hard"
+    return "medium"
+
+
+def question_report(test):
+    """Statistics for every question in a test, read from precomputed rows (two queries)."""
+    report = []
+    for question in test.questions.select_related("stats").prefetch_related("options").order_by("pk"):
+        stat = getattr(question, "stats", None) or QuestionStat(question=question)
+        entry = {
+            "question_id": question.qid,
+            "question_text": question.text[:100],
+            "type": question.type,
+            "total_attempts": stat.attempts,
+            "answered": stat.answered,
+            "average_score": round(stat.item_score_sum / stat.attempts, 2) if stat.attempts else 0,
+        }
+        if question.type == "mcq":
+            p = p_value(stat)
+            d = discrimination(stat)
+            entry.update({
+                "correct": stat.correct,
+                "p_value": round(p, 4) if p is not None else None,
+                "discrimination": round(d, 4) if d is not None else None,
+                "difficulty": difficulty_label(p),
+                "options": [{
+                    "option_id": option.option_id,
+                    "text": option.text[:100],
+                    "is_correct": option.is_correct,
+                    "times_chosen": stat.option_counts.get(option.option_id, 0),
+                } for option in question.options.all()],
+                "other_responses": stat.option_counts.get(OTHER_RESPONSES, 0),
+            })
+        report.append(entry)
+    return report
@@ -0,0 +1,273 @@
+"""
+Background question generation.
+
+submit() records a GenerationJob and hands its pk to a small in-process
+thread pool once the transaction commits, so the request returns a job id
+straight away.  The worker streams questions from ai_service, saves them in
+small batches (linked to the job) and bumps the job's progress after each
+batch, which is what the poll endpoint reads.  Cancellation is a flag the
+worker checks between batches.
+
+A running job stamps heartbeat_at whenever it saves a batch and whenever
+one of its API requests starts (including retries), so a job stuck in a slow
+request still looks alive.  Jobs live in the database, so nothing is lost
+on restart: recover() re-queues jobs that were still queued, or were running
+but have not sent a heartbeat for STALE_AFTER seconds (longer than a request
+can take).  It runs when the pool starts and every RECOVER_INTERVAL seconds
+after that, so jobs orphaned by another process are picked up too.  Workers
+claim a job with a conditional UPDATE, so a job is only ever run once.
+shutdown() stops the pool, waiting for running jobs to finish.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import generation_cache, similarity
+from .ai_service import iter_questions
+from .models import GeneratedQuestion, GenerationJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "WORKERS": 2,  # jobs run concurrently per process
+    "MAX_ACTIVE_PER_USER": 2,  # queued + running jobs one user may have
+    "BATCH_SIZE": 5,  # questions saved per write
+    "BATCH_WAIT": 0.5,  # seconds a question may wait for its batch to fill
+    "STALE_AFTER": 300,  # seconds without a heartbeat before a running job is considered orphaned
+    "RECOVER_INTERVAL": 60,  # seconds between looks for orphaned jobs
+    "MAX_COUNT": 200,  # questions one job (or one generate-questions request) may ask for
+}
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_recovery = None
+_stop = threading.Event()
+_scheduled = set()  # pks handed to this process's pool and not yet finished
+_scheduled_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "GENERATION_JOBS", {})}
+
+
+def new_generated_question(q_data, topic, difficulty, user, job=None):
+    return GeneratedQuestion(
+        topic=topic,
+        question_text=q_data.get("question_text", ""),
+        question_type=q_data.get("type", "mcq"),
+        options=q_data.get("options", []),
+        correct_answer=q_data.get("correct_answer", ""),
+        difficulty=q_data.get("difficulty", difficulty),
+        generated_by=user,
+        job=job,
+    )
+
+
+def save_generated(questions, cached, job=None, batch_size=None):
+    """
+    Save unsaved GeneratedQuestions through the near-duplicate check.  For a
+    set served from the generation cache (cached), the pool rows saved from
+    it earlier are handed back (and moved to job) instead, and only the ones
+    no longer in the pool are inserted.  Returns the rows.
+    """
+    if not cached or not questions:
+        return similarity.save_questions(questions, batch_size=batch_size)
+    existing = generation_cache.saved_questions(questions[0].topic, [q.question_text for q in questions])
+    reused = {}
+    missing = []
+    for question in questions:
+        row = existing.get(question.question_text)
+        if row is None or row.pk in reused:
+            missing.append(question)
+        else:
+            reused[row.pk] = row
+    if job is not None and reused:
+        GeneratedQuestion.objects.filter(pk__in=list(reused)).update(job=job)
+    return list(reused.values()) + similarity.save_questions(missing, batch_size=batch_size)
+
+
+def validate_count(count):
+    """Return count as an int, or raise ValueError unless it is a whole number from 1 to MAX_COUNT."""
+    limit = _config()["MAX_COUNT"]
+    if isinstance(count, bool) or not isinstance(count, (int, str)):
+        raise ValueError(f"count must be a whole number from 1 to {limit}")
+    try:
+        count = int(count)
+    except ValueError:
+        count = 0
+    if not 1 <= count <= limit:
+        raise ValueError(f"count must be a whole number from 1 to {limit}")
+    return count
+
+
+def submit(user, topic, count, difficulty="medium", fresh=False):
+    """
+    Create a queued job and schedule it. Raises ValueError for a count that
+    validate_count() rejects, and JobLimitExceeded if the user has too many
+    active.
+    """
+    count = validate_count(count)
+    limit = _config()["MAX_ACTIVE_PER_USER"]
+    with transaction.atomic():
+        if user is not None:
+            # serialize concurrent submits by the same user (a no-op on SQLite, which locks the database)
+            User.objects.select_for_update().filter(pk=user.pk).first()
+        active = GenerationJob.objects.filter(user=user, status__in=GenerationJob.ACTIVE_STATUSES).count()
+        if active >= limit:
+            raise JobLimitExceeded(f"At most {limit} generation jobs may be active at once")
+        job = GenerationJob.objects.create(
+            user=user, topic=topic, count=count, difficulty=difficulty, fresh=fresh
+        )
+        transaction.on_commit(lambda: _schedule(job.pk))
+    return job
+
+
+def cancel(job):
+    """Cancel a queued job outright, or ask a running one to stop after its current batch."""
+    now = timezone.now()
+    if GenerationJob.objects.filter(pk=job.pk, status="queued").update(status="cancelled", finished_at=now):
+        return True
+    return bool(GenerationJob.objects.filter(pk=job.pk, status="running").update(cancel_requested=True))
+
+
+def run(job_pk):
+    """Run one job to completion on the calling thread (normally a pool worker)."""
+    try:
+        now = timezone.now()
+        claimed = GenerationJob.objects.filter(pk=job_pk, status="queued").update(
+            status="running", started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            _execute(GenerationJob.objects.select_related("user").get(pk=job_pk))
+    except Exception:
+        logger.exception("Generation job %s crashed", job_pk)
+    finally:
+        with _scheduled_lock:
+            _scheduled.discard(job_pk)
+        close_old_connections()
+
+
+def _execute(job):
+    config = _config()
+    stats = {}
+    batch = []
+    batch_started = None
+    cancelled = False
+
+    def heartbeat():
+        GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+    def flush():
+        with transaction.atomic():
+            saved = save_generated(batch, stats.get("source") == "cache", job=job)
+            GenerationJob.objects.filter(pk=job.pk).update(
+                generated=F("generated") + len(saved), heartbeat_at=timezone.now()
+            )
+        batch.clear()
+        return GenerationJob.objects.filter(pk=job.pk).values_list("cancel_requested", flat=True).first()
+
+    # a job recovered after a restart only generates what it had not saved yet
+    questions = iter_questions(job.topic, job.count - job.generated, job.difficulty, stats=stats, fresh=job.fresh,
+                               on_attempt=heartbeat)
+    try:
+        for q_data in questions:
+            if not batch:
+                batch_started = time.monotonic()
+            batch.append(new_generated_question(q_data, job.topic, job.difficulty, job.user, job=job))
+            if len(batch) >= config["BATCH_SIZE"] or time.monotonic() - batch_started >= config["BATCH_WAIT"]:
+                if flush():
+                    cancelled = True
+                    break
+        if batch:
+            flush()
+    except Exception as e:
+        logger.exception("Generation job %s failed", job.pk)
+        _finish(job, "failed", stats, error=str(e))
+        return
+    finally:
+        questions.close()  # cancels the chunk requests not yet sent if we broke out early
+    _finish(job, "cancelled" if cancelled else "succeeded", stats)
+
+
+def _finish(job, status, stats, error=""):
+    GenerationJob.objects.filter(pk=job.pk).update(
+        status=status, stats=stats, error=error, finished_at=timezone.now()
+    )
+
+
+def recover():
+    """Re-queue jobs left behind by a dead worker or process. Returns how many were scheduled."""
+    stale = timezone.now() - timedelta(seconds=_config()["STALE_AFTER"])
+    GenerationJob.objects.filter(status="running", heartbeat_at__lt=stale).update(status="queued")
+    pks = list(GenerationJob.objects.filter(status="queued").order_by("created_at").values_list("pk", flat=True))
+    return sum(_schedule(pk) for pk in pks)
+
+
+def _schedule(job_pk):
+    """Hand a job to the pool unless it already has it. Returns whether it was scheduled."""
+    pool = _get_pool()
+    with _scheduled_lock:
+        if job_pk in _scheduled:
+            return False
+        _scheduled.add(job_pk)
+    pool.submit(run, job_pk)
+    return True
+
+
+def _recover_periodically():
+    while not _stop.wait(_config()["RECOVER_INTERVAL"]):
+        try:
+            recover()
+        except Exception:
+            logger.exception("Could not recover generation jobs")
+        finally:
+            close_old_connections()
+
+
+def _get_pool():
+    global _pool, _recovery
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_config()["WORKERS"], thread_name_prefix="generation-job")
+                try:
+                    recover()
+                except Exception:
+                    logger.exception("Could not recover generation jobs")
+                _stop.clear()
+                _recovery = threading.Thread(target=_recover_periodically, name="generation-job-recovery", daemon=True)
+                _recovery.start()
+    return _pool
+
+
+def ensure_started():
+    """Start the pool (and recovery) if this process has not done so yet."""
+    _get_pool()
+
+
+def shutdown():
+    """Drop queued work and wait for running jobs. Jobs left queued are picked up by the next recover()."""
+    global _pool, _recovery
+    with _pool_lock:
+        pool, _pool = _pool, None
+        recovery, _recovery = _recovery, None
+    if recovery is not None:
+        _stop.set()
+        recovery.join()
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+    with _scheduled_lock:
+        _scheduled.clear()
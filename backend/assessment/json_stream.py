@@ -0,0 +1,81 @@
+"""
+Incremental extraction of objects from a streamed JSON array.
+
+LLM completions arrive a few characters at a time and often wrapped in
+markdown fences.  ArrayItemParser.feed() takes those pieces as they come and
+returns each top-level object as soon as its closing brace arrives, without
+waiting for the rest of the array.  Everything outside the objects (fences,
+brackets, commas, prose) is ignored, and an element that fails to decode is
+counted in .errors and skipped, so one bad element doesn't cost the others.
+"""
+import json
+import re
+
+_TOKENS = re.compile(r'[{}\[\]"\\]')
+
+
+class ArrayItemParser:
+    def __init__(self):
+        self.errors = 0
+        self._pending = []  # pieces of the element currently being read
+        self._depth = 0  # bracket depth inside that element; 0 between elements
+        self._in_string = False
+        self._escape = False  # previous piece ended on a backslash inside a string
+
+    def feed(self, text):
+        """Consume the next piece of the stream; returns the objects it completed."""
+        items = []
+        pos = 0
+        if self._escape and text:
+            pos = 1
+            self._escape = False
+        start = 0 if self._depth else None
+
+        while True:
+            match = _TOKENS.search(text, pos)
+            if match is None:
+                break
+            i = match.start()
+            ch = text[i]
+            pos = i + 1
+
+            if not self._depth:
+                if ch == "{":
+                    self._depth = 1
+                    start = i
+                continue
+
+            if self._in_string:
+                if ch == "\\":
+                    if i + 1 < len(text):
+                        pos = i + 2
+                    else:
+                        self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if not self._depth:
+                    self._pending.append(text[start:i + 1])
+                    item = self._decode("".join(self._pending))
+                    if item is not None:
+                        items.append(item)
+                    self._pending = []
+                    start = None
+
+        if self._depth:
+            self._pending.append(text[start:])
+        return items
+
+    def _decode(self, raw):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            self.errors += 1
+            return None
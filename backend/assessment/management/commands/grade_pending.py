@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessment import grading_queue
+
+
+class Command(BaseCommand):
+    help = "Grade the subjective answers of submitted sessions that are still pending"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="sessions per batch (default: DEFERRED_GRADING)")
+        parser.add_argument("--processes", type=int, help="scoring worker processes; 0 scores in this process")
+        parser.add_argument("--watch", action="store_true", help="keep polling the queue instead of exiting")
+
+    def handle(self, *args, **options):
+        pool = grading_queue.process_pool(options["processes"])
+        interval = grading_queue._config()["POLL_INTERVAL"]
+        while True:
+            started = time.perf_counter()
+            graded = grading_queue.grade_pending(options["batch_size"], pool)
+            if graded or not options["watch"]:
+                self.stdout.write(f"Graded {graded} sessions in {time.perf_counter() - started:.2f}s")
+            if not options["watch"]:
+                return
+            time.sleep(interval)
@@ -0,0 +1,244 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+RequestMetricsMiddleware (assessment/middleware.py) measures every request:
+wall time, the number of queries and the time spent in them, response size
+and status (for a streamed response, once its body has been sent).
+observe() folds each measurement into cumulative histograms keyed by the
+resolved view name, and render() writes them out together with the
+counters the other modules already keep (event buffer, session cache,
+generation cache, near-duplicate checks, deferred grading, snapshots) for
+the /metrics endpoint, which is closed until a TOKEN is configured.  Numbers are per worker process, as Prometheus
+expects from a multi-process server scraped per process.
+
+With SLOW_REQUEST_MS set, requests slower than that are logged to
+"assessment.slow_requests" with their SQL, identical statements collapsed
+so an N+1 shows up as one line run N times.
+"""
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TOKEN": "",  # /metrics requires "Authorization: Bearer <TOKEN>"; unset, it is closed
+    "SLOW_REQUEST_MS": None,  # log requests slower than this; None turns the log off
+    "SLOW_SQL_STATEMENTS": 20,  # distinct statements printed per slow request
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)  # bytes
+
+UNRESOLVED = "<unresolved>"
+
+slow_log = logging.getLogger("assessment.slow_requests")
+
+_lock = threading.Lock()
+_requests = {}  # (view, method, status) -> count
+_views = {}  # view -> ViewMetrics
+_slow = {}  # view -> count
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "REQUEST_METRICS", {})}
+
+
+def enabled():
+    return _config()["ENABLED"]
+
+
+def authorized(request):
+    """Whether request may read /metrics (never, when no TOKEN is configured)."""
+    token = _config()["TOKEN"]
+    return bool(token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip((*self.buckets, "+Inf"), self.counts):
+            total += n
+            yield bound, total
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_duration = Histogram(DURATION_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+
+
+class QueryRecorder:
+    """
+    A connection.execute_wrapper() that counts and times queries, and with
+    keep_sql also groups them by statement text for the slow-request log.
+    """
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {} if keep_sql else None  # sql -> [runs, seconds]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self.statements is not None:
+                entry = self.statements.setdefault(sql, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+
+
+def recorder():
+    """A QueryRecorder for one request; it keeps the SQL only when the slow-request log is on."""
+    return QueryRecorder(keep_sql=_config()["SLOW_REQUEST_MS"] is not None)
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def response_size(response):
+    """Body size in bytes, or None for a streamed response without Content-Length."""
+    if response.streaming:
+        length = response.get("Content-Length")
+        return int(length) if length else None
+    return len(response.content)
+
+
+def observe(view, method, status, seconds, queries, db_seconds, size):
+    with _lock:
+        key = (view, method, status)
+        _requests[key] = _requests.get(key, 0) + 1
+        metrics = _views.get(view)
+        if metrics is None:
+            metrics = _views[view] = ViewMetrics()
+        metrics.duration.observe(seconds)
+        metrics.queries.observe(queries)
+        metrics.db_duration.observe(db_seconds)
+        if size is not None:
+            metrics.response_size.observe(size)
+
+
+def log_if_slow(request, view, status, seconds, recorder):
+    """Log the request when it ran over SLOW_REQUEST_MS. Returns whether it did."""
+    config = _config()
+    threshold = config["SLOW_REQUEST_MS"]
+    if threshold is None or seconds * 1000 < threshold:
+        return False
+    with _lock:
+        _slow[view] = _slow.get(view, 0) + 1
+
+    statements = sorted((recorder.statements or {}).items(), key=lambda item: -item[1][1])
+    shown = statements[:config["SLOW_SQL_STATEMENTS"]]
+    lines = [f"  {runs:4d}x {total * 1000:8.1f} ms  {sql}" for sql, (runs, total) in shown]
+    if len(statements) > len(shown):
+        lines.append(f"  ... {len(statements) - len(shown)} more distinct statements")
+    slow_log.warning(
+        "Slow request %s %s (%s, %s): %.0f ms, %d queries in %.0f ms\n%s",
+        request.method, request.get_full_path(), view, status,
+        seconds * 1000, recorder.count, recorder.seconds * 1000, "\n".join(lines),
+    )
+    return True
+
+
+def reset():
+    with _lock:
+        _requests.clear()
+        _views.clear()
+        _slow.clear()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram(lines, name, help_text, per_view):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for view, histogram in per_view:
+        labels = f'view="{_label(view)}"'
+        for bound, total in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+def _module_stats():
+    """(prefix, help text, stats dict) for each module that keeps its own counters."""
+    from . import generation_cache, grading_queue, ingest, session_cache, similarity, snapshots
+
+    grading = dict(grading_queue.counters)
+    grading["pending"] = grading_queue.pending_count()
+    return [
+        ("exam_event_buffer", "Proctoring event buffer (assessment/ingest.py)", ingest.get_buffer().stats()),
+        ("exam_session_cache", "Session metadata cache (assessment/session_cache.py)", session_cache.cache.stats()),
+        ("exam_generation_cache", "Generated question set cache (assessment/generation_cache.py)",
+         generation_cache.stats()),
+        ("exam_near_duplicates", "Near-duplicate question checks (assessment/similarity.py)", similarity.stats()),
+        ("exam_deferred_grading", "Deferred subjective grading (assessment/grading_queue.py)", grading),
+        ("exam_snapshots", "Webcam snapshot storage (assessment/snapshots.py)", dict(snapshots.counters)),
+    ]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        requests = sorted(_requests.items())
+        views = sorted(_views.items())
+        slow = sorted(_slow.items())
+
+    lines = [
+        "# HELP exam_http_requests_total Requests handled, by view, method and status.",
+        "# TYPE exam_http_requests_total counter",
+    ]
+    for (view, method, status), count in requests:
+        lines.append(
+            f'exam_http_requests_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}'
+        )
+    _histogram(lines, "exam_http_request_duration_seconds", "Wall time per request.",
+               [(view, m.duration) for view, m in views])
+    _histogram(lines, "exam_http_request_queries", "Database queries per request.",
+               [(view, m.queries) for view, m in views])
+    _histogram(lines, "exam_http_request_db_duration_seconds", "Time spent in database queries per request.",
+               [(view, m.db_duration) for view, m in views])
+    _histogram(lines, "exam_http_response_size_bytes", "Response body size.",
+               [(view, m.response_size) for view, m in views])
+    lines.append("# HELP exam_http_slow_requests_total Requests slower than SLOW_REQUEST_MS.")
+    lines.append("# TYPE exam_http_slow_requests_total counter")
+    for view, count in slow:
+        lines.append(f'exam_http_slow_requests_total{{view="{_label(view)}"}} {count}')
+
+    for prefix, help_text, stats in _module_stats():
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines.append(f"# HELP {name} {help_text}: {key}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
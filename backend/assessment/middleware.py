@@ -0,0 +1,167 @@
+"""
+Request instrumentation: metrics for every request (assessment/metrics.py)
+and profiles of the ones that ask for it (assessment/profiling.py).
+
+RequestMetricsMiddleware goes first in MIDDLEWARE so its timing covers the
+rest of the stack.  Queries are counted with a connection.execute_wrapper()
+for the duration of the request.  It is async-capable so the async candidate
+views keep running on the event loop; there the wrapper is installed on the
+request's thread-sensitive worker thread, where the async ORM and the async
+views' sync work run their queries.
+
+A streaming response is recorded when its body has been sent rather than
+when the view returns it: the middleware wraps streaming_content so that
+the time, queries and size cover producing the stream as well.
+"""
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connection
+
+from . import metrics, profiling
+
+
+def _install(recorder):
+    connection.execute_wrappers.append(recorder)
+
+
+def _uninstall(recorder):
+    connection.execute_wrappers.remove(recorder)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not metrics.enabled():
+            return self.get_response(request)
+
+        recorder = metrics.recorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        return self._finish(request, response, start, recorder)
+
+    async def __acall__(self, request):
+        if not metrics.enabled():
+            return await self.get_response(request)
+
+        recorder = metrics.recorder()
+        start = time.perf_counter()
+        await sync_to_async(_install)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_uninstall)(recorder)
+        return self._finish(request, response, start, recorder)
+
+    def _finish(self, request, response, start, recorder):
+        if not response.streaming:
+            self._record(request, response, time.perf_counter() - start, recorder, metrics.response_size(response))
+            return response
+        measure = self._measure_async_stream if response.is_async else self._measure_stream
+        response.streaming_content = measure(request, response, response.streaming_content, start, recorder)
+        return response
+
+    def _measure_stream(self, request, response, content, start, recorder):
+        # Under ASGI a sync body is consumed on the request's worker thread, so the wrapper goes there too
+        size = 0
+        try:
+            with connection.execute_wrapper(recorder):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self._record(request, response, time.perf_counter() - start, recorder, size)
+
+    async def _measure_async_stream(self, request, response, content, start, recorder):
+        size = 0
+        await sync_to_async(_install)(recorder)
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            await sync_to_async(_uninstall)(recorder)
+            self._record(request, response, time.perf_counter() - start, recorder, size)
+
+    def _record(self, request, response, seconds, recorder, size):
+        view = metrics.view_name(request)
+        status = response.status_code
+        metrics.observe(view, request.method, status, seconds, recorder.count, recorder.seconds, size)
+        metrics.log_if_slow(request, view, status, seconds, recorder)
+
+
+class ProfilingMiddleware:
+    """
+    Runs a request under a profiler when it asks for one or is sampled (see
+    assessment/profiling.py) and adds the stored profile's id to the
+    response as X-Profile-Id.  Everything else passes straight through.
+
+    Under ASGI the profiler runs on the request's thread-sensitive worker
+    thread, where sync views and the ORM run; the sampling profiler also
+    samples the event loop, which is shared with concurrent requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request)
+        if mode is None or not profiling.acquire():
+            return self.get_response(request)
+
+        try:
+            profiler = profiling.RequestProfiler(mode)
+            start = time.perf_counter()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                data = profiler.stop()
+            seconds = time.perf_counter() - start
+        finally:
+            profiling.release()
+        self._save(request, response, mode, seconds, data)
+        return response
+
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request)
+        if mode is None or not profiling.acquire():
+            return await self.get_response(request)
+
+        try:
+            profiler = profiling.RequestProfiler(mode)
+            worker = await sync_to_async(threading.get_ident)()
+            start = time.perf_counter()
+            await sync_to_async(profiler.start)({threading.get_ident(): "event loop", worker: "worker thread"})
+            try:
+                response = await self.get_response(request)
+            finally:
+                data = await sync_to_async(profiler.stop)()
+            seconds = time.perf_counter() - start
+        finally:
+            profiling.release()
+        self._save(request, response, mode, seconds, data)
+        return response
+
+    def _save(self, request, response, mode, seconds, data):
+        view = metrics.view_name(request)
+        response["X-Profile-Id"] = profiling.save(view, request, mode, response.status_code, seconds, data)
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0002_generatedquestion_hruser'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.BinaryField()),
+                ('raw_size', models.IntegerField()),
+                ('etag', models.CharField(max_length=64)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('test', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bundle', to='assessment.test')),
+            ],
+        ),
+    ]
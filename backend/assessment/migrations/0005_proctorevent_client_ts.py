@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0004_proctorevent_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proctorevent',
+            name='client_ts',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+import assessment.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0005_proctorevent_client_ts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='snapshot',
+            name='original_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='snapshot',
+            name='phash',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='snapshot',
+            name='stored_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='snapshot',
+            name='image',
+            field=models.ImageField(upload_to=assessment.models.snapshot_upload_path),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0006_snapshot_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('answered', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('item_score_sum', models.FloatField(default=0)),
+                ('total_score_sum', models.FloatField(default=0)),
+                ('total_score_sq_sum', models.FloatField(default=0)),
+                ('correct_total_score_sum', models.FloatField(default=0)),
+                ('option_counts', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='assessment.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Answer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('option_id', models.CharField(blank=True, max_length=100)),
+                ('text', models.TextField(blank=True)),
+                ('is_correct', models.BooleanField(null=True)),
+                ('score', models.FloatField(null=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='assessment.question')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='assessment.session')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'question'), name='unique_answer_per_question')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+def backfill_scores(apps, schema_editor):
+    Session = apps.get_model('assessment', 'Session')
+    batch = []
+    for session in Session.objects.filter(score_mcq__isnull=False).iterator(chunk_size=2000):
+        sub_scores = [v for v in (session.score_subjective or {}).values() if isinstance(v, (int, float))]
+        subjective_avg = sum(sub_scores) / len(sub_scores) if sub_scores else 0
+        session.subjective_avg = round(subjective_avg, 2)
+        session.overall_score = round(session.score_mcq * 0.7 + subjective_avg * 0.3, 2)
+        batch.append(session)
+        if len(batch) >= 2000:
+            Session.objects.bulk_update(batch, ['subjective_avg', 'overall_score'])
+            batch = []
+    Session.objects.bulk_update(batch, ['subjective_avg', 'overall_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0007_answers_and_question_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='overall_score',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='subjective_avg',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('ended__isnull', False)), fields=['test', '-overall_score', '-id'], name='session_ranking_idx'),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+import hashlib
+import random
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copies of assessment.similarity.tokens() and band_keys() as they were
+# when this migration was written, so later changes there can't alter it.
+BANDS = 10
+ROWS = 3
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+STOP_WORDS = frozenset("""
+a an the is are was were be been being do does did can could will would should
+what which who whom whose why how when where of in on at to for from by with
+about as into between and or not no its it this that these those s your you
+""".split())
+
+
+def tokens(text):
+    words = re.sub(r"[^\w\s]", " ", (text or "").lower()).split()
+    content = {w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+               for w in words if w not in STOP_WORDS}
+    return frozenset(content or words)
+
+
+def band_keys(token_set):
+    if not token_set:
+        return []
+    hashed = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "big") for t in token_set]
+    signature = [min((a * h + b) % _PRIME for h in hashed) for a, b in _PERMUTATIONS]
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(f"{band}:{rows}".encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def index_existing_questions(apps, schema_editor):
+    GeneratedQuestion = apps.get_model('assessment', 'GeneratedQuestion')
+    QuestionBand = apps.get_model('assessment', 'QuestionBand')
+    batch = []
+    for pk, text in GeneratedQuestion.objects.values_list('pk', 'question_text').iterator(chunk_size=2000):
+        batch.extend(QuestionBand(key=key, question_id=pk) for key in band_keys(tokens(text)))
+        if len(batch) >= 10000:
+            QuestionBand.objects.bulk_create(batch)
+            batch = []
+    QuestionBand.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0010_generation_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedquestion',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='assessment.generatedquestion'),
+        ),
+        migrations.CreateModel(
+            name='QuestionBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='assessment.generatedquestion')),
+            ],
+        ),
+        migrations.RunPython(index_existing_questions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:27
+
+from django.conf import settings
+from django.db import OperationalError, migrations, models, transaction
+
+# Frozen copy of assessment.search.install()/uninstall() as of this migration, so
+# later changes to that module can't change what this migration does.
+TABLE = "assessment_generatedquestion"
+FTS_TABLE = "assessment_generatedquestion_fts"
+PG_INDEX = "assessment_generatedquestion_text_search"
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, question_text) VALUES (new.id, new.question_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF question_text ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+        INSERT INTO {FTS_TABLE}(rowid, question_text) VALUES (new.id, new.question_text);
+    END""",
+]
+
+
+def install_search(apps, schema_editor):
+    # FTS5 table + triggers on SQLite, GIN tsvector index on PostgreSQL
+    conn = schema_editor.connection
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            try:
+                with transaction.atomic(using=conn.alias):
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                        f"question_text, content='{TABLE}', content_rowid='id', tokenize='porter unicode61')"
+                    )
+            except OperationalError:
+                return  # no FTS5 in this SQLite build; search falls back to a substring match
+            for trigger in SQLITE_TRIGGERS:
+                cursor.execute(trigger)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif conn.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} "
+                f"USING GIN (to_tsvector('english', question_text))"
+            )
+
+
+def uninstall_search(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif conn.vendor == "postgresql":
+            cursor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0011_near_duplicates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedquestion',
+            index=models.Index(condition=models.Q(('is_selected', False)), fields=['-generated_at', '-id'], name='genq_pool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatedquestion',
+            index=models.Index(condition=models.Q(('is_selected', False)), fields=['topic', '-generated_at', '-id'], name='genq_pool_topic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatedquestion',
+            index=models.Index(condition=models.Q(('is_selected', False)), fields=['generated_by', '-generated_at', '-id'], name='genq_pool_author_idx'),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
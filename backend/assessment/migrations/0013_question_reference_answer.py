@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+def copy_reference_answers(apps, schema_editor):
+    # Questions promoted from the generated pool: match them back by test and text
+    GeneratedQuestion = apps.get_model('assessment', 'GeneratedQuestion')
+    Question = apps.get_model('assessment', 'Question')
+    answers = {
+        (test_pk, text): answer
+        for test_pk, text, answer in GeneratedQuestion.objects.filter(
+            selected_for_test__isnull=False, question_type='subjective',
+        ).exclude(correct_answer='').values_list('selected_for_test_id', 'question_text', 'correct_answer')
+    }
+    batch = []
+    for question in Question.objects.filter(type='subjective', reference_answer='').only('pk', 'test_id', 'text'):
+        answer = answers.get((question.test_id, question.text))
+        if answer:
+            question.reference_answer = answer
+            batch.append(question)
+    Question.objects.bulk_update(batch, ['reference_answer'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0012_question_pool_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='reference_answer',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(copy_reference_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+def mark_submitted_graded(apps, schema_editor):
+    # Sessions submitted so far were graded inline.  Submit only started setting
+    # ended recently; before that a submitted session had scores or answers.
+    Session = apps.get_model('assessment', 'Session')
+    Session.objects.filter(
+        models.Q(ended__isnull=False) | models.Q(score_mcq__isnull=False) | models.Q(answers__isnull=False)
+    ).update(grading_status='graded')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0013_question_reference_answer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='grading_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='grading_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('grading', 'Grading'), ('graded', 'Graded')], default='', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('grading_status__in', ['pending', 'grading'])), fields=['grading_status', 'ended'], name='session_grading_queue_idx'),
+        ),
+        migrations.RunPython(mark_submitted_graded, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0014_session_grading_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exambundle',
+            name='content_version',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='content_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
 
@@ -17,6 +18,7 @@ class Test(models.Model):
     title = models.CharField(max_length=255)
     duration = models.IntegerField(default=20)
     description = models.TextField(blank=True)
+    content_version = models.UUIDField(default=uuid.uuid4, editable=False)  # replaced on every content change
 
     def __str__(self):
         return self.title
@@ -27,6 +29,7 @@ class Question(models.Model):
     qid = models.CharField(max_length=100)
     text = models.TextField()
     type = models.CharField(max_length=20, choices=[("mcq", "MCQ"), ("subjective", "Subjective")])
+    reference_answer = models.TextField(blank=True)  # model answer subjective responses are graded against
 
     def __str__(self):
         return self.text[:50]
@@ -50,21 +53,85 @@ class Session(models.Model):
     ended = models.DateTimeField(null=True, blank=True)
     score_mcq = models.FloatField(null=True)
     score_subjective = models.JSONField(default=dict)
+    subjective_avg = models.FloatField(null=True)
+    overall_score = models.FloatField(null=True)  # 70% MCQ + 30% subjective, used for ranking
+    # Subjective answers may be graded after submission (see grading_queue.py);
+    # blank until the session is submitted
+    GRADING_STATUSES = [("pending", "Pending"), ("grading", "Grading"), ("graded", "Graded")]
+    grading_status = models.CharField(max_length=10, choices=GRADING_STATUSES, blank=True, default="")
+    grading_claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Grading queue: submitted sessions still waiting for (or being given) subjective scores
+            models.Index(
+                fields=["grading_status", "ended"],
+                condition=models.Q(grading_status__in=["pending", "grading"]),
+                name="session_grading_queue_idx",
+            ),
+            # Candidate ranking: finished sessions of a test by score, keyset-paginated on (score, id)
+            models.Index(
+                fields=["test", "-overall_score", "-id"],
+                condition=models.Q(ended__isnull=False),
+                name="session_ranking_idx",
+            ),
+        ]
 
     def __str__(self):
         return str(self.session_id)
 
 
+class Answer(models.Model):
+    """One candidate's response to one question, written in bulk on submit"""
+    session = models.ForeignKey(Session, related_name="answers", on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, related_name="answers", on_delete=models.CASCADE)
+    option_id = models.CharField(max_length=100, blank=True)  # chosen option (MCQ)
+    text = models.TextField(blank=True)  # free-text response (subjective)
+    is_correct = models.BooleanField(null=True)  # None for subjective
+    score = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "question"], name="unique_answer_per_question"),
+        ]
+
+
+class QuestionStat(models.Model):
+    """Running item statistics for a question, updated as each submission arrives"""
+    question = models.OneToOneField(Question, related_name="stats", on_delete=models.CASCADE)
+    attempts = models.IntegerField(default=0)  # submissions of the test
+    answered = models.IntegerField(default=0)  # submissions that answered this question
+    correct = models.IntegerField(default=0)
+    item_score_sum = models.FloatField(default=0)  # per-question score (MCQ: 0/100)
+    total_score_sum = models.FloatField(default=0)  # candidates' test scores, for discrimination
+    total_score_sq_sum = models.FloatField(default=0)
+    correct_total_score_sum = models.FloatField(default=0)  # test scores of candidates who got it right
+    option_counts = models.JSONField(default=dict)  # option_id -> times chosen
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.question_id}"
+
+
+def snapshot_upload_path(instance, filename):
+    """Shard snapshots into snaps/<session uuid>/<date>/ so no directory grows unbounded."""
+    return f"snaps/{instance.session.session_id}/{timezone.now():%Y-%m-%d}/{uuid.uuid4().hex}.jpg"
+
+
 class Snapshot(models.Model):
     session = models.ForeignKey(Session, related_name="snaps", on_delete=models.CASCADE)
-    image = models.ImageField(upload_to="snaps/")
+    image = models.ImageField(upload_to=snapshot_upload_path)
     created_at = models.DateTimeField(auto_now_add=True)
+    phash = models.CharField(max_length=16, blank=True)  # 64-bit difference hash, hex
+    original_bytes = models.PositiveIntegerField(default=0)  # size as uploaded
+    stored_bytes = models.PositiveIntegerField(default=0)  # size after re-encoding
 
 
 class ProctorEvent(models.Model):
     session = models.ForeignKey(Session, related_name="events", on_delete=models.CASCADE)
     event_type = models.CharField(max_length=100)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # set at receipt; rows may be written later in batches
+    client_ts = models.DateTimeField(null=True, blank=True)  # when the browser saw it, for batched uploads
 
 
 class HRUser(models.Model):
@@ -89,6 +156,92 @@ class GeneratedQuestion(models.Model):
     generated_at = models.DateTimeField(auto_now_add=True)
     is_selected = models.BooleanField(default=False)
     selected_for_test = models.ForeignKey(Test, on_delete=models.SET_NULL, null=True, blank=True)
+    job = models.ForeignKey("GenerationJob", related_name="questions", on_delete=models.SET_NULL, null=True, blank=True)
+    duplicate_of = models.ForeignKey("self", related_name="near_duplicates", on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        # The pool endpoint lists unselected questions, optionally by topic or author, newest
+        # first, keyset-paginated on (generated_at, id).  Partial indexes because Django
+        # renders is_selected=False as NOT is_selected, which a leading column can't serve.
+        indexes = [
+            models.Index(fields=["-generated_at", "-id"], condition=models.Q(is_selected=False),
+                         name="genq_pool_idx"),
+            models.Index(fields=["topic", "-generated_at", "-id"], condition=models.Q(is_selected=False),
+                         name="genq_pool_topic_idx"),
+            models.Index(fields=["generated_by", "-generated_at", "-id"], condition=models.Q(is_selected=False),
+                         name="genq_pool_author_idx"),
+        ]
     
     def __str__(self):
-        return f"{self.topic} - {self.question_text[:50]}"
\ No newline at end of file
+        return f"{self.topic} - {self.question_text[:50]}"
+
+
+class ExamBundle(models.Model):
+    """Published, answer-free test payload served to candidates"""
+    test = models.OneToOneField(Test, related_name="bundle", on_delete=models.CASCADE)
+    payload = models.BinaryField()  # gzip-compressed JSON
+    raw_size = models.IntegerField()
+    etag = models.CharField(max_length=64)
+    content_version = models.UUIDField(null=True)  # Test.content_version the payload was rendered from
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Bundle for {self.test_id}"
+
+
+class GenerationCacheEntry(models.Model):
+    """AI-generated question set stored under a hash of its prompt parameters and model"""
+    key = models.CharField(max_length=64, unique=True)  # sha256 hex
+    topic = models.CharField(max_length=100)
+    difficulty = models.CharField(max_length=20)
+    count = models.IntegerField()
+    model = models.CharField(max_length=100)
+    questions = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)  # eviction order
+    hits = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.topic} / {self.difficulty} / {self.count} ({self.model})"
+
+
+class GenerationJob(models.Model):
+    """Question generation run by the background worker pool (see jobs.py)"""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+        ("cancelled", "Cancelled"),
+    ]
+    ACTIVE_STATUSES = ("queued", "running")
+
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    topic = models.CharField(max_length=100)
+    difficulty = models.CharField(max_length=20, default="medium")
+    count = models.IntegerField()
+    fresh = models.BooleanField(default=False)  # bypass the generation cache
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    generated = models.IntegerField(default=0)  # questions saved so far
+    cancel_requested = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    stats = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # last progress from the worker running it
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="generationjob_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} x{self.count} ({self.status})"
+
+
+class QuestionBand(models.Model):
+    """MinHash LSH key of a generated question, for near-duplicate lookups (see similarity.py)"""
+    key = models.BigIntegerField(db_index=True)
+    question = models.ForeignKey(GeneratedQuestion, related_name="bands", on_delete=models.CASCADE)
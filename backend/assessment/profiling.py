@@ -0,0 +1,211 @@
+"""
+On-demand profiling of live requests.
+
+ProfilingMiddleware (assessment/middleware.py) runs a request under a
+profiler when it asks for one with the admin token:
+    X-Profile: cprofile | sampling     (or ?profile=cprofile|sampling)
+    X-Profile-Token: <TOKEN>
+or, with SAMPLE_RATE > 0, for that fraction of all requests.  The result is
+kept in a ring of recent profiles capped by count (KEEP) and total size
+(MAX_BYTES); the profiled response carries its id in X-Profile-Id, and
+/api/profiles/ lists and downloads them with the same token.  The token is
+only read from the header: in the query string it would end up in access
+logs and the slow-request log.
+
+Two profilers:
+  cprofile  deterministic; saved as a .prof file (pstats, snakeviz).
+  sampling  a background thread records the request thread's stack every
+            SAMPLE_INTERVAL seconds; saved as collapsed stacks ("a;b;c 12"
+            per line) for flamegraph.pl or speedscope.  Much cheaper, and it
+            only ever looks at the threads serving this request.
+
+Only one request is profiled at a time; a second request that asks while
+one is running is served unprofiled.  On Python 3.12+ cProfile observes
+every thread, so under a threaded server it also picks up concurrent
+requests; use sampling to isolate one.  Requests that do not ask for a
+profile only pay for the header check.
+"""
+import cProfile
+import hmac
+import itertools
+import marshal
+import os
+import random
+import sys
+import threading
+import uuid
+from collections import Counter, deque, namedtuple
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULTS = {
+    "TOKEN": "",  # required for on-demand profiles and the download endpoints; empty turns both off
+    "SAMPLE_RATE": 0.0,  # fraction of all requests profiled without being asked
+    "MODE": "sampling",  # profiler for sampled requests
+    "SAMPLE_INTERVAL": 0.005,  # seconds between stack samples
+    "KEEP": 50,  # profiles kept
+    "MAX_BYTES": 20 * 1024 * 1024,  # total size of the profiles kept
+}
+
+MODES = ("cprofile", "sampling")
+EXTENSIONS = {"cprofile": "prof", "sampling": "collapsed.txt"}
+
+_busy = threading.Lock()  # held while a request is being profiled
+_lock = threading.Lock()
+_profiles = deque()
+_stored_bytes = 0
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "PROFILING", {})}
+
+
+Profile = namedtuple("Profile", ["id", "view", "method", "path", "mode", "status", "duration_ms", "created_at", "data"])
+
+
+def filename(profile):
+    return f"{profile.view}-{profile.id}.{EXTENSIONS[profile.mode]}"
+
+
+def summary(profile):
+    return {
+        "id": profile.id,
+        "view": profile.view,
+        "method": profile.method,
+        "path": profile.path,
+        "mode": profile.mode,
+        "status": profile.status,
+        "duration_ms": round(profile.duration_ms, 2),
+        "bytes": len(profile.data),
+        "created_at": profile.created_at.isoformat(),
+    }
+
+
+def authorized(request):
+    """Whether request carries the admin token (never, when no TOKEN is configured)."""
+    token = _config()["TOKEN"]
+    given = request.headers.get("X-Profile-Token", "")
+    return bool(token) and hmac.compare_digest(given, token)
+
+
+def requested_mode(request):
+    """
+    The profiler this request should run under, or None.  An explicit ask
+    needs the token; otherwise SAMPLE_RATE decides.
+    """
+    asked = request.headers.get("X-Profile") or request.GET.get("profile")
+    if asked:
+        return asked if asked in MODES and authorized(request) else None
+    config = _config()
+    if config["SAMPLE_RATE"] and random.random() < config["SAMPLE_RATE"]:
+        return config["MODE"]
+    return None
+
+
+def acquire():
+    """Claim the profiler for one request. Returns False when another request has it."""
+    return _busy.acquire(blocking=False)
+
+
+def release():
+    _busy.release()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Records the stacks of the given threads every interval seconds, as
+    collapsed stacks rooted at each thread's label.
+    """
+
+    def __init__(self, threads, interval):
+        self.threads = threads  # thread id -> root label
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common()).encode()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, root in self.threads.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.counts[";".join(itertools.chain([root], reversed(stack)))] += 1
+
+
+class RequestProfiler:
+    """
+    One request's profiler: start() before the view and stop(), which returns
+    the profile data, after it.  Both must run on the same thread.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self._profiler = None
+        self._sampler = None
+
+    def start(self, threads=None):
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            threads = threads or {threading.get_ident(): "request"}
+            self._sampler = StackSampler(threads, _config()["SAMPLE_INTERVAL"])
+            self._sampler.start()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.create_stats()
+            return marshal.dumps(self._profiler.stats)  # the format of Profile.dump_stats()
+        return self._sampler.stop()
+
+
+def save(view, request, mode, status, seconds, data):
+    """Keep a finished profile, dropping the oldest beyond KEEP or MAX_BYTES. Returns its id."""
+    global _stored_bytes
+    config = _config()
+    profile = Profile(uuid.uuid4().hex[:12], view, request.method, request.path, mode, status,
+                      seconds * 1000, timezone.now(), data)
+    with _lock:
+        _profiles.append(profile)
+        _stored_bytes += len(data)
+        while _profiles and (len(_profiles) > config["KEEP"] or _stored_bytes > config["MAX_BYTES"]):
+            _stored_bytes -= len(_profiles.popleft().data)
+    return profile.id
+
+
+def recent(view=None):
+    """Kept profiles, newest first, optionally only those for one view."""
+    with _lock:
+        profiles = list(_profiles)
+    return [p for p in reversed(profiles) if view is None or p.view == view]
+
+
+def get(profile_id):
+    with _lock:
+        return next((p for p in _profiles if p.id == profile_id), None)
+
+
+def clear():
+    global _stored_bytes
+    with _lock:
+        _profiles.clear()
+        _stored_bytes = 0
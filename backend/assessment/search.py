@@ -0,0 +1,118 @@
+"""
+Full-text search over GeneratedQuestion.question_text.
+
+SQLite gets an external-content FTS5 table kept in sync by triggers;
+PostgreSQL gets a GIN index on to_tsvector('english', question_text).  Other
+backends, and SQLite builds without FTS5, fall back to a case-insensitive
+substring match.
+
+install() is idempotent.  Migration 0012 runs a frozen copy of it, and a
+post_migrate hook runs this one, because SQLite's schema editor rebuilds a
+table (dropping its triggers) whenever a later migration alters it.
+"""
+import re
+
+from django.db import OperationalError, connection, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.expressions import RawSQL
+
+MIGRATION = ("assessment", "0012_question_pool_search")
+TABLE = "assessment_generatedquestion"
+FTS_TABLE = "assessment_generatedquestion_fts"
+PG_INDEX = "assessment_generatedquestion_text_search"
+
+_fts_tables = {}  # connection alias -> whether the FTS5 table exists
+
+_SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, question_text) VALUES (new.id, new.question_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF question_text ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+        INSERT INTO {FTS_TABLE}(rowid, question_text) VALUES (new.id, new.question_text);
+    END""",
+]
+
+
+def install(conn=None):
+    """Create the search structures for this database if they are missing."""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                           [f"{FTS_TABLE}_a_"])
+            complete = cursor.fetchone()[0] == len(_SQLITE_TRIGGERS)
+            try:
+                with transaction.atomic(using=conn.alias):
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                        f"question_text, content='{TABLE}', content_rowid='id', tokenize='porter unicode61')"
+                    )
+            except OperationalError:
+                # SQLite built without FTS5: filter_text() falls back to a substring match
+                _fts_tables[conn.alias] = False
+                return
+            _fts_tables[conn.alias] = True
+            for trigger in _SQLITE_TRIGGERS:
+                cursor.execute(trigger)
+            if not complete:
+                # rows may have changed while the triggers were missing
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif conn.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} "
+                f"USING GIN (to_tsvector('english', question_text))"
+            )
+
+
+def reinstall_after_migrate(sender, using, **kwargs):
+    """post_migrate receiver: restore triggers lost to a table rebuild."""
+    conn = connections[using]
+    if MIGRATION in MigrationRecorder(conn).applied_migrations():
+        install(conn)
+
+
+def uninstall(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            _fts_tables[conn.alias] = False
+        elif conn.vendor == "postgresql":
+            cursor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+
+
+def _has_fts_table(conn):
+    if conn.alias not in _fts_tables:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_tables[conn.alias] = cursor.fetchone()[0] > 0
+    return _fts_tables[conn.alias]
+
+
+def _fts5_query(text):
+    """Quote each word so user input can't be read as FTS5 syntax; the last word matches as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words) + "*"
+
+
+def filter_text(queryset, text):
+    """Restrict a GeneratedQuestion queryset to rows whose text matches the search terms."""
+    if connection.vendor == "sqlite" and _has_fts_table(connection):
+        query = _fts5_query(text)
+        if query is None:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]))
+    if connection.vendor == "postgresql":
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT id FROM {TABLE} WHERE to_tsvector('english', question_text) @@ plainto_tsquery('english', %s)",
+            [text],
+        ))
+    return queryset.filter(question_text__icontains=text)
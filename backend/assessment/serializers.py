@@ -32,6 +32,37 @@ class CompanySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "tests"]
 
 
+# Candidate-facing variants: same shape, but never expose is_correct.
+class CandidateOptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Option
+        fields = ["option_id", "text"]
+
+
+class CandidateQuestionSerializer(serializers.ModelSerializer):
+    options = CandidateOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ["qid", "text", "type", "options"]
+
+
+class CandidateTestSerializer(serializers.ModelSerializer):
+    questions = CandidateQuestionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Test
+        fields = ["test_id", "title", "duration", "description", "questions"]
+
+
+class CandidateCompanySerializer(serializers.ModelSerializer):
+    tests = CandidateTestSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Company
+        fields = ["id", "name", "tests"]
+
+
 class SessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Session
@@ -0,0 +1,138 @@
+"""
+In-process LRU/TTL cache of exam session metadata.
+
+The candidate endpoints (log, batch log, snapshot, submit) only need a
+session's primary key, test, username and whether it has ended.  Entries are
+filled by start_session, read on every session-scoped request and dropped
+when the session is submitted, so the common case needs no SELECT.  The TTL
+bounds how long another worker's stale view of a session can survive.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .models import Session
+
+SessionInfo = namedtuple("SessionInfo", ["pk", "session_id", "test_pk", "username", "ended"])
+
+DEFAULTS = {
+    "MAX_ENTRIES": 10000,
+    "TTL": 300,  # seconds
+}
+
+
+class SessionCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # uuid -> (expires_at, SessionInfo)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if entry[0] < now:
+                del self._entries[key]
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    def put(self, info):
+        with self._lock:
+            self._entries[info.session_id] = (time.monotonic() + self.ttl, info)
+            self._entries.move_to_end(info.session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "SESSION_CACHE", {})}
+
+
+cache = SessionCache(**{k.lower(): v for k, v in _config().items()})
+
+
+def info_for(session):
+    return SessionInfo(session.pk, session.session_id, session.test_id, session.username, session.ended is not None)
+
+
+def remember(session):
+    info = info_for(session)
+    cache.put(info)
+    return info
+
+
+def _key(session_id):
+    try:
+        return session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))
+    except ValueError:
+        raise Session.DoesNotExist(f"Invalid session id {session_id!r}")
+
+
+def _cache_row(key, row):
+    info = SessionInfo(row[0], key, row[1], row[2], row[3] is not None)
+    cache.put(info)
+    return info
+
+
+def lookup(session_id):
+    """
+    Return SessionInfo for a session UUID (string or UUID), loading it from
+    the database on a miss. Raises Session.DoesNotExist for unknown or
+    malformed ids.
+    """
+    key = _key(session_id)
+    info = cache.get(key)
+    if info is not None:
+        return info
+    try:
+        row = Session.objects.values_list("pk", "test_id", "username", "ended").get(session_id=key)
+    except ValidationError:
+        raise Session.DoesNotExist(f"Invalid session id {session_id!r}")
+    return _cache_row(key, row)
+
+
+async def alookup(session_id):
+    """lookup() for async views: a hit never leaves the event loop, a miss uses the async ORM."""
+    key = _key(session_id)
+    info = cache.get(key)
+    if info is not None:
+        return info
+    try:
+        row = await Session.objects.values_list("pk", "test_id", "username", "ended").aget(session_id=key)
+    except ValidationError:
+        raise Session.DoesNotExist(f"Invalid session id {session_id!r}")
+    return _cache_row(key, row)
+
+
+def forget(session_id):
+    cache.discard(session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id)))
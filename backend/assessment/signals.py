@@ -0,0 +1,52 @@
+"""
+Cache invalidation hooks for the catalog, exam bundles and answer keys.
+"""
+import uuid
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import bundles, catalog, grading, subjective
+from .models import Company, Test, Question, Option
+
+
+@receiver([post_save, post_delete], sender=Company)
+@receiver([post_save, post_delete], sender=Test)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Option)
+def catalog_changed(sender, instance, **kwargs):
+    # Defer until commit so a concurrent reader can't re-cache the old rows
+    # under the new version.
+    transaction.on_commit(catalog.invalidate)
+
+
+def test_content_changed(test_pk):
+    """
+    Invalidate everything derived from a test's questions. Receivers call
+    this on save/delete; code that writes with bulk_create/update (which send
+    no signals) must call it directly.
+    """
+    # in the editing transaction, so a bundle built from the old rows is out of date once it commits
+    Test.objects.filter(pk=test_pk).update(content_version=uuid.uuid4())
+    transaction.on_commit(catalog.invalidate)
+    bundles.mark_stale(test_pk)
+    transaction.on_commit(lambda: grading.invalidate(test_pk))
+    transaction.on_commit(subjective.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Test)
+def test_changed(sender, instance, **kwargs):
+    test_content_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    test_content_changed(instance.test_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+    test_pk = Question.objects.filter(pk=instance.question_id).values_list("test_id", flat=True).first()
+    if test_pk is not None:
+        test_content_changed(test_pk)
@@ -0,0 +1,243 @@
+"""
+Near-duplicate detection for the generated question pool.
+
+Each question is reduced to its set of content words (lower-cased, stop
+words and plural "s" removed), so "What is a Python decorator?" and "What is
+a decorator in Python?" have the same set.  Similarity is the Jaccard index
+of those sets.
+
+To find candidates without scanning the pool, a 30-value MinHash signature
+is cut into 10 bands of 3 and each band is hashed to one 64-bit key stored in
+QuestionBand (indexed).  Two questions share at least one key with high
+probability once their Jaccard similarity passes ~0.6 (91% at 0.6, 98% at
+0.7), so a lookup is one indexed IN query for ten keys followed by an exact
+Jaccard check on the few rows it returns.
+
+SimHash was tried first, but on one-line questions paraphrases land 10-20
+bits apart while unrelated questions on the same topic can land ~10 bits
+apart, so no Hamming threshold separates them.
+
+save_questions() is the single insert path for GeneratedQuestion: it flags
+(or, with ACTION "drop", discards) near-duplicates of existing questions and
+of earlier questions in the same batch, writes the rows and indexes the
+originals.  Flagged questions are not indexed, so duplicate_of always points
+at an original and copies do not grow the key groups; duplicate_clusters()
+follows duplicate_of for them instead.  delete_questions() indexes the
+copies an original leaves behind when it is deleted.
+"""
+import hashlib
+import random
+import re
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import GeneratedQuestion, QuestionBand
+
+DEFAULTS = {
+    "THRESHOLD": 0.6,  # Jaccard similarity at which a question counts as a near-duplicate
+    "ACTION": "flag",  # "flag" sets duplicate_of, "drop" doesn't store the question
+}
+
+BANDS = 10
+ROWS = 3
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+STOP_WORDS = frozenset("""
+a an the is are was were be been being do does did can could will would should
+what which who whom whose why how when where of in on at to for from by with
+about as into between and or not no its it this that these those s your you
+""".split())
+
+_lock = threading.Lock()
+counters = {"checked": 0, "flagged": 0, "dropped": 0}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "NEAR_DUPLICATES", {})}
+
+
+def tokens(text):
+    words = re.sub(r"[^\w\s]", " ", (text or "").lower()).split()
+    content = {w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+               for w in words if w not in STOP_WORDS}
+    return frozenset(content or words)
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def band_keys(token_set):
+    """The BANDS LSH keys for a token set, as signed 64-bit ints."""
+    if not token_set:
+        return []
+    hashed = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "big") for t in token_set]
+    signature = [min((a * h + b) % _PRIME for h in hashed) for a, b in _PERMUTATIONS]
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(f"{band}:{rows}".encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def _count(name, n=1):
+    with _lock:
+        counters[name] += n
+
+
+def find_duplicates(texts):
+    """
+    For each text return (pk of the most similar indexed question, similarity),
+    or None when nothing in the pool reaches THRESHOLD.
+    """
+    threshold = _config()["THRESHOLD"]
+    token_sets = [tokens(t) for t in texts]
+    keys = [band_keys(s) for s in token_sets]
+    by_key = {}
+    for key, question_pk in QuestionBand.objects.filter(
+        key__in={k for ks in keys for k in ks}
+    ).values_list("key", "question_id"):
+        by_key.setdefault(key, set()).add(question_pk)
+    candidate_pks = set().union(*by_key.values()) if by_key else set()
+    candidate_tokens = {
+        pk: tokens(text)
+        for pk, text in GeneratedQuestion.objects.filter(pk__in=candidate_pks).values_list("pk", "question_text")
+    }
+
+    results = []
+    for token_set, ks in zip(token_sets, keys):
+        best = None
+        for pk in set().union(*(by_key.get(k, ()) for k in ks)):
+            if pk not in candidate_tokens:
+                continue
+            score = jaccard(token_set, candidate_tokens[pk])
+            if score >= threshold and (best is None or score > best[1] or (score == best[1] and pk < best[0])):
+                best = (pk, score)
+        results.append(best)
+    return results
+
+
+def save_questions(questions, batch_size=None):
+    """
+    bulk_create unsaved GeneratedQuestions after checking them against the
+    pool and each other, then index them.  Returns the questions stored.
+    """
+    config = _config()
+    matches = find_duplicates([q.question_text for q in questions])
+    kept = []
+    batch_tokens = []  # (question, tokens) of originals kept earlier in this batch
+    in_batch = []  # (question, earlier question in the batch it duplicates)
+    for question, match in zip(questions, matches):
+        token_set = tokens(question.question_text)
+        earlier = None
+        if match is None:
+            earlier = next(
+                (q for q, t in batch_tokens if jaccard(token_set, t) >= config["THRESHOLD"]), None
+            )
+        if match is not None or earlier is not None:
+            if config["ACTION"] == "drop":
+                _count("dropped")
+                continue
+            _count("flagged")
+            if match is not None:
+                question.duplicate_of_id = match[0]
+            else:
+                in_batch.append((question, earlier))
+        else:
+            batch_tokens.append((question, token_set))
+        kept.append(question)
+    _count("checked", len(questions))
+
+    with transaction.atomic():
+        GeneratedQuestion.objects.bulk_create(kept, batch_size=batch_size)
+        # the rows they duplicate only have pks now
+        for question, earlier in in_batch:
+            question.duplicate_of_id = earlier.pk
+        if in_batch:
+            GeneratedQuestion.objects.bulk_update([q for q, _ in in_batch], ["duplicate_of"], batch_size=batch_size)
+        index([q for q in kept if q.duplicate_of_id is None], batch_size=batch_size)
+    return kept
+
+
+def index(questions, batch_size=None):
+    QuestionBand.objects.bulk_create([
+        QuestionBand(key=key, question_id=question.pk)
+        for question in questions
+        for key in band_keys(tokens(question.question_text))
+    ], batch_size=batch_size)
+
+
+def delete_questions(queryset):
+    """
+    Delete the questions in queryset.  Copies flagged as near-duplicates of a
+    deleted question lose their duplicate_of and are indexed in its place.
+    Returns the number of questions deleted.
+    """
+    with transaction.atomic():
+        pks = list(queryset.values_list("pk", flat=True))
+        orphans = list(GeneratedQuestion.objects.filter(duplicate_of__in=pks).exclude(pk__in=pks))
+        _, deleted = GeneratedQuestion.objects.filter(pk__in=pks).delete()
+        index(orphans)
+    return deleted.get(GeneratedQuestion._meta.label, 0)
+
+
+def duplicate_clusters(queryset):
+    """
+    Group near-duplicate questions in queryset.  Only originals that share an
+    LSH key are compared, and each one only against the first member of its
+    key group, so this stays linear in the pool size; flagged questions join
+    the cluster of the original they point at.  Returns a list of clusters
+    (lists of pks, oldest first) with two or more members.
+    """
+    threshold = _config()["THRESHOLD"]
+    bands = QuestionBand.objects.filter(question__in=queryset)
+    shared = bands.values("key").annotate(n=Count("pk")).filter(n__gt=1).values("key")
+    groups = {}
+    for key, question_pk in bands.filter(key__in=shared).values_list("key", "question_id").order_by("question_id"):
+        groups.setdefault(key, []).append(question_pk)
+
+    member_pks = {pk for members in groups.values() for pk in members}
+    member_tokens = {
+        pk: tokens(text)
+        for pk, text in GeneratedQuestion.objects.filter(pk__in=member_pks).values_list("pk", "question_text")
+    }
+
+    parent = {}
+
+    def find(pk):
+        root = pk
+        while parent.get(root, root) != root:
+            root = parent[root]
+        parent[pk] = root
+        return root
+
+    def union(x, y):
+        a, b = find(x), find(y)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    for members in groups.values():
+        head = members[0]
+        for pk in members[1:]:
+            if jaccard(member_tokens[head], member_tokens[pk]) >= threshold:
+                union(head, pk)
+    for pk, original_pk in queryset.filter(duplicate_of__in=queryset).values_list("pk", "duplicate_of_id"):
+        union(original_pk, pk)
+
+    clusters = {}
+    for pk in parent:
+        clusters.setdefault(find(pk), set()).add(pk)
+    return sorted((sorted(c) for c in clusters.values() if len(c) > 1), key=lambda c: c[0])
+
+
+def stats():
+    with _lock:
+        return dict(counters)
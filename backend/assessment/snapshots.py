@@ -0,0 +1,97 @@
+"""
+Webcam snapshot storage.
+
+Uploads are decoded once straight from Django's upload (memory or its own
+temporary file), scaled down to a bounded resolution and re-encoded as JPEG.  A 64-bit difference
+hash (dHash) of each frame is compared with the session's previous frame and
+near-identical frames are skipped.  Stored rows record the uploaded and
+stored byte counts so storage growth can be tracked with a simple Sum().
+"""
+import io
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .models import Snapshot
+
+DEFAULTS = {
+    "MAX_WIDTH": 640,
+    "MAX_HEIGHT": 480,
+    "JPEG_QUALITY": 70,
+    "DUPLICATE_DISTANCE": 4,  # max differing hash bits to count as the same frame
+}
+
+_counter_lock = threading.Lock()
+counters = {
+    "stored": 0,
+    "skipped_duplicates": 0,
+    "bytes_uploaded": 0,
+    "bytes_stored": 0,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "SNAPSHOT_STORAGE", {})}
+
+
+def dhash(image, size=8):
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny greyscale copy."""
+    pixels = list(image.convert("L").resize((size + 1, size), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return "%016x" % bits
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def store(session, upload):
+    """
+    Save an uploaded frame for session.
+
+    Returns the new Snapshot, or None when the frame was skipped as a
+    near-duplicate of the previous one. Raises OSError (including
+    PIL.UnidentifiedImageError) for data that is not a complete image and
+    PIL.Image.DecompressionBombError for one with absurd dimensions.
+    """
+    config = _config()
+    max_size = (config["MAX_WIDTH"], config["MAX_HEIGHT"])
+
+    original_bytes = upload.size
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image.draft("RGB", max_size)  # lets the JPEG decoder downscale while decoding
+        frame = image.convert("RGB")
+    frame.thumbnail(max_size)
+
+    phash = dhash(frame)
+    previous = (
+        Snapshot.objects.filter(session=session).exclude(phash="")
+        .order_by("-pk").values_list("phash", flat=True).first()
+    )
+    if previous and hamming(previous, phash) <= config["DUPLICATE_DISTANCE"]:
+        with _counter_lock:
+            counters["skipped_duplicates"] += 1
+            counters["bytes_uploaded"] += original_bytes
+        return None
+
+    encoded = io.BytesIO()
+    frame.save(encoded, format="JPEG", quality=config["JPEG_QUALITY"], optimize=True)
+    stored_bytes = encoded.tell()
+
+    snapshot = Snapshot(session=session, phash=phash, original_bytes=original_bytes, stored_bytes=stored_bytes)
+    snapshot.image.save("snapshot.jpg", ContentFile(encoded.getvalue()), save=True)
+
+    with _counter_lock:
+        counters["stored"] += 1
+        counters["bytes_uploaded"] += original_bytes
+        counters["bytes_stored"] += stored_bytes
+    return snapshot
+
@@ -0,0 +1,181 @@
+"""
+Server-side grading of subjective answers.
+
+Scores follow scoreSubjective() in src/utils/grader.js, so the server and
+the browser agree: both reference answers and the candidate's answer become
+TF-IDF vectors (IDF over the references plus that one answer), and the
+score is the best cosine similarity against a reference, as a percentage.
+
+Each question's tokenized references (vocabulary, term-frequency matrix and
+document frequencies) are cached in-process, like the answer keys in
+grading.py.  score() grades any number of answers to one question as a
+single batch of matrix operations: a candidate's answer only changes the IDF
+of the terms it contains, so the per-answer IDF is a (answers x vocabulary)
+matrix built from the cached reference frequencies, and every similarity
+comes out of two matrix products.  Terms that appear in no reference only
+add to the answer's norm, so they are summed while tokenizing instead of
+widening the matrix.
+
+NumPy is optional: without it the same arithmetic runs answer by answer.
+Questions without a reference answer keep the old flat BASELINE_SCORE.
+"""
+import math
+import re
+import threading
+from collections import Counter, namedtuple
+
+from .models import Question
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+BASELINE_SCORE = 70  # questions with no reference answer to compare against
+MIN_LENGTH = 3  # shorter answers score 0
+
+Reference = namedtuple("Reference", ["vocab", "tf", "df", "count"])
+
+_lock = threading.Lock()
+_references = {}  # question pk -> Reference, or None when the question has no reference answer
+
+
+def tokenize(text):
+    return re.sub(r"[^a-z0-9\s]", " ", (text or "").lower()).split()
+
+
+def _term_freq(tokens):
+    n = len(tokens) or 1
+    return {term: count / n for term, count in Counter(tokens).items()}
+
+
+def _build_reference(answers):
+    answers = [a for a in answers if a and a.strip()]
+    if not answers:
+        return None
+    freqs = [_term_freq(tokenize(a)) for a in answers]
+    vocab = {}
+    for tf in freqs:
+        for term in tf:
+            vocab.setdefault(term, len(vocab))
+    df = [0] * len(vocab)
+    for tf in freqs:
+        for term in tf:
+            df[vocab[term]] += 1
+    if NUMPY_AVAILABLE:
+        matrix = np.zeros((len(freqs), len(vocab)))
+        for row, tf in enumerate(freqs):
+            for term, value in tf.items():
+                matrix[row, vocab[term]] = value
+        return Reference(vocab, matrix, np.array(df, dtype=float), len(freqs))
+    return Reference(vocab, freqs, df, len(freqs))
+
+
+def load(question_pks):
+    """References for these questions, fetching all cache misses in one query."""
+    found = {pk: _references[pk] for pk in question_pks if pk in _references}
+    missing = [pk for pk in question_pks if pk not in found]
+    if missing:
+        loaded = {pk: None for pk in missing}
+        for pk, reference_answer in Question.objects.filter(pk__in=missing).values_list("pk", "reference_answer"):
+            loaded[pk] = _build_reference([reference_answer])
+        with _lock:
+            _references.update(loaded)
+        found.update(loaded)
+    return found
+
+
+def invalidate(question_pks=None):
+    with _lock:
+        if question_pks is None:
+            _references.clear()
+        else:
+            for pk in question_pks:
+                _references.pop(pk, None)
+
+
+def _round_percent(similarity):
+    # Math.round(sim * 10000) / 100 in grader.js rounds halves up
+    return min(100, math.floor(similarity * 10000 + 0.5) / 100)
+
+
+def score(question_pk, answers):
+    """Scores (0-100) for a list of answers to one question, graded as one batch."""
+    return score_against(load([question_pk])[question_pk], answers)
+
+
+def score_against(reference, answers):
+    """Like score(), given the question's Reference (or None); needs no database access."""
+    if reference is None:
+        return [0 if len((a or "").strip()) < MIN_LENGTH else BASELINE_SCORE for a in answers]
+
+    scores = [0] * len(answers)
+    graded = [i for i, a in enumerate(answers) if isinstance(a, str) and len(a.strip()) >= MIN_LENGTH]
+    if not graded:
+        return scores
+    similarities = (_similarities_numpy if NUMPY_AVAILABLE else _similarities_python)(
+        reference, [tokenize(answers[i]) for i in graded]
+    )
+    for i, similarity in zip(graded, similarities):
+        scores[i] = _round_percent(similarity)
+    return scores
+
+
+def score_many(answers_by_question):
+    """{question_pk: [answers]} -> {question_pk: [scores]}, one batch per question."""
+    references = load(list(answers_by_question))
+    return {pk: score_against(references[pk], answers) for pk, answers in answers_by_question.items()}
+
+
+def _similarities_numpy(reference, token_lists):
+    vocab = reference.vocab
+    answers = np.zeros((len(token_lists), len(vocab)))
+    outside_sq = np.zeros(len(token_lists))  # sum of squared tf of terms no reference uses
+    for row, tokens in enumerate(token_lists):
+        for term, value in _term_freq(tokens).items():
+            col = vocab.get(term)
+            if col is None:
+                outside_sq[row] += value * value
+            else:
+                answers[row, col] = value
+
+    docs = reference.count + 1
+    idf = np.log((docs + 1) / (reference.df + (answers > 0) + 1)) + 1  # answers x vocab
+    outside_idf = math.log((docs + 1) / 2) + 1
+
+    weighted = answers * idf
+    answer_norms = np.sqrt((weighted ** 2).sum(axis=1) + outside_sq * outside_idf ** 2)
+    dots = (weighted * idf) @ reference.tf.T  # answers x references
+    reference_norms = np.sqrt((idf ** 2) @ (reference.tf ** 2).T)
+    reference_norms[reference_norms == 0] = 1
+    answer_norms[answer_norms == 0] = 1
+    similarities = dots / (reference_norms * answer_norms[:, None])
+    return np.clip(similarities.max(axis=1), 0, None).tolist()
+
+
+def _similarities_python(reference, token_lists):
+    docs = reference.count + 1
+    results = []
+    for tokens in token_lists:
+        tf = _term_freq(tokens)
+        idf = {}
+        for term in tf:
+            col = reference.vocab.get(term)
+            ref_df = reference.df[col] if col is not None else 0
+            idf[term] = math.log((docs + 1) / (ref_df + 2)) + 1
+        answer = {term: value * idf[term] for term, value in tf.items()}
+        answer_norm = math.sqrt(sum(v * v for v in answer.values())) or 1
+        best = 0.0
+        for ref_tf in reference.tf:
+            ref_vec = {}
+            for term, value in ref_tf.items():
+                term_idf = idf.get(term)
+                if term_idf is None:
+                    term_idf = math.log((docs + 1) / (reference.df[reference.vocab[term]] + 1)) + 1
+                ref_vec[term] = value * term_idf
+            ref_norm = math.sqrt(sum(v * v for v in ref_vec.values())) or 1
+            dot = sum(v * answer.get(term, 0) for term, v in ref_vec.items())
+            best = max(best, dot / (ref_norm * answer_norm))
+        results.append(best)
+    return results
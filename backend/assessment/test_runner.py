@@ -0,0 +1,20 @@
+"""
+Test runner that stops this process's background workers (event writer,
+generation jobs, grading thread) before the test databases are destroyed,
+so nothing they still hold is written into another database.
+"""
+from django.test.runner import DiscoverRunner
+
+
+def stop_workers():
+    from . import grading_queue, ingest, jobs
+
+    ingest.shutdown()
+    jobs.shutdown()
+    grading_queue.shutdown()
+
+
+class TestRunner(DiscoverRunner):
+    def teardown_databases(self, old_config, **kwargs):
+        stop_workers()
+        super().teardown_databases(old_config, **kwargs)
@@ -1,3 +1,1021 @@
-from django.test import TestCase
+import gzip
+import importlib
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, OperationalError
+from django.utils import timezone
+from PIL import Image
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from benchmarks import loadtest
+
+from .json_stream import ArrayItemParser
+
+from . import (
+    ai_service, analytics, bundles, grading, grading_queue, ingest, item_stats, jobs, metrics, profiling, session_cache,
+    search, signals, similarity, subjective, views,
+)
+from .models import (
+    Company, ExamBundle, GeneratedQuestion, GenerationJob, Option, ProctorEvent, Question, QuestionStat, Session,
+    Snapshot, Test,
+)
+
+
+def make_test(test_id="t1", mcq=2, subjective=0, company_id="acme"):
+    """A test with mcq questions (option a is correct) and subjective ones."""
+    company, _ = Company.objects.get_or_create(id=company_id, defaults={"name": company_id.title()})
+    test = Test.objects.create(company=company, test_id=test_id, title=f"Test {test_id}")
+    for i in range(mcq):
+        question = Question.objects.create(test=test, qid=f"m{i}", text=f"MCQ {i}", type="mcq")
+        Option.objects.create(question=question, option_id="a", text="Right", is_correct=True)
+        Option.objects.create(question=question, option_id="b", text="Wrong", is_correct=False)
+    for i in range(subjective):
+        Question.objects.create(test=test, qid=f"s{i}", text=f"Subjective {i}", type="subjective",
+                                reference_answer="indexes speed up reads at the cost of slower writes")
+    return test
+
+
+class CandidatePayloadTests(TestCase):
+    """Nothing a candidate can fetch carries the answers."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test = make_test()
+
+    def test_catalog_listings_have_no_answers(self):
+        for url in ("/api/companies/", "/api/tests/"):
+            body = self.client.get(url).content.decode()
+            self.assertIn('"option_id":"a"', body)
+            self.assertNotIn("is_correct", body)
+
+    def test_get_test_has_no_answers(self):
+        response = self.client.get("/api/test/t1/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("is_correct", response.content.decode())
+        self.assertEqual(len(json.loads(response.content)["questions"]), 2)
+
+    def test_bundle_is_rebuilt_after_a_question_changes(self):
+        etag = self.client.get("/api/test/t1/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.filter(qid="m0").get().options.filter(option_id="b").update(text="Changed")
+            Option.objects.get(question__qid="m0", option_id="b").save()
+        response = self.client.get("/api/test/t1/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Changed", response.content.decode())
+
+    def test_bundle_stored_after_an_edit_is_not_served(self):
+        self.client.get("/api/test/t1/")
+        with self.captureOnCommitCallbacks(execute=False):
+            # the bundle delete never runs, as when a build that read the old rows stores it afterwards
+            Question.objects.filter(qid="m0").update(text="Edited")
+            signals.test_content_changed(self.test.pk)
+        self.assertIn("Edited", self.client.get("/api/test/t1/").content.decode())
+
+    def test_concurrent_first_build_serves_the_stored_bundle(self):
+        real_build = bundles.build
+
+        def lose_the_race(test):
+            real_build(test)  # the other request's bundle
+            raise IntegrityError("UNIQUE constraint failed: assessment_exambundle.test_id")
+
+        with mock.patch.object(bundles, "build", side_effect=lose_the_race):
+            payload, etag = bundles.get("t1")
+        self.assertEqual(etag, ExamBundle.objects.get(test=self.test).etag)
+        self.assertEqual(json.loads(gzip.decompress(payload))["test_id"], "t1")
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test = make_test()
+
+    def test_unchanged_catalog_is_not_modified(self):
+        etag = self.client.get("/api/companies/")["ETag"]
+        self.assertEqual(self.client.get("/api/companies/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_edit_invalidates_the_catalog(self):
+        etag = self.client.get("/api/tests/")["ETag"]
+        self.test.title = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test.save()
+        response = self.client.get("/api/tests/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Renamed", response.content.decode())
+
+
+class AnswerKeyCacheTests(TestCase):
+    def setUp(self):
+        grading.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test = make_test()
+
+    def test_key_is_cached_until_the_test_changes(self):
+        grading.answer_key(self.test.pk)
+        with self.assertNumQueries(0):
+            grading.answer_key(self.test.pk)
+        Option.objects.filter(question__qid="m0", option_id="a").update(is_correct=False)
+        option = Option.objects.get(question__qid="m0", option_id="b")
+        option.is_correct = True
+        with self.captureOnCommitCallbacks(execute=True):
+            option.save()
+        self.assertEqual([k[3] for k in grading.answer_key(self.test.pk)], ["b", "a"])
+
+    def test_key_built_during_an_edit_is_not_stored(self):
+        real_build = grading._build
+
+        def edited_meanwhile(test_pk):
+            key = real_build(test_pk)
+            grading.invalidate(test_pk)
+            return key
+
+        with mock.patch.object(grading, "_build", side_effect=edited_meanwhile):
+            grading.answer_key(self.test.pk)
+        self.assertNotIn(self.test.pk, grading._keys)
+
+    @override_settings(ANSWER_KEYS={"TTL": 0})
+    def test_expired_key_is_rebuilt(self):
+        grading.answer_key(self.test.pk)
+        with self.assertNumQueries(2):
+            grading.answer_key(self.test.pk)
+
+
+class SubjectiveScoringTests(TestCase):
+    # (reference answers, answer, scoreSubjective() in src/utils/grader.js)
+    cases = [
+        (["indexes speed up reads at the cost of slower writes"], "An index makes reads faster but writes slower", 20.38),
+        (["indexes speed up reads at the cost of slower writes"], "indexes speed up reads at the cost of slower writes", 100),
+        (["indexes speed up reads at the cost of slower writes"], "bananas", 0),
+        (["A process has its own memory; threads share their process's memory.",
+          "Threads share memory, processes do not."], "Threads in one process share memory while processes are isolated",
+         31.8),
+        (["Use a context manager: with open(path) as f"], "with open() as f closes the file, like a context manager", 54.8),
+        (["GIL: only one thread runs Python bytecode at a time"], "ab", 0),
+    ]
+
+    def test_scores_match_the_browser_grader(self):
+        for references, answer, expected in self.cases:
+            score, = subjective.score_against(subjective._build_reference(references), [answer])
+            self.assertAlmostEqual(score, expected, places=2, msg=answer)
+
+    @mock.patch.object(subjective, "NUMPY_AVAILABLE", False)
+    def test_pure_python_scores_match_the_browser_grader(self):
+        self.test_scores_match_the_browser_grader()
+
+    def test_numpy_and_python_similarities_agree(self):
+        if not subjective.NUMPY_AVAILABLE:
+            self.skipTest("numpy is not installed")
+        answers = [subjective.tokenize(answer) for _, answer, _ in self.cases]
+        for references, _, _ in self.cases:
+            matrix = subjective._build_reference(references)
+            with mock.patch.object(subjective, "NUMPY_AVAILABLE", False):
+                plain = subjective._build_reference(references)
+            for a, b in zip(subjective._similarities_numpy(matrix, answers), subjective._similarities_python(plain, answers)):
+                self.assertAlmostEqual(a, b, places=9)
+
+    def test_reference_change_invalidates_the_cache(self):
+        subjective.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):
+            question = make_test(mcq=0, subjective=1).questions.get()
+        answer = "indexes speed up reads at the cost of slower writes"
+        self.assertEqual(subjective.score(question.pk, [answer]), [100])
+        question.reference_answer = "a tuple is immutable"
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertEqual(subjective.score(question.pk, [answer]), [0])
+
+
+class DeferredGradingTests(TestCase):
+    def setUp(self):
+        settings = override_settings(DEFERRED_GRADING={"WORKER": False})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test = make_test(mcq=1, subjective=1)
+
+    def submit(self, username):
+        session_id = self.client.post("/api/start-session/", {"test_id": "t1", "username": username},
+                                      content_type="application/json").json()["session_id"]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/submit/", {"session_id": session_id, "answers": {
+                "m0": "a", "s0": "indexes speed up reads at the cost of slower writes",
+            }}, content_type="application/json")
+        self.assertEqual(response.json()["grading_status"], "pending")
+        return Session.objects.get(session_id=session_id)
+
+    def test_pending_sessions_are_graded(self):
+        sessions = [self.submit(f"user{i}") for i in range(3)]
+        self.assertEqual(grading_queue.grade_pending(), 3)
+        for session in sessions:
+            session.refresh_from_db()
+            self.assertEqual((session.grading_status, session.score_subjective), ("graded", {"s0": 100}))
+            self.assertEqual(session.overall_score, 100)
+
+    def test_abandoned_claim_is_recovered(self):
+        session = self.submit("alice")
+        Session.objects.filter(pk=session.pk).update(
+            grading_status="grading", grading_claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(grading_queue.recover(), 1)
+        self.assertEqual(grading_queue.grade_pending(), 1)
+
+    def test_lost_claim_is_not_written(self):
+        session = self.submit("alice")
+        real_score = grading_queue._score
+
+        def reclaimed_meanwhile(answers_by_question, pool):
+            # another worker recovered the claim and took it over
+            Session.objects.filter(pk=session.pk).update(grading_claimed_at=timezone.now() + timedelta(seconds=1))
+            return real_score(answers_by_question, pool)
+
+        with mock.patch.object(grading_queue, "_score", side_effect=reclaimed_meanwhile):
+            self.assertEqual(grading_queue.grade_batch(), 0)
+        session.refresh_from_db()
+        self.assertEqual((session.grading_status, session.subjective_avg), ("grading", None))
+
+    def test_backfill_marks_legacy_submissions_graded(self):
+        migration = importlib.import_module("assessment.migrations.0014_session_grading_status")
+        question = self.test.questions.get(qid="m0")
+        Session.objects.create(test=self.test, username="scored", score_mcq=50.0)  # submitted before ended
+        answered = Session.objects.create(test=self.test, username="answered")
+        answered.answers.create(question=question, option_id="a", is_correct=True)
+        Session.objects.create(test=self.test, username="ended", ended=timezone.now())
+        Session.objects.create(test=self.test, username="started")
+        migration.mark_submitted_graded(django_apps, None)
+        statuses = dict(Session.objects.values_list("username", "grading_status"))
+        self.assertEqual(statuses, {"scored": "graded", "answered": "graded", "ended": "graded", "started": ""})
+
+
+class KeysetPaginationTests(TestCase):
+    def pages(self, url, key, limit=2):
+        items, cursor = [], None
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(url, params).json()
+            items.extend(data[key])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return items
+
+    def test_question_pool_pages_through_ties(self):
+        for i in range(5):
+            GeneratedQuestion.objects.create(topic="Python", question_text=f"Question {i}", question_type="subjective")
+        GeneratedQuestion.objects.filter(pk__lte=GeneratedQuestion.objects.order_by("pk")[2].pk).update(
+            generated_at=timezone.now() - timedelta(days=1)  # three share a timestamp
+        )
+        ids = [q["id"] for q in self.pages("/api/hr/generated-questions/", "questions")]
+        expected = list(GeneratedQuestion.objects.order_by("-generated_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_candidates_page_through_ties_and_unscored(self):
+        test = make_test()
+        now = timezone.now()
+        for i, score in enumerate([80.0, 55.5, 80.0, None, 55.5, None, 91.0]):
+            Session.objects.create(test=test, username=f"user{i}", ended=now, overall_score=score,
+                                   grading_status="graded")
+        names = [c["username"] for c in self.pages("/api/hr/candidates/t1/", "candidates")]
+        export = self.client.get("/api/hr/candidates/t1/", {"export": "ndjson"})
+        exported = [json.loads(line)["username"] for line in b"".join(export.streaming_content).splitlines()]
+        self.assertEqual(names, ["user6", "user2", "user0", "user4", "user1", "user5", "user3"])
+        self.assertEqual(exported, names)
+
+
+class QuestionSearchTests(TestCase):
+    def search(self, text):
+        response = self.client.get("/api/hr/generated-questions/", {"q": text})
+        return sorted(q["id"] for q in response.json()["questions"])
+
+    def create(self, text):
+        return GeneratedQuestion.objects.create(topic="Python", question_text=text, question_type="subjective")
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        decorators = self.create("What does a Python decorator do?")
+        closures = self.create("Explain closures in JavaScript")
+        self.assertEqual(self.search("decorators"), [decorators.pk])
+        self.assertEqual(self.search("clos"), [closures.pk])
+
+        closures.question_text = "Explain generators in Python"
+        closures.save()
+        self.assertEqual(self.search("closures"), [])
+        self.assertEqual(self.search("python"), [decorators.pk, closures.pk])
+
+        decorators.delete()
+        self.assertEqual(self.search("decorator"), [])
+        self.assertEqual(self.search("python"), [closures.pk])
+
+    def test_substring_match_without_fts5(self):
+        decorators = self.create("What does a Python decorator do?")
+        self.create("Explain closures in JavaScript")
+        with mock.patch.dict(search._fts_tables, {"default": False}):
+            self.assertEqual(self.search("decorat"), [decorators.pk])
+            self.assertEqual(self.search("python DECORATOR"), [decorators.pk])
+
+
+class QuestionSearchMigrationTests(SimpleTestCase):
+    def test_migration_triggers_match_the_live_ones(self):
+        # 0012 creates the triggers, post_migrate only restores missing ones; a change here needs a migration
+        migration = importlib.import_module("assessment.migrations.0012_question_pool_search")
+        self.assertEqual(migration.SQLITE_TRIGGERS, search._SQLITE_TRIGGERS)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_endpoint_is_closed_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        with override_settings(REQUEST_METRICS={"TOKEN": "secret"}):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            response = self.client.get("/metrics", headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_streamed_response_is_recorded_once_sent(self):
+        test = make_test()
+        for i in range(3):
+            Session.objects.create(test=test, username=f"user{i}", ended=timezone.now(), overall_score=50.0)
+        response = self.client.get("/api/hr/candidates/t1/", {"export": "ndjson"})
+        self.assertNotIn("get_candidates", metrics.render())
+        body = b"".join(response.streaming_content)
+        observed = metrics._views["assessment.views.get_candidates"]
+        self.assertEqual(observed.duration.count, 1)
+        self.assertEqual(observed.response_size.sum, len(body))
+        self.assertGreater(observed.queries.sum, 1)  # the export's rows are read while streaming
+
+
+@override_settings(PROFILING={"TOKEN": "secret"})
+class ProfilingTokenTests(TestCase):
+    def test_token_is_only_read_from_the_header(self):
+        self.addCleanup(profiling.clear)
+        self.assertEqual(self.client.get("/api/profiles/", {"profile_token": "secret"}).status_code, 403)
+        response = self.client.get("/api/companies/", {"profile": "cprofile", "profile_token": "secret"})
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.client.get("/api/companies/", {"profile": "cprofile"}, headers={"X-Profile-Token": "secret"})
+        self.assertIn("X-Profile-Id", response)
+        self.assertEqual(self.client.get("/api/profiles/", headers={"X-Profile-Token": "secret"}).status_code, 200)
+
+
+class ArrayItemParserTests(SimpleTestCase):
+    stream = (
+        'Here you go:\n```json\n[\n'
+        '  {"question_text": "What does {} mean in \\"f-strings\\"?", "options": [{"text": "]"}]},\n'
+        '  {"question_text": broken},\n'
+        '  {"question_text": "Back\\\\slash", "nested": {"a": [1, 2]}}\n'
+        ']\n```'
+    )
+    expected = [
+        {"question_text": 'What does {} mean in "f-strings"?', "options": [{"text": "]"}]},
+        {"question_text": "Back\\slash", "nested": {"a": [1, 2]}},
+    ]
+
+    def parse(self, pieces):
+        parser = ArrayItemParser()
+        items = [item for piece in pieces for item in parser.feed(piece)]
+        return items, parser.errors
+
+    def test_whole_stream(self):
+        self.assertEqual(self.parse([self.stream]), (self.expected, 1))
+
+    def test_any_split(self):
+        for cut in range(1, len(self.stream)):
+            self.assertEqual(self.parse([self.stream[:cut], self.stream[cut:]]), (self.expected, 1), cut)
+
+    def test_one_character_at_a_time(self):
+        self.assertEqual(self.parse(list(self.stream)), (self.expected, 1))
+
+    def test_items_arrive_before_the_array_closes(self):
+        parser = ArrayItemParser()
+        head = self.stream[:self.stream.index("}]},") + 3]
+        self.assertEqual(parser.feed(head), self.expected[:1])
+
+
+class AnalyticsParityTests(TestCase):
+    """The aggregate queries in analytics.py against the per-row loop they replaced."""
+
+    def setUp(self):
+        now = timezone.now()
+        scored = make_test("scored")
+        for i, score in enumerate([100.0, 90.0, 89.99, 75.5, 60.0, 59.99, 33.333, 0.0, None]):
+            Session.objects.create(test=scored, username=f"user{i}", score_mcq=score, ended=now)
+        Session.objects.create(test=scored, username="in-progress")
+        unanswered = make_test("unanswered")  # submitted with nothing scored, and never submitted
+        Session.objects.create(test=unanswered, username="blank", ended=now)
+        Session.objects.create(test=unanswered, username="idle")
+        make_test("empty", mcq=0)  # no sessions and no questions
+
+    @staticmethod
+    def loop_summary(test):
+        sessions = Session.objects.filter(test=test)
+        total_attempts = sessions.count()
+        completed = sessions.filter(ended__isnull=False).count()
+        mcq_scores = [s.score_mcq for s in sessions if s.score_mcq is not None]
+        avg_mcq = sum(mcq_scores) / len(mcq_scores) if mcq_scores else 0
+        return {
+            "total_attempts": total_attempts,
+            "completed": completed,
+            "in_progress": total_attempts - completed,
+            "average_score": round(avg_mcq, 2),
+            "score_distribution": {
+                "90-100": len([s for s in mcq_scores if 90 <= s <= 100]),
+                "80-89": len([s for s in mcq_scores if 80 <= s < 90]),
+                "70-79": len([s for s in mcq_scores if 70 <= s < 80]),
+                "60-69": len([s for s in mcq_scores if 60 <= s < 70]),
+                "0-59": len([s for s in mcq_scores if 0 <= s < 60]),
+            },
+        }
+
+    def test_test_summary_matches_the_loop(self):
+        for test in Test.objects.all():
+            with self.assertNumQueries(1):
+                summary = analytics.test_summary(test)
+            summary.pop("grading_pending")
+            self.assertEqual(summary, self.loop_summary(test), test.test_id)
+
+    def test_all_tests_summary_matches_the_loop(self):
+        with self.assertNumQueries(3):
+            rows = analytics.all_tests_summary()
+        expected = []
+        for test in Test.objects.order_by("pk"):
+            summary = self.loop_summary(test)
+            expected.append({
+                "test_id": test.test_id,
+                "test_title": test.title,
+                "company": test.company.name,
+                "total_attempts": summary["total_attempts"],
+                "completed": summary["completed"],
+                "average_score": summary["average_score"],
+                "question_count": test.questions.count(),
+            })
+        for row in rows:
+            row.pop("grading_pending")
+        self.assertEqual(rows, expected)
+
+
+class ItemStatisticsTests(TestCase):
+    # responses to m0, m1, m2 (option a is correct); MCQ scores 100, 33.33, 33.33, 33.33, 0
+    submissions = [("a", "a", "a"), ("a", "b", "b"), ("b", "a", "zz"), ("hack", "a", "b"), ("b", "", "b")]
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_test(mcq=3)
+        for i, responses in enumerate(self.submissions):
+            session_id = self.client.post("/api/start-session/", {"test_id": "t1", "username": f"user{i}"},
+                                          content_type="application/json").json()["session_id"]
+            answers = dict(zip(["m0", "m1", "m2"], responses))
+            self.client.post("/api/submit/", {"session_id": session_id, "answers": answers},
+                             content_type="application/json")
+        questions = self.client.get("/api/hr/question-performance/t1/").json()["questions"]
+        self.report = {q["question_id"]: q for q in questions}
+
+    def test_p_value_and_discrimination(self):
+        # mean score 40, standard deviation 32.658; e.g. m0: (66.665 - 40) / 32.658 * sqrt(0.4 / 0.6)
+        expected = {"m0": (0.4, 0.6667), "m1": (0.6, 0.5833), "m2": (0.2, 0.9186)}
+        self.assertEqual({qid: (q["p_value"], q["discrimination"]) for qid, q in self.report.items()}, expected)
+        self.assertEqual([self.report[qid]["answered"] for qid in ("m0", "m1", "m2")], [5, 4, 5])
+
+    def test_distractor_counts_keep_unknown_responses_in_one_bucket(self):
+        counts = {qid: ({o["option_id"]: o["times_chosen"] for o in q["options"]}, q["other_responses"])
+                  for qid, q in self.report.items()}
+        self.assertEqual(counts, {"m0": ({"a": 2, "b": 2}, 1), "m1": ({"a": 3, "b": 1}, 0), "m2": ({"a": 1, "b": 3}, 1)})
+        for stat in QuestionStat.objects.all():
+            self.assertLessEqual(set(stat.option_counts), {"a", "b", item_stats.OTHER_RESPONSES})
+
+
+class SessionCacheTests(TestCase):
+    def info(self, name):
+        return session_cache.SessionInfo(name, name, 1, name, False)
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = session_cache.SessionCache(max_entries=2, ttl=60)
+        cache.put(self.info("a"))
+        cache.put(self.info("b"))
+        self.assertEqual(cache.get("a").pk, "a")  # now b is the least recently used
+        cache.put(self.info("c"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual([cache.get(key).pk for key in ("a", "c")], ["a", "c"])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["size"]), (3, 1, 1, 2))
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = session_cache.SessionCache(max_entries=10, ttl=60)
+        with mock.patch("time.monotonic", return_value=1000.0):
+            cache.put(self.info("a"))
+        with mock.patch("time.monotonic", return_value=1059.0):
+            self.assertIsNotNone(cache.get("a"))
+        with mock.patch("time.monotonic", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual((cache.stats()["expirations"], cache.stats()["size"]), (1, 0))
+
+    def test_submitted_session_is_not_served_from_the_cache(self):
+        session_cache.cache.clear()
+        self.addCleanup(session_cache.cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_test()
+        session_id = self.client.post("/api/start-session/", {"test_id": "t1", "username": "alice"},
+                                      content_type="application/json").json()["session_id"]
+        with self.assertNumQueries(0):
+            self.assertFalse(session_cache.lookup(session_id).ended)
+        response = self.client.post("/api/submit/", {"session_id": session_id, "answers": {"m0": "a"}},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(session_cache.cache.get(uuid.UUID(session_id)))
+        self.assertTrue(session_cache.lookup(session_id).ended)
+        response = self.client.post("/api/submit/", {"session_id": session_id, "answers": {"m0": "b"}},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
+
+class EventBatchTests(TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(test=make_test(), username="alice")
+
+    def post(self, events):
+        return self.client.post("/api/log/batch/", {"session_id": str(self.session.session_id), "events": events},
+                                content_type="application/json")
+
+    def test_each_record_gets_its_own_status(self):
+        response = self.post([
+            {"event": "tab_switch", "client_ts": 1760000000000},
+            {"client_ts": 1760000000000},
+            {"event": "blur", "client_ts": "2026-10-18T10:00:00Z"},
+            {"event": "blur", "client_ts": "yesterday"},
+            {"event": "blur", "client_ts": 10 ** 20},
+            {"event": "focus"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([r["status"] for r in data["results"]], ["ok", "error", "ok", "error", "error", "ok"])
+        self.assertEqual((data["accepted"], data["rejected"]), (3, 3))
+        stored = list(ProctorEvent.objects.order_by("pk").values_list("event_type", "client_ts"))
+        self.assertEqual([event_type for event_type, _ in stored], ["tab_switch", "blur", "focus"])
+        self.assertEqual(stored[1][1].isoformat(), "2026-10-18T10:00:00+00:00")
+        self.assertIsNone(stored[2][1])
+
+    def test_batch_size_is_bounded(self):
+        self.assertEqual(self.post([{"event": "blur"}] * (views.MAX_EVENT_BATCH + 1)).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post({"event": "blur"}).status_code, 400)
+        self.assertFalse(ProctorEvent.objects.exists())
+
+
+class EventBufferTests(TransactionTestCase):
+    def setUp(self):
+        self.session = Session.objects.create(test=make_test(), username="alice")
+        self.buffer = ingest.EventBuffer(max_queue=100, batch_size=50, flush_interval=1.0, put_timeout=0,
+                                         write_retries=2, retry_backoff=0)
+
+    def queue(self, *event_types):
+        for event_type in event_types:
+            self.buffer._queue.put((self.session.pk, event_type, timezone.now()))
+
+    def test_log_event_rejects_a_missing_event_type(self):
+        response = self.client.post("/api/log/", {"session_id": str(self.session.session_id)},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_event_only_costs_itself(self):
+        self.queue(*["tab_switch"] * 5, None, *["tab_switch"] * 5)
+        with self.assertLogs("assessment.ingest", "ERROR"):
+            self.assertEqual(self.buffer.flush(), 10)
+        self.assertEqual(ProctorEvent.objects.count(), 10)
+        self.assertEqual(self.buffer.stats()["failed"], 1)
+
+    def test_locked_database_is_retried(self):
+        real_bulk_create = ProctorEvent.objects.bulk_create
+        attempts = []
+
+        def locked_once(objs, *args, **kwargs):
+            attempts.append(len(objs))
+            if len(attempts) == 1:
+                raise OperationalError("database is locked")
+            return real_bulk_create(objs, *args, **kwargs)
+
+        self.queue("blur", "focus")
+        with mock.patch.object(ProctorEvent.objects, "bulk_create", side_effect=locked_once), \
+                self.assertLogs("assessment.ingest", "WARNING"):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(attempts, [2, 2])
+        self.assertEqual(self.buffer.stats()["retries"], 1)
+
+    def test_batch_is_requeued_while_the_database_is_down(self):
+        self.queue("blur", "focus")
+        with mock.patch.object(ProctorEvent.objects, "bulk_create", side_effect=OperationalError("locked")), \
+                self.assertLogs("assessment.ingest", "WARNING"):
+            self.assertEqual(self.buffer.flush(), 0)
+        stats = self.buffer.stats()
+        self.assertEqual((stats["requeued"], stats["failed"], stats["queue_depth"]), (2, 0, 2))
+        self.assertEqual(self.buffer.flush(), 2)
+
+    def test_shutdown_writes_what_is_queued(self):
+        buffer = ingest.get_buffer()
+        self.assertTrue(buffer.submit(self.session.pk, "blur"))
+        ingest.shutdown()
+        self.assertFalse(buffer._thread.is_alive())
+        self.assertEqual(ProctorEvent.objects.count(), 1)
+        self.assertIsNot(ingest.get_buffer(), buffer)
+
+
+class WorkerShutdownTests(TransactionTestCase):
+    @override_settings(DEFERRED_GRADING={"WORKER": True, "POLL_INTERVAL": 60})
+    def test_grading_thread_stops(self):
+        grading_queue.ensure_started()
+        thread = grading_queue._thread
+        grading_queue.shutdown()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(grading_queue._thread)
+
+
+class QuestionPromotionTests(TestCase):
+    def setUp(self):
+        Company.objects.create(id="acme", name="Acme")
+        self.mcq = GeneratedQuestion.objects.create(
+            topic="SQL", question_text="Which is a join?", question_type="mcq", correct_answer="INNER",
+            options=[{"text": "INNER", "is_correct": True}, {"text": "OUTSIDE", "is_correct": False}],
+        )
+        self.subjective = GeneratedQuestion.objects.create(
+            topic="SQL", question_text="Why index?", question_type="subjective", correct_answer="Faster reads",
+        )
+
+    def promote(self, *questions):
+        return self.client.post("/api/hr/select-questions/", {
+            "question_ids": [q.pk for q in questions], "company_id": "acme", "test_title": "SQL basics",
+        }, content_type="application/json")
+
+    def test_questions_are_copied_into_a_new_test(self):
+        response = self.promote(self.mcq, self.subjective)
+        self.assertEqual(response.status_code, 200)
+        test = Test.objects.get(test_id=response.json()["test_id"])
+        self.assertEqual(list(test.questions.order_by("qid").values_list("qid", "type")),
+                         [("q1", "mcq"), ("q2", "subjective")])
+        correct = Option.objects.filter(question__test=test, is_correct=True).values_list("text", flat=True)
+        self.assertEqual(list(correct), ["INNER"])
+        self.assertEqual(GeneratedQuestion.objects.filter(is_selected=True, selected_for_test=test).count(), 2)
+
+    def test_failure_part_way_leaves_nothing_behind(self):
+        with mock.patch.object(Option.objects, "bulk_create", side_effect=DatabaseError("disk full")), \
+                self.assertRaises(DatabaseError):
+            self.promote(self.mcq, self.subjective)
+        self.assertFalse(Test.objects.exists())
+        self.assertFalse(Question.objects.exists())
+        self.assertFalse(GeneratedQuestion.objects.filter(is_selected=True).exists())
+
+    def test_claimed_questions_are_not_promoted_twice(self):
+        self.assertEqual(self.promote(self.mcq).status_code, 200)
+        self.assertEqual(self.promote(self.mcq).status_code, 400)
+        self.assertEqual(self.promote(self.subjective, self.mcq).status_code, 400)
+        self.assertEqual((Test.objects.count(), Question.objects.count()), (1, 1))
+        self.subjective.refresh_from_db()
+        self.assertFalse(self.subjective.is_selected)
+
+
+class GeneratedQuestionSaveTests(TestCase):
+    texts = [
+        "What does the GIL protect in CPython?",
+        "Explain the difference between a list and a tuple.",
+        "How does a context manager release its resource?",
+    ]
+
+    def generated(self):
+        return [jobs.new_generated_question({"question_text": t}, "Python", "medium", None) for t in self.texts]
+
+    def test_cache_hit_returns_the_saved_rows(self):
+        first = jobs.save_generated(self.generated(), cached=False)
+        job = GenerationJob.objects.create(topic="Python", count=3)
+        again = jobs.save_generated(self.generated(), cached=True, job=job)
+        self.assertEqual({q.pk for q in again}, {q.pk for q in first})
+        self.assertEqual(GeneratedQuestion.objects.count(), 3)
+        self.assertFalse(GeneratedQuestion.objects.filter(duplicate_of__isnull=False).exists())
+        self.assertEqual(job.questions.count(), 3)
+
+    def test_cache_hit_inserts_rows_no_longer_in_the_pool(self):
+        jobs.save_generated(self.generated(), cached=False)
+        GeneratedQuestion.objects.filter(question_text=self.texts[0]).delete()
+        again = jobs.save_generated(self.generated(), cached=True)
+        self.assertEqual(len(again), 3)
+        self.assertEqual(GeneratedQuestion.objects.count(), 3)
+
+    def test_topic_must_be_a_string(self):
+        for url in ("/api/hr/generate-questions/", "/api/hr/generation-jobs/"):
+            for topic in (5, ["Python"], "  "):
+                response = self.client.post(url, {"topic": topic, "count": 1}, content_type="application/json")
+                self.assertEqual(response.status_code, 400, (url, topic))
+
+
+class NearDuplicateIndexTests(SimpleTestCase):
+    def test_migration_keys_match_the_live_index(self):
+        # rows indexed by 0011 must be found by similarity.py; a change there needs a reindexing migration
+        migration = importlib.import_module("assessment.migrations.0011_near_duplicates")
+        for text in ("What is a Python decorator?", "Explain closures in JavaScript", "", "the of and"):
+            self.assertEqual(migration.band_keys(migration.tokens(text)), similarity.band_keys(similarity.tokens(text)))
+
+
+class NearDuplicateTests(TestCase):
+    ORIGINAL = "What is the difference between a list and a tuple in Python programming?"
+    COPY = "What is the difference between a list and a tuple in Python programming language?"
+    OTHER = "Explain how garbage collection works in the Java virtual machine."
+
+    def save(self, *texts):
+        return similarity.save_questions([
+            GeneratedQuestion(topic="Python", question_text=text, question_type="subjective") for text in texts
+        ])
+
+    def test_copies_are_flagged_and_not_indexed(self):
+        original, copy, other = self.save(self.ORIGINAL, self.COPY, self.OTHER)
+        later, = self.save(self.COPY + " Explain.")
+        self.assertIsNone(original.duplicate_of_id)
+        self.assertIsNone(other.duplicate_of_id)
+        self.assertEqual(copy.duplicate_of_id, original.pk)
+        self.assertEqual(later.duplicate_of_id, original.pk)
+        indexed = set(similarity.QuestionBand.objects.values_list("question_id", flat=True))
+        self.assertEqual(indexed, {original.pk, other.pk})
+
+    @override_settings(NEAR_DUPLICATES={"ACTION": "drop"})
+    def test_drop_does_not_store_copies(self):
+        self.save(self.ORIGINAL)
+        kept = self.save(self.COPY, self.OTHER)
+        self.assertEqual([q.question_text for q in kept], [self.OTHER])
+        self.assertEqual(GeneratedQuestion.objects.count(), 2)
+
+    def test_dedupe_reports_and_deletes_copies(self):
+        original, copy, other = self.save(self.ORIGINAL, self.COPY, self.OTHER)
+        later, = self.save(self.COPY + " Explain.")
+        response = self.client.post("/api/hr/dedupe-questions/", {"topic": "Python"}, content_type="application/json")
+        self.assertEqual(response.json()["clusters"], [{"keep": original.pk, "duplicates": [copy.pk, later.pk]}])
+        self.assertEqual(response.json()["deleted_count"], 0)
+
+        response = self.client.post("/api/hr/dedupe-questions/", {"apply": True}, content_type="application/json")
+        self.assertEqual(response.json()["deleted_count"], 2)
+        self.assertEqual(set(GeneratedQuestion.objects.values_list("pk", flat=True)), {original.pk, other.pk})
+
+    def test_deleting_an_original_indexes_its_copies(self):
+        original, copy = self.save(self.ORIGINAL, self.COPY)
+        response = self.client.delete("/api/hr/delete-questions/", {"question_ids": [original.pk]},
+                                      content_type="application/json")
+        self.assertEqual(response.json()["deleted_count"], 1)
+        copy.refresh_from_db()
+        self.assertIsNone(copy.duplicate_of_id)
+        self.assertEqual(similarity.find_duplicates([self.ORIGINAL])[0][0], copy.pk)
+
+
+class FailingClient:
+    """An OpenAI-style client whose every request fails."""
+
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+        self.requests = 0
+
+    def create(self, **kwargs):
+        self.requests += 1
+        raise TimeoutError("request timed out")
+
+
+class QuestionClient:
+    """An OpenAI-style client that answers every (non-streamed) request with fresh subjective questions."""
+
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+        self.requests = 0
+
+    def create(self, max_tokens, **kwargs):
+        self.requests += 1
+        count = (max_tokens - 200) // 300
+        questions = [{"question_text": f"Question {self.requests}.{i}", "type": "subjective",
+                      "correct_answer": "An answer"} for i in range(count)]
+        message = SimpleNamespace(content=json.dumps(questions))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@override_settings(AI_GENERATION={"STREAM": False, "CHUNK_SIZE": 2}, GENERATION_CACHE={"ENABLED": False})
+class GenerationStreamTests(TestCase):
+    def setUp(self):
+        for patcher in (mock.patch.object(ai_service, "OPENAI_AVAILABLE", True),
+                        mock.patch.object(ai_service, "client", QuestionClient(), create=True),
+                        mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def generate(self, stream):
+        response = self.client.post("/api/hr/generate-questions/", {"topic": "Python", "count": 5, "stream": stream},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def check(self, events):
+        questions = [data["question"] for kind, data in events if kind == "question"]
+        saved = dict(GeneratedQuestion.objects.values_list("pk", "question_text"))
+        self.assertEqual(len(questions), 5)
+        self.assertEqual({q["id"]: q["question_text"] for q in questions}, saved)
+        kind, done = events[-1]
+        self.assertEqual(kind, "done")
+        self.assertEqual((done["success"], done["count"], done["generation"]["source"]), (True, 5, "openai"))
+        self.assertEqual(done["generation"]["chunks"], 3)
+
+    def test_count_is_bounded(self):
+        for count in (0, 10_000, "many", None, True, [5]):
+            response = self.client.post("/api/hr/generate-questions/", {"topic": "Python", "count": count},
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 400, count)
+        self.assertEqual(ai_service.client.requests, 0)
+
+    def test_ndjson_events_carry_saved_ids(self):
+        lines = [json.loads(line) for line in self.generate("ndjson").splitlines()]
+        self.check([(line.pop("type"), line) for line in lines])
+
+    def test_sse_events_carry_saved_ids(self):
+        events = []
+        for block in self.generate("sse").strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        self.check(events)
+
+
+class SlowQuestionClient(QuestionClient):
+    def create(self, **kwargs):
+        time.sleep(0.05)
+        return super().create(**kwargs)
+
+
+@override_settings(AI_GENERATION={"STREAM": False, "CHUNK_SIZE": 10, "MAX_WORKERS": 2},
+                   GENERATION_CACHE={"ENABLED": False})
+class GenerationCancelTests(SimpleTestCase):
+    def test_closing_the_generator_stops_further_requests(self):
+        client = SlowQuestionClient()
+        questions = ai_service.iter_questions("Python", 200, client=client)
+        next(questions)
+        start = time.monotonic()
+        questions.close()
+        self.assertLess(time.monotonic() - start, 0.05)
+        time.sleep(0.3)  # long enough for every queued chunk to have been sent
+        self.assertLessEqual(client.requests, 4)  # each worker's first chunk, and the next one it may have started
+
+
+class GenerationJobTests(TestCase):
+    def test_count_is_bounded(self):
+        for count in (0, 10_000, "many", None):
+            response = self.client.post("/api/hr/generation-jobs/", {"topic": "Python", "count": count},
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 400, count)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    @override_settings(AI_GENERATION={"RETRIES": 1, "ROUNDS": 1, "CHUNK_SIZE": 10}, GENERATION_CACHE={"ENABLED": False})
+    def test_every_request_attempt_is_a_heartbeat(self):
+        client = FailingClient()
+        beats = []
+        list(ai_service.iter_questions("Python", 10, client=client, on_attempt=lambda: beats.append(1)))
+        self.assertEqual(len(beats), client.requests)
+        self.assertEqual(client.requests, 2)
+
+    def test_stale_after_outlasts_a_chunk_with_retries(self):
+        ai = ai_service._config()
+        self.assertGreater(jobs._config()["STALE_AFTER"], ai["TIMEOUT"] * (ai["RETRIES"] + 1))
+
+    def test_recover_requeues_only_silent_jobs(self):
+        now = timezone.now()
+        silent = GenerationJob.objects.create(topic="Python", count=5, status="running",
+                                              heartbeat_at=now - timedelta(hours=1))
+        alive = GenerationJob.objects.create(topic="Python", count=5, status="running", heartbeat_at=now)
+        with mock.patch.object(jobs, "_schedule", return_value=True) as schedule:
+            self.assertEqual(jobs.recover(), 1)
+        schedule.assert_called_once_with(silent.pk)
+        silent.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((silent.status, alive.status), ("queued", "running"))
+
+
+def jpeg(width=64, height=48, color=(90, 120, 200)):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class SnapshotUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.session = Session.objects.create(test=make_test(), username="alice")
+
+    def upload(self, data):
+        return self.client.post("/api/upload-snapshot/", {
+            "session_id": str(self.session.session_id),
+            "image": SimpleUploadedFile("snapshot.jpg", data, content_type="image/jpeg"),
+        })
+
+    def test_frame_is_stored(self):
+        response = self.upload(jpeg())
+        self.assertEqual(response.status_code, 200)
+        snapshot = Snapshot.objects.get()
+        self.assertEqual(snapshot.original_bytes, len(jpeg()))
+
+    def test_bad_images_are_rejected(self):
+        frame = jpeg(640, 480)
+        for data in (b"not an image", frame[:len(frame) // 2]):
+            self.assertEqual(self.upload(data).status_code, 400)
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            self.assertEqual(self.upload(frame).status_code, 400)
+        self.assertFalse(Snapshot.objects.exists())
+
+
+@override_settings(ROOT_URLCONF="exam_backend.asgi_urls")
+class AsyncSnapshotUploadTests(SnapshotUploadTests):
+    """The same uploads through the async view, as the ASGI process routes them."""
+
+    def upload(self, data):
+        return async_to_sync(self.async_client.post)("/api/upload-snapshot/", {
+            "session_id": str(self.session.session_id),
+            "image": SimpleUploadedFile("snapshot.jpg", data, content_type="image/jpeg"),
+        })
+
+    def test_streaming_hr_routes_stay_on_wsgi(self):
+        self.assertEqual(self.client.get("/api/hr/candidates/t1/?export=ndjson").status_code, 404)
+
+
+class ExamDayScenarioTests(TransactionTestCase):
+    """
+    A small cohort through the whole exam over HTTP (benchmarks/loadtest.py).
+    The in-memory test database takes one writer at a time, so the server
+    handles requests one by one, events are written inline and grading is
+    left to the test.
+    """
+
+    scenario = loadtest.Scenario(candidates=4, duration=2.0, event_interval=0.4, snapshot_interval=0.9)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name,
+            PROCTOR_EVENT_BUFFER={"ENABLED": False},
+            DEFERRED_GRADING={"WORKER": False},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_cohort_completes_without_errors(self):
+        test_id, answers = loadtest.seed()
+        with loadtest.local_server(threaded=False) as base_url:
+            report = loadtest.run(base_url, self.scenario, test_id, answers)
+
+        endpoints = report["endpoints"]
+        self.assertEqual(set(endpoints), set(loadtest.ENDPOINTS))
+        for name, stats in endpoints.items():
+            self.assertEqual(stats["errors"], 0, f"{name}: {stats['statuses']}")
+        self.assertEqual(endpoints["start_session"]["requests"], self.scenario.candidates)
+        self.assertEqual(endpoints["submit_test"]["requests"], self.scenario.candidates)
+
+        self.assertEqual(Session.objects.filter(ended__isnull=False).count(), self.scenario.candidates)
+        self.assertGreaterEqual(ProctorEvent.objects.count(), endpoints["log_events_batch"]["requests"])
+        self.assertEqual(Snapshot.objects.count(), endpoints["upload_snapshot"]["requests"])
+        self.assertEqual(grading_queue.grade_pending(), self.scenario.candidates)
+        self.assertFalse(Session.objects.exclude(grading_status="graded").exists())
+
+
+class BaselineComparisonTests(SimpleTestCase):
+    scenario = loadtest.Scenario(candidates=10, duration=5.0, event_interval=1.0, snapshot_interval=2.0)._asdict()
+
+    def report(self, p50=10.0, p95=20.0, error_rate=0.0, throughput=5.0):
+        return {
+            "scenario": dict(self.scenario),
+            "endpoints": {
+                "submit_test": {"requests": 10, "p50": p50, "p95": p95, "error_rate": error_rate,
+                                "throughput": throughput},
+            },
+        }
+
+    def test_within_limits(self):
+        self.assertEqual(loadtest.compare(self.report(p95=30.0, throughput=4.0), self.report()), [])
+
+    def test_slower_endpoint_regresses(self):
+        regressions = loadtest.compare(self.report(p95=60.0), self.report())
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("submit_test: p95", regressions[0])
+
+    def test_more_errors_regress(self):
+        self.assertTrue(loadtest.compare(self.report(error_rate=0.05), self.report()))
+
+    def test_lower_throughput_regresses(self):
+        self.assertTrue(loadtest.compare(self.report(throughput=2.0), self.report()))
+
+    def test_missing_endpoint_regresses(self):
+        report = self.report()
+        report["endpoints"] = {}
+        self.assertIn("no requests", loadtest.compare(report, self.report())[0])
+
+    def test_different_scenario_is_not_compared(self):
+        report = self.report()
+        report["scenario"]["candidates"] = 50
+        self.assertIn("differs", loadtest.compare(report, self.report())[0])
@@ -2,32 +2,81 @@ from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import Company, Test, Question, Option, Session, Snapshot, ProctorEvent, HRUser, GeneratedQuestion
-from .serializers import CompanySerializer, TestSerializer, SessionSerializer
-from .ai_service import generate_questions
+from .models import Company, Test, Question, Option, Session, Snapshot, ProctorEvent, HRUser, GeneratedQuestion, GenerationJob
+from .serializers import SessionSerializer
+from .ai_service import iter_questions
+from . import analytics, bundles, catalog, grading, grading_queue, ingest, item_stats, jobs, metrics, profiling, search, session_cache, signals, similarity, snapshots
+from PIL import Image
+from datetime import datetime, timezone as dt_timezone
+import base64
+import csv
+import gzip
+import itertools
+import json
+import time
 import uuid
 
+
+def _session_not_found():
+    return Response({"error": "Session not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+def _already_submitted():
+    return Response({"error": "Session already submitted"}, status=status.HTTP_409_CONFLICT)
+
+
+def _not_modified(request, etag):
+    return etag in parse_etags(request.headers.get("If-None-Match", ""))
+
+
+def _catalog_response(request, name):
+    body, etag = catalog.get(name)
+    if _not_modified(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
 # LIST ALL COMPANIES + TESTS
 @api_view(["GET"])
 def get_companies(request):
-    return Response(CompanySerializer(Company.objects.all(), many=True).data)
+    return _catalog_response(request, "companies")
 
 # LIST ALL TESTS
 @api_view(["GET"])
 def get_all_tests(request):
-    tests = Test.objects.all()
-    return Response(TestSerializer(tests, many=True).data)
+    return _catalog_response(request, "tests")
 
 # GET TEST DETAILS
 @api_view(["GET"])
 def get_test(request, test_id):
     try:
-        test = Test.objects.get(test_id=test_id)
-    except:
+        payload, etag = bundles.get(test_id)
+    except Test.DoesNotExist:
         return Response({"error": "not found"}, status=404)
-    return Response(TestSerializer(test).data)
+
+    if _not_modified(request, etag):
+        response = HttpResponse(status=304)
+    elif "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(payload, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(payload), content_type="application/json")
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "no-cache"
+    return response
 
 # START SESSION
 @api_view(["POST"])
@@ -36,59 +85,157 @@ def start_session(request):
     username = request.data.get("username")
     test = Test.objects.get(test_id=test_id)
     session = Session.objects.create(test=test, username=username)
+    session_cache.remember(session)
     return Response({"session_id": str(session.session_id)})
 
 # SUBMIT TEST
+def submit_answers(session, answers):
+    """
+    Grade and store a submission for a SessionInfo. Returns the response
+    payload, or None if the session had already been submitted. Shared with
+    the async submit view, which runs it in a worker thread.
+    """
+    key = grading.answer_key(session.test_pk)
+    # Subjective answers are graded in the background when the test has any (see grading_queue.py)
+    defer = grading_queue.enabled() and any(qtype == "subjective" for _, _, qtype, _ in key)
+    percent_mcq, subjective_scores, items = grading.grade(key, answers, defer_subjective=defer)
+    if defer:
+        subjective_avg = overall_score = None
+    else:
+        subjective_avg, overall_score = grading.overall_score(percent_mcq, subjective_scores)
+    grading_status = "pending" if defer else "graded"
+
+    with transaction.atomic():
+        # Conditional update so two racing submits can't both score the session
+        updated = Session.objects.filter(pk=session.pk, ended__isnull=True).update(
+            score_mcq=percent_mcq,
+            score_subjective=subjective_scores,
+            subjective_avg=subjective_avg,
+            overall_score=overall_score,
+            grading_status=grading_status,
+            ended=timezone.now(),
+        )
+        if updated:
+            item_stats.record_submission(session.pk, percent_mcq, items)
+            if defer:
+                transaction.on_commit(grading_queue.wake)
+    session_cache.forget(session.session_id)
+    if not updated:
+        return None
+
+    return {
+        "mcq_score": percent_mcq,
+        "subjective_scores": subjective_scores,
+        "grading_status": grading_status,
+    }
+
+
 @api_view(["POST"])
 def submit_test(request):
     session_id = request.data.get("session_id")
     answers = request.data.get("answers")  # { qid: answer }
 
-    session = Session.objects.get(session_id=session_id)
-    test = session.test
+    try:
+        session = session_cache.lookup(session_id)
+    except Session.DoesNotExist:
+        return _session_not_found()
+    if session.ended:
+        return _already_submitted()
 
-    # ---- MCQ SCORE ----
-    total_mcq = 0
-    correct_mcq = 0
+    result = submit_answers(session, answers)
+    if result is None:
+        return _already_submitted()
+    return Response(result)
 
-    for q in test.questions.filter(type="mcq"):
-        total_mcq += 1
-        correct_opt = q.options.filter(is_correct=True).first()
-        if not correct_opt:
-            continue
+# RECORD PROCTORING EVENT
+@api_view(["POST"])
+def log_event(request):
+    session_id = request.data.get("session_id")
+    event_type = request.data.get("event")
+    if not valid_event_type(event_type):
+        return Response({"error": EVENT_TYPE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        session = session_cache.lookup(session_id)
+    except Session.DoesNotExist:
+        return _session_not_found()
 
-        user_ans = answers.get(q.qid)
-        if user_ans == correct_opt.option_id:
-            correct_mcq += 1
+    if not ingest.enabled():
+        ProctorEvent.objects.create(session_id=session.pk, event_type=event_type)
+        return Response({"status": "ok"})
 
-    percent_mcq = round((correct_mcq / total_mcq) * 100, 2) if total_mcq else 0
+    if not ingest.get_buffer().submit(session.pk, event_type):
+        return Response({"error": "Event queue full, retry shortly"},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+    return Response({"status": "queued"}, status=status.HTTP_202_ACCEPTED)
 
-    # ---- SUBJECTIVE ----
-    subjective_scores = {}
-    for q in test.questions.filter(type="subjective"):
-        student = answers.get(q.qid, "")
-        if len(student) < 3:
-            subjective_scores[q.qid] = 0
-        else:
-            subjective_scores[q.qid] = 70  # simple default baseline (upgrade later)
+# RECORD A BATCH OF PROCTORING EVENTS
+MAX_EVENT_BATCH = 200
+EVENT_TYPE_ERROR = "event must be a non-empty string of at most 100 characters"
 
-    session.score_mcq = percent_mcq
-    session.score_subjective = subjective_scores
-    session.save()
 
-    return Response({
-        "mcq_score": percent_mcq,
-        "subjective_scores": subjective_scores
-    })
+def valid_event_type(value):
+    return isinstance(value, str) and 0 < len(value) <= 100
+
+
+def _parse_client_ts(value):
+    """Accept epoch milliseconds (Date.now()) or an ISO-8601 string."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+    raise ValueError("client_ts must be epoch milliseconds or an ISO-8601 string")
+
 
-# RECORD PROCTORING EVENT
 @api_view(["POST"])
-def log_event(request):
+def log_events_batch(request):
     session_id = request.data.get("session_id")
-    event_type = request.data.get("event")
-    session = Session.objects.get(session_id=session_id)
-    ProctorEvent.objects.create(session=session, event_type=event_type)
-    return Response({"status": "ok"})
+    records = request.data.get("events")
+
+    if not isinstance(records, list) or not records:
+        return Response({"error": "events must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(records) > MAX_EVENT_BATCH:
+        return Response({"error": f"Maximum {MAX_EVENT_BATCH} events per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        session_pk = session_cache.lookup(session_id).pk
+    except Session.DoesNotExist:
+        return _session_not_found()
+
+    events, results = _build_events(session_pk, records)
+    with transaction.atomic():
+        ProctorEvent.objects.bulk_create(events)
+
+    return Response({
+        "accepted": len(events),
+        "rejected": len(records) - len(events),
+        "results": results
+    })
+
+
+def _build_events(session_pk, records):
+    """Validate a batch of event records. Returns (ProctorEvents to save, per-record results)."""
+    received_at = timezone.now()
+    results = []
+    events = []
+    for record in records:
+        event_type = record.get("event") if isinstance(record, dict) else None
+        if not valid_event_type(event_type):
+            results.append({"status": "error", "error": EVENT_TYPE_ERROR})
+            continue
+        try:
+            client_ts = _parse_client_ts(record.get("client_ts"))
+        except (ValueError, OverflowError, OSError) as e:
+            results.append({"status": "error", "error": str(e)})
+            continue
+        events.append(ProctorEvent(session_id=session_pk, event_type=event_type,
+                                   timestamp=received_at, client_ts=client_ts))
+        results.append({"status": "ok"})
+    return events, results
 
 # SNAPSHOT UPLOAD
 @api_view(["POST"])
@@ -96,9 +243,19 @@ def log_event(request):
 def upload_snapshot(request):
     session_id = request.data.get("session_id")
     file = request.data.get("image")
-    session = Session.objects.get(session_id=session_id)
-    Snapshot.objects.create(session=session, image=file)
-    return Response({"status": "ok"})
+    if file is None:
+        return Response({"error": "image is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        info = session_cache.lookup(session_id)
+    except Session.DoesNotExist:
+        return _session_not_found()
+    # Unsaved stand-in carrying just the fields snapshot storage needs
+    session = Session(pk=info.pk, session_id=info.session_id, test_id=info.test_pk, username=info.username)
+    try:
+        snapshot = snapshots.store(session, file)
+    except (OSError, Image.DecompressionBombError):  # not an image, truncated, or a decompression bomb
+        return Response({"error": "image is not a valid picture"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"status": "ok", "stored": snapshot is not None})
 
 
 # ========== HR ENDPOINTS ==========
@@ -130,57 +287,239 @@ def hr_login(request):
 
 
 # GENERATE QUESTIONS WITH AI
+GENERATION_BATCH_SIZE = 100
+STREAM_BATCH_SIZE = 5  # questions persisted per write while streaming
+STREAM_BATCH_WAIT = 0.5  # seconds a streamed question may wait for its batch to fill
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def _generated_question_data(gen_q):
+    return {
+        "id": gen_q.id,
+        "question_text": gen_q.question_text,
+        "type": gen_q.question_type,
+        "options": gen_q.options,
+        "correct_answer": gen_q.correct_answer,
+        "difficulty": gen_q.difficulty,
+        "duplicate_of": gen_q.duplicate_of_id
+    }
+
+
+def _stream_event(stream, event, data):
+    if stream == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"type": event, **data}) + "\n"
+
+
+def _stream_generated_questions(stream, topic, count, difficulty, user, fresh):
+    """
+    Persist questions in small batches as the generator produces them and
+    emit each one (with its id) right after its batch is written.
+    """
+    batch = []
+    batch_started = None
+    total = 0
+    generation = {}
+
+    def flush():
+        saved = jobs.save_generated(batch, generation.get("source") == "cache")
+        events = [_stream_event(stream, "question", {"question": _generated_question_data(q)}) for q in saved]
+        batch.clear()
+        return events
+
+    try:
+        for q_data in iter_questions(topic, count, difficulty, stats=generation, fresh=fresh):
+            if not batch:
+                batch_started = time.monotonic()
+            batch.append(jobs.new_generated_question(q_data, topic, difficulty, user))
+            total += 1
+            if len(batch) >= STREAM_BATCH_SIZE or time.monotonic() - batch_started >= STREAM_BATCH_WAIT:
+                yield from flush()
+        if batch:
+            yield from flush()
+    except Exception as e:
+        yield _stream_event(stream, "error", {"error": str(e)})
+        return
+    yield _stream_event(stream, "done", {"success": True, "count": total, "generation": generation})
+
+
 @api_view(["POST"])
 def generate_ai_questions(request):
     topic = request.data.get("topic")  # Python, Java, etc.
-    count = int(request.data.get("count", 50))
     difficulty = request.data.get("difficulty", "medium")
     user_id = request.data.get("user_id")
     
-    if not topic:
+    if not isinstance(topic, str) or not topic.strip():
         return Response({"error": "Topic is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(difficulty, str):
+        return Response({"error": "difficulty must be a string"}, status=status.HTTP_400_BAD_REQUEST)
+    # same bound as a background job: every chunk of the count is a paid API request
+    try:
+        count = jobs.validate_count(request.data.get("count", 50))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         user = User.objects.get(id=user_id) if user_id else None
     except User.DoesNotExist:
         user = None
     
+    # fresh=true skips the generation cache
+    fresh = str(request.data.get("fresh") or request.GET.get("fresh", "")).lower() in ("1", "true", "yes")
+    stream = request.data.get("stream") or request.GET.get("stream")
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return Response({"error": "stream must be ndjson or sse"}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            _stream_generated_questions(stream, topic, count, difficulty, user, fresh),
+            content_type=STREAM_FORMATS[stream],
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # don't let a proxy hold the stream back
+        return response
+
     # Generate questions using AI
-    questions = generate_questions(topic, count, difficulty)
-    
+    generation = {}
+    questions = list(iter_questions(topic, count, difficulty, stats=generation, fresh=fresh))
+
     # Save generated questions to database
-    generated_questions = []
-    for q_data in questions:
-        gen_q = GeneratedQuestion.objects.create(
-            topic=topic,
-            question_text=q_data.get("question_text", ""),
-            question_type=q_data.get("type", "mcq"),
-            options=q_data.get("options", []),
-            correct_answer=q_data.get("correct_answer", ""),
-            difficulty=q_data.get("difficulty", difficulty),
-            generated_by=user
-        )
-        generated_questions.append({
-            "id": gen_q.id,
-            "question_text": gen_q.question_text,
-            "type": gen_q.question_type,
-            "options": gen_q.options,
-            "correct_answer": gen_q.correct_answer,
-            "difficulty": gen_q.difficulty
-        })
-    
+    generated = [jobs.new_generated_question(q_data, topic, difficulty, user) for q_data in questions]
+    generated = jobs.save_generated(generated, generation.get("source") == "cache", batch_size=GENERATION_BATCH_SIZE)
+    generated_questions = [_generated_question_data(gen_q) for gen_q in generated]
+
     return Response({
         "success": True,
         "count": len(generated_questions),
-        "questions": generated_questions
+        "questions": generated_questions,
+        "generation": generation
     })
 
 
+# GENERATION JOBS
+
+
+def _job_data(job):
+    return {
+        "job_id": str(job.job_id),
+        "status": job.status,
+        "topic": job.topic,
+        "difficulty": job.difficulty,
+        "count": job.count,
+        "generated": job.generated,
+        "cancel_requested": job.cancel_requested,
+        "error": job.error,
+        "stats": job.stats,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _get_job(job_id):
+    try:
+        return GenerationJob.objects.get(job_id=uuid.UUID(str(job_id)))
+    except (ValueError, GenerationJob.DoesNotExist):
+        return None
+
+
+def _job_questions(job, after):
+    return GeneratedQuestion.objects.filter(job=job, pk__gt=after).order_by("pk")
+
+
+@api_view(["POST"])
+def submit_generation_job(request):
+    topic = request.data.get("topic")
+    count = request.data.get("count", 50)
+    difficulty = request.data.get("difficulty", "medium")
+    user_id = request.data.get("user_id")
+    fresh = str(request.data.get("fresh", "")).lower() in ("1", "true", "yes")
+
+    if not isinstance(topic, str) or not topic.strip():
+        return Response({"error": "Topic is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(difficulty, str):
+        return Response({"error": "difficulty must be a string"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = User.objects.get(id=user_id) if user_id else None
+    except User.DoesNotExist:
+        user = None
+
+    try:
+        job = jobs.submit(user, topic, count, difficulty, fresh)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except jobs.JobLimitExceeded as e:
+        response = Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response["Retry-After"] = "10"
+        return response
+    return Response(_job_data(job), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+def get_generation_job(request, job_id):
+    """
+    Job status plus the questions saved since ?after=<question id>.  Clients
+    poll this with the last id they have until the status is final; the
+    questions are read after the status, so the final poll carries the rest.
+    """
+    jobs.ensure_started()
+    job = _get_job(job_id)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        after = int(request.GET.get("after", 0))
+    except ValueError:
+        return Response({"error": "after must be a question id"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        **_job_data(job),
+        "questions": [_generated_question_data(q) for q in _job_questions(job, after)],
+    })
+
+
+@api_view(["POST"])
+def cancel_generation_job(request, job_id):
+    job = _get_job(job_id)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    cancelled = jobs.cancel(job)
+    job.refresh_from_db()
+    if not cancelled:
+        return Response({"error": f"Job already {job.status}"}, status=status.HTTP_409_CONFLICT)
+    return Response(_job_data(job))
+
+
 # GET GENERATED QUESTIONS
+QUESTION_PAGE_SIZE = 100
+MAX_QUESTION_PAGE_SIZE = 500
+
+
+def _encode_question_cursor(question):
+    payload = json.dumps([question.generated_at.isoformat(), question.pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_question_cursor(cursor):
+    try:
+        generated_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        generated_at = parse_datetime(generated_at)
+        if generated_at is None:
+            raise ValueError
+        return generated_at, int(pk)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
 @api_view(["GET"])
 def get_generated_questions(request):
+    """
+    Unselected questions, newest first, optionally filtered by ?topic=,
+    ?user_id= and a full-text ?q=.  Paginated with ?limit= and the opaque
+    ?cursor= returned as next_cursor.
+    """
     topic = request.GET.get("topic")
     user_id = request.GET.get("user_id")
+    text = request.GET.get("q", "").strip()
     
     queryset = GeneratedQuestion.objects.filter(is_selected=False)
     
@@ -188,8 +527,29 @@ def get_generated_questions(request):
         queryset = queryset.filter(topic=topic)
     if user_id:
         queryset = queryset.filter(generated_by_id=user_id)
-    
-    questions = queryset.order_by("-generated_at")
+    if text:
+        queryset = search.filter_text(queryset, text)
+
+    try:
+        limit = min(max(int(request.GET.get("limit", QUESTION_PAGE_SIZE)), 1), MAX_QUESTION_PAGE_SIZE)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Matches the genq_pool_* indexes
+    questions = queryset.order_by("-generated_at", "-id")
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            last_generated_at, last_pk = _decode_question_cursor(cursor)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        questions = questions.filter(
+            Q(generated_at__lt=last_generated_at) | Q(generated_at=last_generated_at, id__lt=last_pk)
+        )
+
+    page = list(questions[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
     
     return Response({
         "questions": [{
@@ -200,12 +560,81 @@ def get_generated_questions(request):
             "options": q.options,
             "correct_answer": q.correct_answer,
             "difficulty": q.difficulty,
+            "duplicate_of": q.duplicate_of_id,
             "generated_at": q.generated_at.isoformat()
-        } for q in questions]
+        } for q in page],
+        "next_cursor": _encode_question_cursor(page[-1]) if has_more else None
     })
 
 
 # SELECT QUESTIONS FOR TEST
+class _SelectionConflict(Exception):
+    pass
+
+
+def _promote_questions(question_ids, test_id, company_id, test_title, test_duration):
+    """
+    Copy selected GeneratedQuestions into a test. Must run inside
+    transaction.atomic(): any failure leaves no partial test behind.
+    """
+    # Get or create test
+    if test_id:
+        test = Test.objects.get(test_id=test_id)
+    else:
+        company = Company.objects.get(id=company_id)
+        test = Test.objects.create(
+            company=company,
+            test_id=f"{company_id}-{uuid.uuid4().hex[:8]}",
+            title=test_title,
+            duration=test_duration
+        )
+
+    # Lock the selected rows, then claim them with a conditional update so a
+    # concurrent request promoting the same question fails instead of duplicating it
+    selected_questions = list(
+        GeneratedQuestion.objects.select_for_update()
+        .filter(id__in=question_ids, is_selected=False).order_by("pk")
+    )
+    if len(selected_questions) != len(question_ids):
+        raise _SelectionConflict()
+    claimed = GeneratedQuestion.objects.filter(
+        id__in=[gen_q.id for gen_q in selected_questions], is_selected=False
+    ).update(is_selected=True, selected_for_test=test)
+    if claimed != len(selected_questions):
+        raise _SelectionConflict()
+
+    # Create Question objects from selected GeneratedQuestions
+    questions = Question.objects.bulk_create([
+        Question(test=test, qid=f"q{idx+1}", text=gen_q.question_text, type=gen_q.question_type,
+                 reference_answer=gen_q.correct_answer)
+        for idx, gen_q in enumerate(selected_questions)
+    ])
+
+    # Create options for MCQ
+    Option.objects.bulk_create([
+        Option(
+            question=q,
+            option_id=f"opt{opt_idx+1}",
+            text=opt_data.get("text", ""),
+            is_correct=opt_data.get("is_correct", False)
+        )
+        for q, gen_q in zip(questions, selected_questions)
+        if gen_q.question_type == "mcq" and gen_q.options
+        for opt_idx, opt_data in enumerate(gen_q.options)
+    ])
+
+    # bulk_create sends no signals; invalidate caches and publish the candidate bundle after commit
+    signals.test_content_changed(test.pk)
+    transaction.on_commit(lambda: bundles.build(test))
+
+    return test, [{
+        "id": q.id,
+        "qid": q.qid,
+        "text": q.text,
+        "type": q.type
+    } for q in questions]
+
+
 @api_view(["POST"])
 def select_questions_for_test(request):
     question_ids = request.data.get("question_ids", [])  # List of question IDs
@@ -220,67 +649,19 @@ def select_questions_for_test(request):
     if len(question_ids) > 20:
         return Response({"error": "Maximum 20 questions allowed"}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get or create test
-    if test_id:
-        try:
-            test = Test.objects.get(test_id=test_id)
-        except Test.DoesNotExist:
-            return Response({"error": "Test not found"}, status=status.HTTP_404_NOT_FOUND)
-    else:
-        if not company_id or not test_title:
-            return Response({"error": "company_id and test_title required for new test"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            company = Company.objects.get(id=company_id)
-        except Company.DoesNotExist:
-            return Response({"error": "Company not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Create new test
-        test = Test.objects.create(
-            company=company,
-            test_id=f"{company_id}-{uuid.uuid4().hex[:8]}",
-            title=test_title,
-            duration=test_duration
-        )
-    
-    # Get selected questions
-    selected_questions = GeneratedQuestion.objects.filter(id__in=question_ids, is_selected=False)
-    
-    if selected_questions.count() != len(question_ids):
+    if not test_id and (not company_id or not test_title):
+        return Response({"error": "company_id and test_title required for new test"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            test, created_questions = _promote_questions(question_ids, test_id, company_id, test_title, test_duration)
+    except Test.DoesNotExist:
+        return Response({"error": "Test not found"}, status=status.HTTP_404_NOT_FOUND)
+    except Company.DoesNotExist:
+        return Response({"error": "Company not found"}, status=status.HTTP_404_NOT_FOUND)
+    except _SelectionConflict:
         return Response({"error": "Some questions not found or already selected"}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Create Question objects from selected GeneratedQuestions
-    created_questions = []
-    for idx, gen_q in enumerate(selected_questions):
-        q = Question.objects.create(
-            test=test,
-            qid=f"q{idx+1}",
-            text=gen_q.question_text,
-            type=gen_q.question_type
-        )
-        
-        # Create options for MCQ
-        if gen_q.question_type == "mcq" and gen_q.options:
-            for opt_idx, opt_data in enumerate(gen_q.options):
-                Option.objects.create(
-                    question=q,
-                    option_id=f"opt{opt_idx+1}",
-                    text=opt_data.get("text", ""),
-                    is_correct=opt_data.get("is_correct", False)
-                )
-        
-        # Mark as selected
-        gen_q.is_selected = True
-        gen_q.selected_for_test = test
-        gen_q.save()
-        
-        created_questions.append({
-            "id": q.id,
-            "qid": q.qid,
-            "text": q.text,
-            "type": q.type
-        })
-    
+
     return Response({
         "success": True,
         "test_id": test.test_id,
@@ -298,11 +679,42 @@ def delete_generated_questions(request):
     if not question_ids:
         return Response({"error": "No question IDs provided"}, status=status.HTTP_400_BAD_REQUEST)
     
-    deleted = GeneratedQuestion.objects.filter(id__in=question_ids, is_selected=False).delete()
+    deleted_count = similarity.delete_questions(GeneratedQuestion.objects.filter(id__in=question_ids, is_selected=False))
     
     return Response({
         "success": True,
-        "deleted_count": deleted[0]
+        "deleted_count": deleted_count
+    })
+
+
+# DEDUPE THE GENERATED QUESTION POOL
+@api_view(["POST"])
+def dedupe_generated_questions(request):
+    """
+    Find clusters of near-duplicate unselected questions (optionally for one
+    topic).  The oldest question of each cluster is kept; with "apply": true
+    the others are deleted, otherwise they are only reported.
+    """
+    topic = request.data.get("topic")
+    apply = str(request.data.get("apply", "")).lower() in ("1", "true", "yes")
+
+    queryset = GeneratedQuestion.objects.filter(is_selected=False)
+    if topic:
+        queryset = queryset.filter(topic=topic)
+    clusters = similarity.duplicate_clusters(queryset)
+    duplicate_ids = [pk for cluster in clusters for pk in cluster[1:]]
+
+    deleted_count = 0
+    if apply and duplicate_ids:
+        deleted_count = similarity.delete_questions(
+            GeneratedQuestion.objects.filter(id__in=duplicate_ids, is_selected=False)
+        )
+
+    return Response({
+        "success": True,
+        "clusters": [{"keep": cluster[0], "duplicates": cluster[1:]} for cluster in clusters],
+        "duplicate_count": len(duplicate_ids),
+        "deleted_count": deleted_count,
     })
 
 
@@ -317,72 +729,37 @@ def get_test_analytics(request):
     if test_id:
         # Get analytics for specific test
         try:
-            test = Test.objects.get(test_id=test_id)
-            sessions = Session.objects.filter(test=test)
-            
-            total_attempts = sessions.count()
-            completed = sessions.filter(ended__isnull=False).count()
-            
-            # Calculate average scores
-            mcq_scores = [s.score_mcq for s in sessions if s.score_mcq is not None]
-            avg_mcq = sum(mcq_scores) / len(mcq_scores) if mcq_scores else 0
-            
-            # Score distribution
-            score_ranges = {
-                "90-100": len([s for s in mcq_scores if 90 <= s <= 100]),
-                "80-89": len([s for s in mcq_scores if 80 <= s < 90]),
-                "70-79": len([s for s in mcq_scores if 70 <= s < 80]),
-                "60-69": len([s for s in mcq_scores if 60 <= s < 70]),
-                "0-59": len([s for s in mcq_scores if 0 <= s < 60]),
-            }
-            
-            # Recent attempts
-            recent_sessions = sessions.order_by("-started")[:10]
-            
-            return Response({
-                "test_id": test.test_id,
-                "test_title": test.title,
-                "company": test.company.name,
-                "total_attempts": total_attempts,
-                "completed": completed,
-                "in_progress": total_attempts - completed,
-                "average_score": round(avg_mcq, 2),
-                "score_distribution": score_ranges,
-                "recent_attempts": [{
-                    "username": s.username,
-                    "started": s.started.isoformat(),
-                    "ended": s.ended.isoformat() if s.ended else None,
-                    "score_mcq": s.score_mcq,
-                    "session_id": str(s.session_id)
-                } for s in recent_sessions]
-            })
+            test = Test.objects.select_related("company").get(test_id=test_id)
         except Test.DoesNotExist:
             return Response({"error": "Test not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        summary = analytics.test_summary(test)
+        if summary["grading_pending"]:
+            grading_queue.wake()
+
+        # Recent attempts
+        recent_sessions = Session.objects.filter(test=test).order_by("-started")[:10]
+
+        return Response({
+            "test_id": test.test_id,
+            "test_title": test.title,
+            "company": test.company.name,
+            **summary,
+            "recent_attempts": [{
+                "username": s.username,
+                "started": s.started.isoformat(),
+                "ended": s.ended.isoformat() if s.ended else None,
+                "score_mcq": s.score_mcq,
+                "grading_status": s.grading_status or None,
+                "session_id": str(s.session_id)
+            } for s in recent_sessions]
+        })
     else:
         # Get analytics for all tests
-        tests = Test.objects.all()
-        analytics = []
-        
-        for test in tests:
-            sessions = Session.objects.filter(test=test)
-            total_attempts = sessions.count()
-            completed = sessions.filter(ended__isnull=False).count()
-            mcq_scores = [s.score_mcq for s in sessions if s.score_mcq is not None]
-            avg_mcq = sum(mcq_scores) / len(mcq_scores) if mcq_scores else 0
-            
-            analytics.append({
-                "test_id": test.test_id,
-                "test_title": test.title,
-                "company": test.company.name,
-                "total_attempts": total_attempts,
-                "completed": completed,
-                "average_score": round(avg_mcq, 2),
-                "question_count": test.questions.count()
-            })
-        
+        tests = analytics.all_tests_summary()
         return Response({
-            "tests": analytics,
-            "total_tests": len(analytics)
+            "tests": tests,
+            "total_tests": len(tests)
         })
 
 
@@ -392,87 +769,169 @@ def get_question_performance(request, test_id):
     """Get performance metrics for each question in a test"""
     try:
         test = Test.objects.get(test_id=test_id)
-        questions = test.questions.all()
-        
-        question_stats = []
-        for question in questions:
-            # Get all sessions for this test
-            sessions = Session.objects.filter(test=test, ended__isnull=False)
-            
-            if question.type == "mcq":
-                # For MCQ, check how many got it right
-                correct_option = question.options.filter(is_correct=True).first()
-                if correct_option:
-                    # This is simplified - in real implementation, you'd need to track individual answers
-                    # For now, we'll use session scores as proxy
-                    total_attempts = sessions.count()
-                    # Estimate based on average score
-                    avg_score = sum([s.score_mcq for s in sessions if s.score_mcq]) / total_attempts if total_attempts else 0
-                    estimated_correct = int((avg_score / 100) * total_attempts)
-                    
-                    question_stats.append({
-                        "question_id": question.qid,
-                        "question_text": question.text[:100],
-                        "type": question.type,
-                        "total_attempts": total_attempts,
-                        "estimated_correct": estimated_correct,
-                        "difficulty": "medium"  # Could be calculated based on performance
-                    })
-            else:
-                # For subjective questions
-                total_attempts = sessions.count()
-                question_stats.append({
-                    "question_id": question.qid,
-                    "question_text": question.text[:100],
-                    "type": question.type,
-                    "total_attempts": total_attempts,
-                    "average_score": 70  # Default for subjective
-                })
-        
-        return Response({
-            "test_id": test_id,
-            "questions": question_stats
-        })
     except Test.DoesNotExist:
         return Response({"error": "Test not found"}, status=status.HTTP_404_NOT_FOUND)
 
+    return Response({
+        "test_id": test_id,
+        "questions": item_stats.question_report(test)
+    })
+
 
 # GET CANDIDATES FOR TEST (with selection status)
+CANDIDATE_PAGE_SIZE = 100
+MAX_CANDIDATE_PAGE_SIZE = 1000
+CANDIDATE_FIELDS = ["pk", "username", "session_id", "started", "ended", "score_mcq", "subjective_avg",
+                    "grading_status", "overall_score"]
+CANDIDATE_EXPORT_COLUMNS = ["username", "session_id", "started", "ended", "mcq_score",
+                            "subjective_avg", "overall_score", "time_taken", "status"]
+
+
+def _candidate_row(row):
+    pk, username, session_id, started, ended, mcq_score, subjective_avg, grading_status, overall_score = row
+    if not ended:
+        status_label = "in_progress"
+    elif grading_status in ("pending", "grading"):
+        status_label = "grading_pending"  # MCQ score is final; subjective and overall scores are not in yet
+    else:
+        status_label = "completed"
+    return {
+        "username": username,
+        "session_id": str(session_id),
+        "started": started.isoformat(),
+        "ended": ended.isoformat() if ended else None,
+        "mcq_score": mcq_score or 0,
+        "subjective_avg": None if status_label == "grading_pending" else subjective_avg or 0,
+        "overall_score": None if status_label == "grading_pending" else overall_score or 0,
+        "time_taken": (ended - started).total_seconds() if ended else None,
+        "status": status_label
+    }
+
+
+def _encode_cursor(row):
+    payload = json.dumps([row[-1], row[0]]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        overall_score, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (None if overall_score is None else float(overall_score)), int(pk)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _stream_candidates(sessions, export):
+    rows = (_candidate_row(row) for row in sessions.values_list(*CANDIDATE_FIELDS).iterator(chunk_size=2000))
+    if export == "ndjson":
+        response = StreamingHttpResponse((json.dumps(row) + "\n" for row in rows),
+                                         content_type="application/x-ndjson")
+        extension = "ndjson"
+    else:
+        buffer = _EchoBuffer()
+        writer = csv.DictWriter(buffer, fieldnames=CANDIDATE_EXPORT_COLUMNS)
+        lines = itertools.chain([writer.writeheader()], (writer.writerow(row) for row in rows))
+        response = StreamingHttpResponse(lines, content_type="text/csv")
+        extension = "csv"
+    response["Content-Disposition"] = f'attachment; filename="candidates.{extension}"'
+    return response
+
+
+class _EchoBuffer:
+    """File-like object whose write() just hands the line back, for streaming csv output."""
+    def write(self, value):
+        return value
+
+
 @api_view(["GET"])
 def get_candidates(request, test_id):
-    """Get all candidates who attempted a test, sorted by score"""
+    """
+    Candidates who finished a test, best overall score first.
+
+    Paginated with ?limit= and the opaque ?cursor= returned as next_cursor.
+    ?export=csv or ?export=ndjson streams the full list instead.
+    """
     try:
         test = Test.objects.get(test_id=test_id)
-        sessions = Session.objects.filter(test=test, ended__isnull=False).order_by("-score_mcq")
-        
-        candidates = []
-        for session in sessions:
-            # Calculate overall score
-            mcq_score = session.score_mcq or 0
-            subjective_avg = 0
-            if session.score_subjective:
-                sub_scores = [v for v in session.score_subjective.values() if isinstance(v, (int, float))]
-                subjective_avg = sum(sub_scores) / len(sub_scores) if sub_scores else 0
-            
-            overall_score = round(mcq_score * 0.7 + subjective_avg * 0.3, 2)
-            
-            candidates.append({
-                "username": session.username,
-                "session_id": str(session.session_id),
-                "started": session.started.isoformat(),
-                "ended": session.ended.isoformat() if session.ended else None,
-                "mcq_score": mcq_score,
-                "subjective_avg": round(subjective_avg, 2),
-                "overall_score": overall_score,
-                "time_taken": (session.ended - session.started).total_seconds() if session.ended else None,
-                "status": "completed" if session.ended else "in_progress"
-            })
-        
-        return Response({
-            "test_id": test_id,
-            "test_title": test.title,
-            "candidates": candidates,
-            "total_candidates": len(candidates)
-        })
     except Test.DoesNotExist:
         return Response({"error": "Test not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    # Matches session_ranking_idx; sessions without a stored score sort last
+    sessions = Session.objects.filter(test=test, ended__isnull=False).order_by(
+        F("overall_score").desc(nulls_last=True), "-pk"
+    )
+
+    export = request.GET.get("export")
+    if export in ("csv", "ndjson"):
+        return _stream_candidates(sessions, export)
+    if export:
+        return Response({"error": "export must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.GET.get("limit", CANDIDATE_PAGE_SIZE)), 1), MAX_CANDIDATE_PAGE_SIZE)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    page = sessions
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            last_score, last_pk = _decode_cursor(cursor)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if last_score is None:
+            page = page.filter(overall_score__isnull=True, pk__lt=last_pk)
+        else:
+            page = page.filter(
+                Q(overall_score__lt=last_score) | Q(overall_score=last_score, pk__lt=last_pk)
+                | Q(overall_score__isnull=True)
+            )
+
+    rows = list(page.values_list(*CANDIDATE_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    candidates = [_candidate_row(row) for row in rows]
+    if any(c["status"] == "grading_pending" for c in candidates):
+        grading_queue.wake()  # e.g. after a restart, before anyone has submitted again
+
+    return Response({
+        "test_id": test_id,
+        "test_title": test.title,
+        "candidates": candidates,
+        "total_candidates": sessions.count(),
+        "next_cursor": _encode_cursor(rows[-1]) if has_more else None
+    })
+
+
+# ========== OPERATIONS ==========
+
+# PROMETHEUS METRICS
+def prometheus_metrics(request):
+    """Request histograms and module counters for this process (see assessment/metrics.py)"""
+    if not metrics.authorized(request):
+        return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# LIST RECENT PROFILES
+@api_view(["GET"])
+def list_profiles(request):
+    """Profiles kept from recent requests, newest first; ?view= narrows to one view"""
+    if not profiling.authorized(request):
+        return Response({"error": "Profiling token required"}, status=status.HTTP_403_FORBIDDEN)
+    return Response({"profiles": [profiling.summary(p) for p in profiling.recent(request.GET.get("view"))]})
+
+
+# DOWNLOAD A PROFILE
+@api_view(["GET"])
+def download_profile(request, profile_id):
+    """A kept profile as a .prof file (cProfile) or collapsed stacks (sampling)"""
+    if not profiling.authorized(request):
+        return Response({"error": "Profiling token required"}, status=status.HTTP_403_FORBIDDEN)
+    profile = profiling.get(profile_id)
+    if profile is None:
+        return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+    content_type = "application/octet-stream" if profile.mode == "cprofile" else "text/plain; charset=utf-8"
+    response = HttpResponse(profile.data, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{profiling.filename(profile)}"'
+    return response
@@ -0,0 +1,55 @@
+"""
+Micro-benchmarks for the assessment backend.
+
+Each module is runnable from the backend directory, e.g.:
+    python -m benchmarks.bench_grader
+
+Benchmarks run against a throwaway test database, never db.sqlite3.
+"""
+import os
+import statistics
+import time
+
+import django
+
+
+def setup():
+    """Configure Django and create a scratch database. Returns a teardown callable."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'exam_backend.settings')
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    def teardown():
+        from assessment.test_runner import stop_workers
+
+        stop_workers()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return teardown
+
+
+def measure(fn, repeat=50, warmup=3):
+    """Run fn repeatedly and return latency stats in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "mean": statistics.fmean(samples),
+    }
+
+
+def fmt(stats):
+    return "p50 %8.3f ms  p99 %8.3f ms  mean %8.3f ms" % (stats["p50"], stats["p99"], stats["mean"])
@@ -0,0 +1,126 @@
+"""
+HR analytics over 100k seeded sessions: legacy Python-side loops vs the
+aggregate()/annotate() implementation in assessment.analytics.
+Run: python -m benchmarks.bench_analytics [sessions] [tests]
+"""
+import random
+import sys
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from benchmarks import setup, measure, fmt
+
+
+def seed(n_sessions, n_tests):
+    from assessment.models import Company, Test, Question, Session
+
+    company = Company.objects.create(id="bench", name="Bench")
+    tests = Test.objects.bulk_create([
+        Test(company=company, test_id=f"bench-{i}", title=f"Bench {i}") for i in range(n_tests)
+    ])
+    Question.objects.bulk_create([
+        Question(test=t, qid=f"q{j}", text="?", type="mcq") for t in tests for j in range(20)
+    ])
+    rng = random.Random(42)
+    batch = []
+    for i in range(n_sessions):
+        finished = rng.random() < 0.9
+        batch.append(Session(
+            test=tests[i % n_tests],
+            username=f"candidate{i}",
+            score_mcq=round(rng.uniform(0, 100), 2) if finished else None,
+            grading_status=rng.choice(["graded", "graded", "pending"]) if finished else "",
+        ))
+        if len(batch) == 5000:
+            Session.objects.bulk_create(batch)
+            batch = []
+    Session.objects.bulk_create(batch)
+    Session.objects.filter(score_mcq__isnull=False).update(ended=timezone.now())
+    return tests
+
+
+def legacy_test_summary(test):
+    from assessment.models import Session
+
+    sessions = Session.objects.filter(test=test)
+    total_attempts = sessions.count()
+    completed = sessions.filter(ended__isnull=False).count()
+    mcq_scores = [s.score_mcq for s in sessions if s.score_mcq is not None]
+    avg_mcq = sum(mcq_scores) / len(mcq_scores) if mcq_scores else 0
+    grading_pending = len([s for s in sessions if s.grading_status in ("pending", "grading")])
+    return {
+        "total_attempts": total_attempts,
+        "completed": completed,
+        "in_progress": total_attempts - completed,
+        "grading_pending": grading_pending,
+        "average_score": round(avg_mcq, 2),
+        "score_distribution": {
+            "90-100": len([s for s in mcq_scores if 90 <= s <= 100]),
+            "80-89": len([s for s in mcq_scores if 80 <= s < 90]),
+            "70-79": len([s for s in mcq_scores if 70 <= s < 80]),
+            "60-69": len([s for s in mcq_scores if 60 <= s < 70]),
+            "0-59": len([s for s in mcq_scores if 0 <= s < 60]),
+        },
+    }
+
+
+def legacy_all_tests_summary():
+    from assessment.models import Test, Session
+
+    analytics = []
+    for test in Test.objects.all():
+        sessions = Session.objects.filter(test=test)
+        total_attempts = sessions.count()
+        completed = sessions.filter(ended__isnull=False).count()
+        mcq_scores = [s.score_mcq for s in sessions if s.score_mcq is not None]
+        avg_mcq = sum(mcq_scores) / len(mcq_scores) if mcq_scores else 0
+        grading_pending = len([s for s in sessions if s.grading_status in ("pending", "grading")])
+        analytics.append({
+            "test_id": test.test_id,
+            "test_title": test.title,
+            "company": test.company.name,
+            "total_attempts": total_attempts,
+            "completed": completed,
+            "grading_pending": grading_pending,
+            "average_score": round(avg_mcq, 2),
+            "question_count": test.questions.count(),
+        })
+    return analytics
+
+
+def query_count(fn):
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    return len(ctx.captured_queries)
+
+
+def main():
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_tests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    teardown = setup()
+    try:
+        from assessment import analytics
+
+        tests = seed(n_sessions, n_tests)
+        print(f"Seeded {n_sessions} sessions across {n_tests} tests")
+
+        assert analytics.test_summary(tests[0]) == legacy_test_summary(tests[0])
+        assert analytics.all_tests_summary() == legacy_all_tests_summary()
+
+        cases = [
+            ("one test, legacy   ", lambda: legacy_test_summary(tests[0]), 10),
+            ("one test, aggregate", lambda: analytics.test_summary(tests[0]), 50),
+            ("all tests, legacy   ", legacy_all_tests_summary, 3),
+            ("all tests, aggregate", analytics.all_tests_summary, 10),
+        ]
+        for label, fn, repeat in cases:
+            print(f"{label}  {fmt(measure(fn, repeat=repeat, warmup=1))}  queries {query_count(fn)}")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Candidate endpoints under a cohort: the DRF views behind a threaded WSGI
+worker vs the native async views in assessment.async_views on one event loop.
+
+Two workloads:
+  events     every candidate starts a session, logs proctoring events with a
+             short think time between them (the buffered ingest path, as in
+             production) and submits
+  snapshots  every candidate uploads webcam frames over a slow link: each
+             upload takes UPLOAD_TIME to arrive, during which a WSGI worker
+             thread is held reading the body while the ASGI side only awaits
+
+The WSGI side hands each request to a pool of WORKER_THREADS threads, like a
+threaded WSGI server, and latency includes the time spent waiting for a free
+thread; the ASGI side runs each request as a task through Django's ASGI
+handler.  No network is involved on either side; the slow upload is modelled
+as a sleep before the request is handled.
+Run: python -m benchmarks.bench_async [candidates...]
+"""
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup
+
+WORKER_THREADS = 8
+EVENTS = 10
+THINK_TIME = 0.05  # seconds between a candidate's requests
+SNAPSHOTS = 3
+UPLOAD_TIME = 0.2  # seconds for a frame to arrive from the candidate
+LEAN_MIDDLEWARE = ["corsheaders.middleware.CorsMiddleware"]
+
+
+def make_frames(n, seed=11):
+    """n distinct 320x240 noise JPEGs, so no upload is skipped as a duplicate."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(n):
+        image = Image.frombytes("L", (320, 240), bytes(rng.getrandbits(8) for _ in range(320 * 240)))
+        encoded = io.BytesIO()
+        image.convert("RGB").save(encoded, format="JPEG", quality=85)
+        frames.append(encoded.getvalue())
+    return frames
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def cohort(n, send, workload, answers, frames):
+    latencies = []
+
+    async def timed(path, body, **kwargs):
+        start = time.perf_counter()
+        response = await send(path, body, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        return response
+
+    async def candidate(i):
+        await asyncio.sleep(random.random() * THINK_TIME)  # stagger arrivals
+        response = await timed("/api/start-session/", {"test_id": "bench-20", "username": f"c{i}"})
+        session_id = response.json()["session_id"]
+        if workload == "events":
+            for _ in range(EVENTS):
+                await asyncio.sleep(THINK_TIME)
+                await timed("/api/log/", {"session_id": session_id, "event": "focus_lost"})
+        else:
+            for frame in frames:
+                image = io.BytesIO(frame)
+                image.name = "frame.jpg"
+                await timed("/api/upload-snapshot/", {"session_id": session_id, "image": image}, slow=True)
+        await timed("/api/submit/", {"session_id": session_id, "answers": answers})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(candidate(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+        "rps": len(latencies) / elapsed,
+    }
+
+
+def _post(client, path, body):
+    if "image" in body:
+        return client.post(path, body)  # multipart
+    return client.post(path, body, content_type="application/json")
+
+
+def run_wsgi(n, workload, answers, frames):
+    from django.test import Client
+
+    pool = ThreadPoolExecutor(max_workers=WORKER_THREADS)
+    local = threading.local()
+
+    def post(path, body, slow):
+        if not hasattr(local, "client"):
+            local.client = Client()
+        if slow:
+            time.sleep(UPLOAD_TIME)  # the worker thread is busy reading the body
+        return _post(local.client, path, body)
+
+    async def send(path, body, slow=False):
+        return await asyncio.get_running_loop().run_in_executor(pool, post, path, body, slow)
+
+    try:
+        return asyncio.run(cohort(n, send, workload, answers, frames))
+    finally:
+        pool.shutdown()
+
+
+def run_asgi(n, workload, answers, frames, middleware=None):
+    from django.conf import settings
+    from django.test import AsyncClient, override_settings
+
+    client = AsyncClient()
+
+    async def send(path, body, slow=False):
+        if slow:
+            await asyncio.sleep(UPLOAD_TIME)  # the body arrives while the loop serves others
+        return await _post(client, path, body)
+
+    # the ASGI process's URLconf (exam_backend/asgi_urls.py) under the given middleware
+    with override_settings(ROOT_URLCONF="exam_backend.asgi_urls", MIDDLEWARE=middleware or settings.MIDDLEWARE):
+        return asyncio.run(cohort(n, send, workload, answers, frames))
+
+
+def run_asgi_lean(n, workload, answers, frames):
+    # Only middleware written for async; the MiddlewareMixin ones each cost two thread hops per request
+    return run_asgi(n, workload, answers, frames, LEAN_MIDDLEWARE)
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 500]
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "exam_backend.settings")
+    from django.conf import settings
+    from django.test import override_settings
+
+    # threads and the event loop share one database; a file (WAL) rather than shared-cache memory
+    scratch = tempfile.TemporaryDirectory()
+    if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+        settings.DATABASES["default"]["TEST"] = {"NAME": os.path.join(scratch.name, "bench.sqlite3")}
+    teardown = setup()
+    try:
+        from assessment.models import Company
+        from benchmarks.bench_grader import seed_test
+
+        random.seed(7)
+        _, answers = seed_test(20, Company.objects.create(id="bench", name="Bench"))
+        frames = make_frames(SNAPSHOTS)
+        runs = (("WSGI       ", run_wsgi), ("ASGI       ", run_asgi), ("ASGI, lean ", run_asgi_lean))
+        with override_settings(MEDIA_ROOT=os.path.join(scratch.name, "media")):
+            print(f"events: {EVENTS} per candidate, {THINK_TIME * 1000:.0f} ms apart; "
+                  f"snapshots: {SNAPSHOTS} per candidate, {UPLOAD_TIME * 1000:.0f} ms to upload each; "
+                  f"WSGI with {WORKER_THREADS} threads")
+            for workload in ("events", "snapshots"):
+                for n in sizes:
+                    for label, run in runs:
+                        stats = run(n, workload, answers, frames)
+                        print(f"{workload:9s} {n:5d} candidates  {label}  p50 {stats['p50']:8.2f} ms  "
+                              f"p99 {stats['p99']:8.2f} ms  {stats['rps']:7.1f} req/s")
+    finally:
+        teardown()
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+A cohort submitting at once: submit latency with subjective answers graded
+inline vs deferred, and the time the deferred batches take to catch up
+(in-process and on a process pool).
+Run: python -m benchmarks.bench_deferred_grading [cohort_size] [processes]
+"""
+import random
+import sys
+import time
+
+from benchmarks import setup, measure, fmt
+from benchmarks.bench_subjective import REFERENCE, cohort
+
+N_MCQ = 20
+N_SUBJECTIVE = 5
+
+
+def seed_test(company):
+    from assessment.models import Test, Question, Option
+
+    test = Test.objects.create(company=company, test_id="bench-deferred", title="Bench deferred")
+    questions = Question.objects.bulk_create(
+        [Question(test=test, qid=f"m{i}", text=f"MCQ {i}", type="mcq") for i in range(N_MCQ)]
+        + [Question(test=test, qid=f"s{i}", text=f"Subjective {i}", type="subjective", reference_answer=REFERENCE)
+           for i in range(N_SUBJECTIVE)]
+    )
+    Option.objects.bulk_create([
+        Option(question=q, option_id=f"opt{j}", text=f"Option {j}", is_correct=(j == 0))
+        for q in questions if q.type == "mcq"
+        for j in range(4)
+    ])
+    return test
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    teardown = setup()
+    try:
+        from django.test import Client, override_settings
+        from assessment import grading_queue
+        from assessment.models import Company, Session
+
+        rng = random.Random(5)
+        test = seed_test(Company.objects.create(id="bench", name="Bench"))
+        texts = cohort(n * N_SUBJECTIVE, rng)
+        client = Client()
+
+        def submit_all():
+            sessions = iter(Session.objects.bulk_create([Session(test=test, username=f"c{i}") for i in range(n)]))
+            position = iter(range(n))
+
+            def submit():
+                i = next(position)
+                answers = {f"m{j}": f"opt{rng.randint(0, 3)}" for j in range(N_MCQ)}
+                answers.update({f"s{j}": texts[i * N_SUBJECTIVE + j] for j in range(N_SUBJECTIVE)})
+                client.post("/api/submit/", {"session_id": str(next(sessions).session_id), "answers": answers},
+                            content_type="application/json")
+            return measure(submit, repeat=n, warmup=0)
+
+        with override_settings(DEFERRED_GRADING={"ENABLED": False}):
+            print(f"{n} submits, graded inline    {fmt(submit_all())}")
+
+        # WORKER off so nothing grades in the background while submits are being timed
+        with override_settings(DEFERRED_GRADING={"WORKER": False}):
+            print(f"{n} submits, grading deferred {fmt(submit_all())}")
+            start = time.perf_counter()
+            graded = grading_queue.grade_pending()
+            print(f"  catch-up, in-process       {graded} sessions in {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+            submit_all()
+            pool = grading_queue.process_pool(processes)
+            pool.submit(int).result()  # start the workers before timing
+            start = time.perf_counter()
+            graded = grading_queue.grade_pending(pool=pool)
+            print(f"  catch-up, {processes} processes        "
+                  f"{graded} sessions in {(time.perf_counter() - start) * 1000:8.1f} ms")
+            pool.shutdown()
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+AI question generation wall time: one large completion request vs chunked
+concurrent requests (whole or streamed completions) vs a generation cache
+hit, against an in-process fake OpenAI-compatible client
+(no network, no API key).  Latency is simulated per generated question,
+and a configurable share of requests fail so retries are exercised.
+Run: python -m benchmarks.bench_generation [count] [seconds_per_question] [failure_rate]
+
+The same code path can be pointed at a local fake server instead by setting
+OPENAI_API_KEY and OPENAI_BASE_URL.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from benchmarks import setup
+
+
+class FakeClient:
+    """Mimics client.chat.completions.create() closely enough for ai_service."""
+
+    def __init__(self, seconds_per_question, failure_rate=0.0, seed=7):
+        self.seconds_per_question = seconds_per_question
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, timeout=None, stream=False, **kwargs):
+        prompt = messages[-1]["content"]
+        count = int(prompt.split()[1])
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            failed = self.rng.random() < self.failure_rate
+        questions = [json.dumps({
+            "question_text": f"Generated question {call}-{i}?",
+            "type": "mcq",
+            "difficulty": "medium",
+            "options": [{"text": "A", "is_correct": True}, {"text": "B", "is_correct": False}],
+        }) for i in range(count)]
+        if stream:
+            return self._stream(questions, failed)
+        time.sleep(self.seconds_per_question * count)
+        if failed:
+            raise TimeoutError("simulated upstream timeout")
+        content = "```json\n[" + ", ".join(questions) + "]\n```"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def _stream(self, questions, failed):
+        """One delta per question, split mid-object; a failing stream dies half way through."""
+        yield self._delta("```json\n[")
+        for i, question in enumerate(questions):
+            if failed and i == len(questions) // 2:
+                raise TimeoutError("simulated upstream timeout")
+            time.sleep(self.seconds_per_question)
+            half = len(question) // 2
+            yield self._delta(question[:half])
+            yield self._delta(question[half:] + (", " if i < len(questions) - 1 else ""))
+        yield self._delta("]\n```")
+
+    @staticmethod
+    def _delta(content):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+def run(label, count, client, overrides, fresh=True):
+    from django.test import override_settings
+    from assessment import ai_service
+
+    stats = {}
+    with override_settings(AI_GENERATION=overrides):
+        questions = list(ai_service.iter_questions("Python", count, client=client, stats=stats, fresh=fresh))
+    print(f"{label}  {stats['wall_time_ms']:9.1f} ms  got {len(questions)}/{count}  "
+          f"chunks {stats['chunks']}  failed {stats['failed_chunks']}  retries {stats['retries']}  "
+          f"first {stats['first_question_ms'] or 0:7.1f} ms  source {stats['source']}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    seconds_per_question = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    teardown = setup()
+    try:
+        run("single request       ", count, FakeClient(seconds_per_question),
+            {"CHUNK_SIZE": count, "MAX_WORKERS": 1, "RETRIES": 0, "STREAM": False})
+        run("chunked              ", count, FakeClient(seconds_per_question), {"STREAM": False})
+        run("chunked, streamed    ", count, FakeClient(seconds_per_question), {})
+        run("chunked, faults      ", count, FakeClient(seconds_per_question, failure_rate), {"STREAM": False})
+        run("streamed, faults     ", count, FakeClient(seconds_per_question, failure_rate), {})
+        run("cache hit            ", count, FakeClient(seconds_per_question), {}, fresh=False)
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
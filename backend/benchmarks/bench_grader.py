@@ -0,0 +1,68 @@
+"""
+Per-submission grading latency: legacy per-question ORM loop vs the
+compiled answer key.
+Run: python -m benchmarks.bench_grader
+"""
+import random
+
+from benchmarks import setup, measure, fmt
+
+
+def seed_test(n_questions, company):
+    from assessment.models import Test, Question, Option
+
+    test = Test.objects.create(company=company, test_id=f"bench-{n_questions}", title=f"Bench {n_questions}")
+    questions = Question.objects.bulk_create([
+        Question(test=test, qid=f"q{i+1}", text=f"Question {i+1}", type="mcq" if i % 5 else "subjective")
+        for i in range(n_questions)
+    ])
+    Option.objects.bulk_create([
+        Option(question=q, option_id=f"opt{j+1}", text=f"Option {j+1}", is_correct=(j == 0))
+        for q in questions if q.type == "mcq"
+        for j in range(4)
+    ])
+    answers = {
+        q.qid: (f"opt{random.randint(1, 4)}" if q.type == "mcq" else "a reasonably long answer")
+        for q in questions
+    }
+    return test, answers
+
+
+def legacy_grade(test, answers):
+    total_mcq = 0
+    correct_mcq = 0
+    for q in test.questions.filter(type="mcq"):
+        total_mcq += 1
+        correct_opt = q.options.filter(is_correct=True).first()
+        if not correct_opt:
+            continue
+        if answers.get(q.qid) == correct_opt.option_id:
+            correct_mcq += 1
+    subjective_scores = {}
+    for q in test.questions.filter(type="subjective"):
+        subjective_scores[q.qid] = 0 if len(answers.get(q.qid, "")) < 3 else 70
+    return round((correct_mcq / total_mcq) * 100, 2) if total_mcq else 0, subjective_scores
+
+
+def main():
+    teardown = setup()
+    try:
+        from assessment import grading
+        from assessment.models import Company
+
+        company = Company.objects.create(id="bench", name="Bench")
+        for n in (20, 100, 500):
+            test, answers = seed_test(n, company)
+            key = grading.answer_key(test.pk)
+            assert grading.grade(key, answers)[:2] == legacy_grade(test, answers)
+
+            legacy = measure(lambda: legacy_grade(test, answers), repeat=20)
+            compiled = measure(lambda: grading.grade(grading.answer_key(test.pk), answers), repeat=200)
+            print(f"{n:4d} questions  legacy   {fmt(legacy)}")
+            print(f"{n:4d} questions  compiled {fmt(compiled)}  ({legacy['p50'] / compiled['p50']:.0f}x)")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
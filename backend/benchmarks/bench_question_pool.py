@@ -0,0 +1,76 @@
+"""
+Generated question pool API over a seeded pool: the legacy unpaginated
+response vs keyset pages and full-text search (FTS5 on SQLite).
+Run: python -m benchmarks.bench_question_pool [pool_size]
+"""
+import random
+import sys
+
+from benchmarks import setup, measure, fmt
+
+TOPICS = ["Python", "Java", "JavaScript", "SQL", "Go"]
+WORDS = """
+decorator generator iterator closure lambda list tuple dict class object inheritance
+polymorphism interface method function variable scope thread process lock async await
+promise callback exception garbage memory stream buffer socket request cache index query
+transaction pointer slice channel goroutine closure prototype hoisting join normalization
+""".split()
+
+
+def seed(n, rng):
+    from assessment.models import GeneratedQuestion
+
+    batch = []
+    for i in range(n):
+        batch.append(GeneratedQuestion(
+            topic=TOPICS[i % len(TOPICS)],
+            question_text="Explain " + " ".join(rng.sample(WORDS, 5)) + f" ({i})",
+            question_type="mcq",
+        ))
+        if len(batch) == 5000:
+            GeneratedQuestion.objects.bulk_create(batch)
+            batch = []
+    GeneratedQuestion.objects.bulk_create(batch)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    teardown = setup()
+    try:
+        from django.test import Client
+        from assessment.models import GeneratedQuestion
+
+        seed(n, random.Random(3))
+        print(f"Seeded {n} generated questions")
+        client = Client()
+        url = "/api/hr/generated-questions/"
+
+        def legacy():
+            # what the endpoint used to do: every unselected row in one response
+            return [
+                (q.id, q.topic, q.question_text, q.question_type, q.options, q.correct_answer,
+                 q.difficulty, q.generated_at.isoformat())
+                for q in GeneratedQuestion.objects.filter(is_selected=False).order_by("-generated_at")
+            ]
+
+        first = client.get(url, {"topic": "Python", "limit": 50}).json()
+        deep_cursor = first["next_cursor"]
+        for _ in range(20):
+            deep_cursor = client.get(url, {"topic": "Python", "limit": 500, "cursor": deep_cursor}).json()["next_cursor"]
+
+        cases = [
+            ("legacy, whole pool    ", legacy, 3),
+            ("first page, topic     ", lambda: client.get(url, {"topic": "Python", "limit": 50}), 50),
+            ("page after 10k rows   ", lambda: client.get(url, {"topic": "Python", "limit": 50, "cursor": deep_cursor}), 50),
+            ("search 'goroutine'    ", lambda: client.get(url, {"q": "goroutine", "limit": 50}), 50),
+            ("search '(12345)'      ", lambda: client.get(url, {"q": "12345"}), 50),
+            ("icontains '(12345)'   ", lambda: list(GeneratedQuestion.objects.filter(question_text__icontains="(12345)")), 10),
+        ]
+        for label, fn, repeat in cases:
+            print(f"{label}  {fmt(measure(fn, repeat=repeat, warmup=1))}")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Near-duplicate lookups against a growing generated-question pool: the LSH
+band index in assessment.similarity vs comparing against every question.
+Run: python -m benchmarks.bench_similarity [pool sizes...]
+"""
+import random
+import sys
+
+from benchmarks import setup, measure, fmt
+
+WORDS = """
+python java javascript decorator generator iterator closure lambda list tuple dict set
+class object inheritance polymorphism interface abstract method function variable scope
+thread process lock mutex async await promise callback exception error garbage memory
+stream buffer file socket http request response cache index query database transaction
+""".split()
+# plus a long tail of made-up identifiers, so the vocabulary is closer to a real pool's
+_vocab_rng = random.Random(0)
+WORDS += ["".join(_vocab_rng.choices("abcdefghijklmnopqrstuvwxyz", k=_vocab_rng.randint(4, 9))) for _ in range(5000)]
+
+
+def synthetic_question(rng):
+    return "What is the " + " ".join(rng.sample(WORDS, rng.randint(4, 7))) + "?"
+
+
+def seed(pool_size, rng):
+    from assessment import similarity
+    from assessment.models import GeneratedQuestion
+
+    existing = GeneratedQuestion.objects.count()
+    batch = []
+    for _ in range(pool_size - existing):
+        batch.append(GeneratedQuestion(topic="Bench", question_text=synthetic_question(rng), question_type="mcq"))
+        if len(batch) == 5000:
+            similarity.index(GeneratedQuestion.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        similarity.index(GeneratedQuestion.objects.bulk_create(batch))
+
+
+def linear_scan(texts):
+    from assessment import similarity
+    from assessment.models import GeneratedQuestion
+
+    pool = [(pk, similarity.tokens(t)) for pk, t in GeneratedQuestion.objects.values_list("pk", "question_text")]
+    results = []
+    for text in texts:
+        token_set = similarity.tokens(text)
+        best = max(((similarity.jaccard(token_set, t), pk) for pk, t in pool), default=(0, None))
+        results.append(best)
+    return results
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000]
+    rng = random.Random(1)
+
+    teardown = setup()
+    try:
+        from assessment import similarity
+
+        for size in sizes:
+            seed(size, rng)
+            texts = [synthetic_question(rng) for _ in range(10)]
+            indexed = measure(lambda: similarity.find_duplicates(texts), repeat=20)
+            scan = measure(lambda: linear_scan(texts), repeat=3, warmup=1)
+            print(f"{size:7d} questions  LSH index {fmt(indexed)}")
+            print(f"{size:7d} questions  full scan {fmt(scan)}")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Write throughput under concurrent candidates for each storage profile (see
+DB_PROFILE in exam_backend/settings.py).  Every candidate is a thread that
+starts a session, logs proctoring events one write at a time and submits,
+all through the API; the benchmark reports writes/sec, request latency and
+how many requests failed with a locked database.
+Run: python -m benchmarks.bench_storage [candidates] [events per candidate] [profiles...]
+     (default profiles: sqlite-basic sqlite; postgres needs EXAM_DB_* set)
+
+SQLite profiles run against a scratch file (WAL needs a real file); each
+profile runs in its own interpreter because settings are read once.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import setup
+
+
+def candidate(test, answers, events, latencies, errors, lock):
+    from django.db import OperationalError, connection
+    from django.test import Client
+
+    client = Client()
+
+    def call(path, body):
+        start = time.perf_counter()
+        try:
+            response = client.post(path, body, content_type="application/json")
+            ok = response.status_code < 500
+        except OperationalError:  # "database is locked" and friends
+            response, ok = None, False
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors[0] += not ok
+        return response
+
+    try:
+        response = call("/api/start-session/", {"test_id": test.test_id, "username": f"c{threading.get_ident()}"})
+        if response is None:
+            return
+        session_id = response.json()["session_id"]
+        for i in range(events):
+            call("/api/log/", {"session_id": session_id, "event": f"focus_lost_{i % 3}"})
+        call("/api/submit/", {"session_id": session_id, "answers": answers})
+    finally:
+        connection.close()
+
+
+def run_profile(profile, candidates, events):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "exam_backend.settings")
+    from django.conf import settings
+    from django.test import override_settings
+
+    scratch = tempfile.TemporaryDirectory()
+    if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+        settings.DATABASES["default"]["TEST"] = {"NAME": os.path.join(scratch.name, "bench.sqlite3")}
+    teardown = setup()
+    try:
+        from django.db import connection
+        from assessment.models import Company
+        from benchmarks.bench_grader import seed_test
+
+        test, answers = seed_test(20, Company.objects.create(id="bench", name="Bench"))
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal = cursor.fetchone()[0]
+        else:
+            journal = connection.vendor
+        connection.close()
+
+        latencies, errors, lock = [], [0], threading.Lock()
+        # every log and submit writes inline, so the database sees each candidate's writes
+        with override_settings(PROCTOR_EVENT_BUFFER={"ENABLED": False}, DEFERRED_GRADING={"ENABLED": False}):
+            threads = [
+                threading.Thread(target=candidate, args=(test, answers, events, latencies, errors, lock))
+                for _ in range(candidates)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        writes = len(latencies) - errors[0]
+        print(f"{profile:13s} ({journal:6s})  {candidates} candidates  "
+              f"{writes / elapsed:8.1f} writes/s  "
+              f"p50 {statistics.median(latencies):7.2f} ms  "
+              f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:8.2f} ms  "
+              f"failed {errors[0]}/{len(latencies)}")
+    finally:
+        teardown()
+        scratch.cleanup()
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--profile":
+        run_profile(os.environ["EXAM_DB_PROFILE"], int(args[1]), int(args[2]))
+        return
+    candidates = int(args[0]) if len(args) > 0 else 50
+    events = int(args[1]) if len(args) > 1 else 20
+    profiles = args[2:] or ["sqlite-basic", "sqlite"]
+    for profile in profiles:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_storage", "--profile", str(candidates), str(events)],
+            env={**os.environ, "EXAM_DB_PROFILE": profile}, check=False,
+        )
+
+
+if __name__ == "__main__":
+    main()
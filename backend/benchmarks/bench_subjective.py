@@ -0,0 +1,57 @@
+"""
+Subjective grading of a whole cohort's answers to one question: answer by
+answer (the pure-Python path, as grader.js does it) vs one batched NumPy
+pass in assessment.subjective.
+Run: python -m benchmarks.bench_subjective [cohort_size]
+"""
+import random
+import sys
+
+from benchmarks import setup, measure, fmt
+
+REFERENCE = (
+    "GIL is a mutex that protects access to Python objects, preventing multiple threads from "
+    "executing Python bytecodes at once. It can limit performance in CPU-bound multi-threaded "
+    "programs but doesn't affect I/O-bound operations."
+)
+
+
+def cohort(n, rng):
+    words = REFERENCE.lower().replace(",", "").replace(".", "").split() + [
+        "honestly", "not", "sure", "maybe", "asyncio", "multiprocessing", "release", "global", "interpreter",
+    ]
+    return [" ".join(rng.choices(words, k=rng.randint(5, 60))) for _ in range(n)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    teardown = setup()
+    try:
+        from assessment import subjective
+
+        if not subjective.NUMPY_AVAILABLE:
+            print("NumPy is not installed; only the pure-Python path is available")
+            return
+        answers = cohort(n, random.Random(11))
+        reference = subjective._build_reference([REFERENCE])
+
+        def one_by_one():
+            subjective.NUMPY_AVAILABLE = False
+            python_reference = subjective._build_reference([REFERENCE])
+            try:
+                return [subjective.score_against(python_reference, [a])[0] for a in answers]
+            finally:
+                subjective.NUMPY_AVAILABLE = True
+
+        def batched():
+            return subjective.score_against(reference, answers)
+
+        assert one_by_one() == batched()
+        print(f"{n} answers  one by one {fmt(measure(one_by_one, repeat=5, warmup=1))}")
+        print(f"{n} answers  batched    {fmt(measure(batched, repeat=20, warmup=2))}")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Exam-day load test: a cohort of candidates against a local HTTP server.
+
+Every candidate follows the frontend's traffic shape: start a session, fetch
+the test, upload queued proctoring events every EVENT_INTERVAL seconds (the
+EVENT_FLUSH_INTERVAL batches in ExamPage.jsx) and a webcam frame every
+SNAPSHOT_INTERVAL seconds (startAutoSnapshots in ExamContext.jsx), then
+submit when the exam ends, all at the same deadline.  Arrivals are spread
+over the first event interval.
+
+The server is Django's threaded WSGI server (the one runserver uses) on a
+free local port, backed by a scratch SQLite file seeded with a synthetic
+test; requests go over real sockets, one connection each.  The report gives
+per-endpoint throughput, error rate and latency percentiles.  With a stored
+baseline (see --save-baseline) the run fails when an endpoint is slower,
+fails more often or serves less than the baseline allows.
+
+Run: python -m benchmarks.loadtest [--candidates N] [--duration SECONDS]
+         [--baseline PATH] [--save-baseline] [--tolerance FRACTION]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from benchmarks import setup
+
+Scenario = namedtuple("Scenario", ["candidates", "duration", "event_interval", "snapshot_interval"])
+
+DEFAULT_SCENARIO = Scenario(candidates=100, duration=60.0, event_interval=5.0, snapshot_interval=20.0)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "loadtest_baseline.json")
+
+ENDPOINTS = ("start_session", "get_test", "log_events_batch", "upload_snapshot", "submit_test")
+EVENT_TYPES = ("tab_switch", "face_not_detected", "multiple_faces", "noise_detected", "copy_attempt")
+TIMEOUT = 60  # seconds a request may take before it counts as failed
+
+# Regression limits: latency may grow by TOLERANCE plus SLACK_MS, throughput
+# may drop by TOLERANCE, and the error rate may rise by ERROR_RATE_SLACK.
+TOLERANCE = 0.5
+SLACK_MS = 10.0
+ERROR_RATE_SLACK = 0.01
+
+
+@contextmanager
+def local_server(threaded=True):
+    """
+    Serve the Django app on a free local port for the duration of the block;
+    yields the base URL.  threaded=False handles one request at a time, for
+    databases that cannot take concurrent writers (the in-memory test DB).
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadedWSGIServer):
+        request_queue_size = 1024  # the whole cohort may connect at once
+
+        def process_request(self, request, client_address):
+            if threaded:
+                return super().process_request(request, client_address)
+            self.process_request_thread(request, client_address)
+
+    server = Server(("127.0.0.1", 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def seed():
+    """The synthetic fixture: one company and a 20-question test. Returns (test_id, answers)."""
+    from assessment.models import Company
+    from benchmarks.bench_grader import seed_test
+
+    test, answers = seed_test(20, Company.objects.create(id="loadtest", name="Load test"))
+    return test.test_id, answers
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.statuses = {name: Counter() for name in ENDPOINTS}
+
+    def add(self, endpoint, ms, status):
+        with self._lock:
+            self.latencies[endpoint].append(ms)
+            self.statuses[endpoint][status] += 1
+
+
+class Client:
+    """One candidate's HTTP client; every request is timed into the recorder."""
+
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port
+        self.recorder = recorder
+
+    def call(self, endpoint, method, path, body=None, content_type=None):
+        """Returns (status, body); status 0 means the request never got a response."""
+        headers = {"Connection": "close"}
+        if content_type:
+            headers["Content-Type"] = content_type
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=TIMEOUT)
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            status, data = response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            status, data = 0, b""
+        finally:
+            connection.close()
+        self.recorder.add(endpoint, (time.perf_counter() - start) * 1000, status)
+        return status, data
+
+    def post_json(self, endpoint, path, payload):
+        return self.call(endpoint, "POST", path, json.dumps(payload).encode(), "application/json")
+
+    def post_image(self, endpoint, path, session_id, image):
+        boundary = uuid.uuid4().hex
+        body = b"".join([
+            f'--{boundary}\r\nContent-Disposition: form-data; name="session_id"\r\n\r\n{session_id}\r\n'.encode(),
+            f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="snapshot.jpg"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode(),
+            image,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        return self.call(endpoint, "POST", path, body, f"multipart/form-data; boundary={boundary}")
+
+
+def candidate(client, scenario, test_id, answers, frames, arrive_at, deadline, rng):
+    time.sleep(max(0.0, arrive_at - time.monotonic()))
+    status, body = client.post_json("start_session", "/api/start-session/",
+                                    {"test_id": test_id, "username": f"candidate-{uuid.uuid4().hex[:8]}"})
+    if status != 200:
+        return
+    session_id = json.loads(body)["session_id"]
+    client.call("get_test", "GET", f"/api/test/{test_id}/")
+
+    now = time.monotonic()
+    next_events, next_snapshot = now + scenario.event_interval, now + scenario.snapshot_interval
+    frame = 0
+    while min(next_events, next_snapshot) < deadline:
+        due = min(next_events, next_snapshot)
+        time.sleep(max(0.0, due - time.monotonic()))
+        if due == next_events:
+            events = [{"event": rng.choice(EVENT_TYPES), "client_ts": int(time.time() * 1000)}
+                      for _ in range(rng.randint(1, 3))]
+            client.post_json("log_events_batch", "/api/log/batch/", {"session_id": session_id, "events": events})
+            next_events += scenario.event_interval
+        else:
+            client.post_image("upload_snapshot", "/api/upload-snapshot/", session_id, frames[frame % len(frames)])
+            frame += 1
+            next_snapshot += scenario.snapshot_interval
+
+    time.sleep(max(0.0, deadline - time.monotonic()))
+    client.post_json("submit_test", "/api/submit/", {"session_id": session_id, "answers": answers})
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for name in ENDPOINTS:
+        samples = sorted(recorder.latencies[name])
+        if not samples:
+            continue
+        statuses = recorder.statuses[name]
+        errors = sum(n for status, n in statuses.items() if status == 0 or status >= 400)
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples),
+            "throughput": len(samples) / elapsed,
+            "p50": statistics.median(samples),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        }
+    return endpoints
+
+
+def run(base_url, scenario, test_id, answers, seed=0):
+    """Play scenario against base_url. Returns the report: scenario, elapsed seconds and per-endpoint stats."""
+    from benchmarks.bench_async import make_frames
+
+    rng = random.Random(seed)
+    frames = make_frames(4, seed)
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + scenario.duration
+    ramp = min(scenario.event_interval, scenario.duration / 4)
+    threads = [
+        threading.Thread(
+            target=candidate,
+            args=(Client(base_url, recorder), scenario, test_id, answers, frames,
+                  start + rng.random() * ramp, deadline, random.Random(rng.random())),
+            daemon=True,
+        )
+        for _ in range(scenario.candidates)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return {"scenario": scenario._asdict(), "elapsed": elapsed, "endpoints": summarize(recorder, elapsed)}
+
+
+def compare(report, baseline, tolerance=TOLERANCE, slack_ms=SLACK_MS):
+    """Regressions of report against baseline, as readable lines; empty when within limits."""
+    if report["scenario"] != baseline["scenario"]:
+        return [f"scenario {report['scenario']} differs from the baseline's {baseline['scenario']}"]
+    regressions = []
+    for name, expected in baseline["endpoints"].items():
+        actual = report["endpoints"].get(name)
+        if actual is None:
+            regressions.append(f"{name}: no requests (baseline had {expected['requests']})")
+            continue
+        for key in ("p50", "p95"):
+            limit = expected[key] * (1 + tolerance) + slack_ms
+            if actual[key] > limit:
+                regressions.append(f"{name}: {key} {actual[key]:.1f} ms > {limit:.1f} ms "
+                                   f"(baseline {expected[key]:.1f} ms)")
+        if actual["error_rate"] > expected["error_rate"] + ERROR_RATE_SLACK:
+            regressions.append(f"{name}: error rate {actual['error_rate']:.2%} "
+                               f"(baseline {expected['error_rate']:.2%})")
+        if actual["throughput"] < expected["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: {actual['throughput']:.1f} req/s "
+                               f"(baseline {expected['throughput']:.1f} req/s)")
+    return regressions
+
+
+def print_report(report):
+    scenario = Scenario(**report["scenario"])
+    print(f"{scenario.candidates} candidates, {scenario.duration:.0f} s exam, events every "
+          f"{scenario.event_interval:.0f} s, snapshots every {scenario.snapshot_interval:.0f} s "
+          f"({report['elapsed']:.1f} s)")
+    print(f"{'endpoint':18s} {'requests':>8s} {'errors':>7s} {'req/s':>8s} "
+          f"{'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:18s} {stats['requests']:8d} {stats['error_rate']:7.1%} {stats['throughput']:8.1f} "
+              f"{stats['p50']:9.2f} {stats['p95']:9.2f} {stats['p99']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exam-day load test against a local server.")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_SCENARIO.candidates)
+    parser.add_argument("--duration", type=float, default=DEFAULT_SCENARIO.duration, help="exam length in seconds")
+    parser.add_argument("--event-interval", type=float, default=DEFAULT_SCENARIO.event_interval)
+    parser.add_argument("--snapshot-interval", type=float, default=DEFAULT_SCENARIO.snapshot_interval)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="stored results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed latency growth / throughput drop, as a fraction")
+    args = parser.parse_args()
+    scenario = Scenario(args.candidates, args.duration, args.event_interval, args.snapshot_interval)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "exam_backend.settings")
+    from django.conf import settings
+    from django.test import override_settings
+
+    # server threads, the event writer and the grading worker share one database; a file, not shared-cache memory
+    scratch = tempfile.TemporaryDirectory()
+    if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+        settings.DATABASES["default"]["TEST"] = {"NAME": os.path.join(scratch.name, "loadtest.sqlite3")}
+    teardown = setup()
+    try:
+        test_id, answers = seed()
+        with override_settings(MEDIA_ROOT=os.path.join(scratch.name, "media")), local_server() as base_url:
+            report = run(base_url, scenario, test_id, answers)
+    finally:
+        teardown()
+        scratch.cleanup()
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to store one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(report, json.load(f), args.tolerance)
+    if regressions:
+        print("REGRESSIONS against the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("within the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 ASGI config for exam_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+It serves only the candidate endpoints, with settings_asgi.py; see
+ASYNC_SERVING.md.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +13,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'exam_backend.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'exam_backend.settings_asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,20 @@
+"""
+URLconf of the ASGI process (settings_asgi.py): the native async candidate
+views plus the operations endpoints.  Everything else is served over WSGI
+by exam_backend/urls.py.
+"""
+from django.urls import path
+from assessment import async_views, views
+
+urlpatterns = [
+    path("api/start-session/", async_views.start_session),
+    path("api/submit/", async_views.submit_test),
+    path("api/log/", async_views.log_event),
+    path("api/log/batch/", async_views.log_events_batch),
+    path("api/upload-snapshot/", async_views.upload_snapshot),
+
+    # Operations (per process, so this one is scraped and profiled separately)
+    path("metrics", views.prometheus_metrics),
+    path("api/profiles/", views.list_profiles),
+    path("api/profiles/<str:profile_id>/", views.download_profile),
+]
@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = "replace-this-in-production"
@@ -22,6 +24,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "assessment.middleware.RequestMetricsMiddleware",
+    "assessment.middleware.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -50,12 +54,60 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "exam_backend.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Storage profile, chosen with EXAM_DB_PROFILE:
+#   sqlite        (default) SQLite tuned for concurrent writers: WAL journal,
+#                 synchronous=NORMAL, memory-mapped reads, and write
+#                 transactions that take the lock up front (BEGIN IMMEDIATE)
+#                 and wait up to EXAM_SQLITE_TIMEOUT seconds for it instead
+#                 of failing with "database is locked".
+#   sqlite-basic  SQLite with the library defaults (rollback journal, lock
+#                 taken on first write), for comparison.
+#   postgres      PostgreSQL via psycopg, configured from EXAM_DB_NAME,
+#                 EXAM_DB_USER, EXAM_DB_PASSWORD, EXAM_DB_HOST, EXAM_DB_PORT.
+# Connections are kept open for EXAM_DB_CONN_MAX_AGE seconds and checked
+# before reuse, so a request does not pay for a new connection each time.
+# Compare profiles with: python -m benchmarks.bench_storage
+DB_PROFILE = os.environ.get("EXAM_DB_PROFILE", "sqlite")
+_conn_max_age = int(os.environ.get("EXAM_DB_CONN_MAX_AGE", 600))
+
+if DB_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("EXAM_DB_NAME", "exam_portal"),
+            "USER": os.environ.get("EXAM_DB_USER", "exam_portal"),
+            "PASSWORD": os.environ.get("EXAM_DB_PASSWORD", ""),
+            "HOST": os.environ.get("EXAM_DB_HOST", "localhost"),
+            "PORT": os.environ.get("EXAM_DB_PORT", "5432"),
+            "CONN_MAX_AGE": _conn_max_age,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"connect_timeout": 5},
+        }
     }
-}
+elif DB_PROFILE in ("sqlite", "sqlite-basic"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("EXAM_SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        }
+    }
+    if DB_PROFILE == "sqlite":
+        DATABASES["default"].update({
+            "CONN_MAX_AGE": _conn_max_age,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "timeout": float(os.environ.get("EXAM_SQLITE_TIMEOUT", 20)),
+                "transaction_mode": "IMMEDIATE",
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    "PRAGMA mmap_size=134217728;"
+                    "PRAGMA temp_store=MEMORY;"
+                ),
+            },
+        })
+else:
+    raise ImproperlyConfigured(f"Unknown EXAM_DB_PROFILE {DB_PROFILE!r}; use sqlite, sqlite-basic or postgres")
 
 AUTH_PASSWORD_VALIDATORS = []
 LANGUAGE_CODE = "en-us"
@@ -69,4 +121,110 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Stops the background workers before the test databases are dropped
+TEST_RUNNER = "assessment.test_runner.TestRunner"
+
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Proctoring events are queued in-process and written in batches
+# (see assessment/ingest.py). Set ENABLED to False to write each event inline.
+PROCTOR_EVENT_BUFFER = {
+    "ENABLED": True,
+    "MAX_QUEUE": 10000,
+    "BATCH_SIZE": 500,
+    "FLUSH_INTERVAL": 1.0,
+}
+
+# Webcam frames are downscaled, re-encoded and de-duplicated before storage
+# (see assessment/snapshots.py).
+SNAPSHOT_STORAGE = {
+    "MAX_WIDTH": 640,
+    "MAX_HEIGHT": 480,
+    "JPEG_QUALITY": 70,
+    "DUPLICATE_DISTANCE": 4,
+}
+
+# Active exam session metadata cached per process (see assessment/session_cache.py).
+SESSION_CACHE = {
+    "MAX_ENTRIES": 10000,
+    "TTL": 300,
+}
+
+# AI question generation is split into chunks requested concurrently
+# (see assessment/ai_service.py).
+AI_GENERATION = {
+    "MODEL": "gpt-3.5-turbo",
+    "CHUNK_SIZE": 10,
+    "MAX_WORKERS": 4,
+    "TIMEOUT": 60,
+    "RETRIES": 2,
+    "STREAM": True,
+}
+
+# Generated question sets are cached in the database by prompt parameters and
+# model (see assessment/generation_cache.py). Pass fresh=true to bypass.
+GENERATION_CACHE = {
+    "ENABLED": True,
+    "TTL": 7 * 24 * 3600,
+    "MAX_ENTRIES": 500,
+}
+
+# Background question generation jobs (see assessment/jobs.py). Keep
+# STALE_AFTER above the longest a chunk can take with retries
+# (AI_GENERATION TIMEOUT x (RETRIES + 1), plus backoff), or a live job can be
+# re-run elsewhere.
+GENERATION_JOBS = {
+    "WORKERS": 2,
+    "MAX_ACTIVE_PER_USER": 2,
+    "MAX_COUNT": 200,
+    "STALE_AFTER": 300,
+    "RECOVER_INTERVAL": 60,
+}
+
+# Near-duplicate detection for generated questions (see assessment/similarity.py).
+# ACTION is "flag" (store with duplicate_of set) or "drop".
+NEAR_DUPLICATES = {
+    "THRESHOLD": 0.6,
+    "ACTION": "flag",
+}
+
+# Subjective answers are graded after submission, in batches (see
+# assessment/grading_queue.py). PROCESSES > 0 scores on a process pool;
+# ENABLED = False grades them inline in the submit request again, and
+# WORKER = False leaves grading to `manage.py grade_pending`.
+DEFERRED_GRADING = {
+    "ENABLED": True,
+    "WORKER": True,
+    "BATCH_SIZE": 200,
+    "PROCESSES": 0,
+    "POLL_INTERVAL": 5.0,
+}
+
+# Compiled answer keys (assessment/grading.py) are dropped when a test changes
+# in this process; TTL bounds how long other worker processes keep grading
+# against a key cached before the change.
+ANSWER_KEYS = {
+    "TTL": 60,
+}
+
+# Per-view request metrics (wall time, query count and time, response size,
+# status) served in the Prometheus text format at /metrics (see
+# assessment/metrics.py). /metrics requires "Authorization: Bearer <TOKEN>" and
+# stays closed until TOKEN is set; set SLOW_REQUEST_MS to log slower requests with their SQL to the
+# "assessment.slow_requests" logger.
+REQUEST_METRICS = {
+    "ENABLED": True,
+    "TOKEN": os.environ.get("EXAM_METRICS_TOKEN", ""),
+    "SLOW_REQUEST_MS": None,
+}
+
+# On-demand request profiling (see assessment/profiling.py). With TOKEN set, a
+# request sent with "X-Profile: cprofile" or "X-Profile: sampling" and
+# "X-Profile-Token: <TOKEN>" is profiled; SAMPLE_RATE profiles that fraction
+# of all requests. Recent profiles are listed at /api/profiles/ (same token).
+PROFILING = {
+    "TOKEN": os.environ.get("EXAM_PROFILE_TOKEN", ""),
+    "SAMPLE_RATE": float(os.environ.get("EXAM_PROFILE_SAMPLE_RATE", 0)),
+    "MODE": "sampling",
+    "KEEP": 50,
+}
@@ -0,0 +1,25 @@
+"""
+Settings for the ASGI process that serves the candidate endpoints (see
+ASYNC_SERVING.md).  Everything else, including the streaming HR endpoints,
+stays on the WSGI server: Django buffers a sync streaming response in full
+under ASGI.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+ROOT_URLCONF = "exam_backend.asgi_urls"
+
+# Only async-capable middleware; under ASGI every MiddlewareMixin one costs
+# two thread hops per request, more than the async views save on short requests
+MIDDLEWARE = [
+    "assessment.middleware.RequestMetricsMiddleware",
+    "assessment.middleware.ProfilingMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+]
+
+# The admin, which needs the session, auth and message middleware, is served over WSGI
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
+
+# The ORM runs on a thread per request under ASGI; a connection kept open
+# for reuse would be stranded on that thread when the request ends
+DATABASES = {alias: {**config, "CONN_MAX_AGE": 0} for alias, config in DATABASES.items()}
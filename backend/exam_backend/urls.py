@@ -14,17 +14,27 @@ urlpatterns = [
     path("api/start-session/", views.start_session),
     path("api/submit/", views.submit_test),
     path("api/log/", views.log_event),
+    path("api/log/batch/", views.log_events_batch),
     path("api/upload-snapshot/", views.upload_snapshot),
     
     # HR API endpoints
     path("api/hr/login/", views.hr_login),
     path("api/hr/generate-questions/", views.generate_ai_questions),
+    path("api/hr/generation-jobs/", views.submit_generation_job),
+    path("api/hr/generation-jobs/<str:job_id>/", views.get_generation_job),
+    path("api/hr/generation-jobs/<str:job_id>/cancel/", views.cancel_generation_job),
     path("api/hr/generated-questions/", views.get_generated_questions),
     path("api/hr/select-questions/", views.select_questions_for_test),
     path("api/hr/delete-questions/", views.delete_generated_questions),
+    path("api/hr/dedupe-questions/", views.dedupe_generated_questions),
     path("api/hr/analytics/", views.get_test_analytics),
     path("api/hr/question-performance/<str:test_id>/", views.get_question_performance),
     path("api/hr/candidates/<str:test_id>/", views.get_candidates),
+
+    # Operations
+    path("metrics", views.prometheus_metrics),
+    path("api/profiles/", views.list_profiles),
+    path("api/profiles/<str:profile_id>/", views.download_profile),
 ]
 
 if settings.DEBUG:
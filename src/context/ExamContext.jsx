@@ -1,7 +1,8 @@
 import React, { createContext, useEffect, useState, useRef, useCallback } from "react";
 import { COMPANIES } from "../data/tests";
 import { scoreMCQ, scoreSubjective } from "../utils/grader";
-import { api } from "../utils/api";
+import { api, examAPI } from "../utils/api";
+import { useAuth } from "./AuthContext";
 
 export const ExamContext = createContext(null);
 
@@ -33,8 +34,7 @@ export default function ExamProvider({ children }) {
                 type: q.type,
                 options: q.options.map(opt => ({
                   id: opt.option_id,
-                  text: opt.text,
-                  is_correct: opt.is_correct
+                  text: opt.text
                 }))
               })),
               company: { id: company.id, name: company.name },
@@ -86,6 +86,9 @@ export default function ExamProvider({ children }) {
   const [running, setRunning] = useState(false);
   const [remaining, setRemaining] = useState(0);
   const [sessionLog, setSessionLog] = useState([]);
+  // Backend session for HR-created tests, set once /api/start-session/ answers
+  const [sessionId, setSessionId] = useState(null);
+  const { user } = useAuth();
   const webcamStreamRef = useRef(null);
   const snapshotIntervalRef = useRef(null);
   const [proctorState, setProctorState] = useState({ 
@@ -117,11 +120,12 @@ export default function ExamProvider({ children }) {
   useEffect(() => {
     if (!selectedTestId) return;
     
-    // Try to find test in companies first
+    // Built-in tests come with their questions; HR-created tests are always
+    // loaded through get_test, which serves the answer-free exam bundle
     const comp = companies.find(c => c.id === currentCompanyId);
     if (comp) {
       const t = comp.tests.find(x => x.id === selectedTestId);
-      if (t) {
+      if (t && !t.isHRCreated) {
         setTest(t);
         setAnswers({});
         setMarksForReview({});
@@ -151,7 +155,7 @@ export default function ExamProvider({ children }) {
       }
     }
     
-    // If not found, fetch from API (for HR-created tests)
+    // HR-created (or unknown) tests come from the API
     const fetchTest = async () => {
       try {
         const response = await api.get(`/api/test/${selectedTestId}/`);
@@ -166,11 +170,11 @@ export default function ExamProvider({ children }) {
             type: q.type,
             options: q.options ? q.options.map(opt => ({
               id: opt.option_id,
-              text: opt.text,
-              is_correct: opt.is_correct
+              text: opt.text
             })) : []
           })),
-          company: comp || { id: currentCompanyId, name: "Company" }
+          company: comp ? { id: comp.id, name: comp.name } : { id: currentCompanyId, name: "Company" },
+          isHRCreated: true
         };
         setTest(apiTest);
         setAnswers({});
@@ -544,6 +548,12 @@ export default function ExamProvider({ children }) {
   function startTest(videoEl) {
     if (!test) return;
     setRunning(true);
+    setSessionId(null);
+    if (test.isHRCreated) {
+      examAPI.startSession(test.id, user?.username || "candidate")
+        .then(res => setSessionId(res.data.session_id))
+        .catch(err => console.log("Backend session not started:", err.message));
+    }
     setSessionLog(l => [...l, { t: Date.now(), type: "start" }]);
     startCamera(videoEl).then(stream => {
       if (stream) startAutoSnapshots(videoEl);
@@ -584,7 +594,20 @@ export default function ExamProvider({ children }) {
         console.log("Fullscreen exit error:", e);
       }
       
-      const mcq = scoreMCQ(test.questions, answers);
+      let mcq = scoreMCQ(test.questions, answers);
+      
+      // Submit to the backend session (don't fail if backend is down). HR-created
+      // tests are served without answers, so their MCQ score comes from the server.
+      if (sessionId) {
+        try {
+          const { data } = await examAPI.submitExam(sessionId, answers);
+          if (test.isHRCreated && data.mcq_score != null) {
+            mcq = { ...mcq, correct: Math.round(data.mcq_score * mcq.total / 100), percent: data.mcq_score };
+          }
+        } catch (apiErr) {
+          console.log("Backend submission skipped:", apiErr.message);
+        }
+      }
       const subjectiveResults = {};
       const subjectiveQuestions = test.questions.filter(x => x.type === "subjective");
       
@@ -640,17 +663,6 @@ export default function ExamProvider({ children }) {
       // Save to localStorage
       localStorage.setItem("last_submission", JSON.stringify(result));
       
-      // Try to submit to backend (don't fail if backend is down)
-      try {
-        await api.post("/api/submit/", {
-          test_id: test.id,
-          answers: answers,
-          session_id: localStorage.getItem("session_id") || "local-session"
-        });
-      } catch (apiErr) {
-        console.log("Backend submission skipped:", apiErr.message);
-      }
-      
       // Update state to show results
       setSessionLog(l => [...l, { t: Date.now(), type: "submit" }]);
       setExamResult(result);
@@ -947,6 +959,7 @@ export default function ExamProvider({ children }) {
     endTest,
     captureSnapshotFromVideo,
     submitTest,
+    sessionId,
     sessionLog,
     proctorState,
     requestFullscreen,
@@ -1,9 +1,13 @@
 import React, { useContext, useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { ExamContext } from "../context/ExamContext";
+import { examAPI } from "../utils/api";
 import QuestionCard from "../components/QuestionCard";
 import { COMPANY_LOGOS } from "../data/tests";
 
+const EVENT_FLUSH_INTERVAL = 5000; // ms between proctoring event uploads
+const MAX_EVENT_BATCH = 200; // must match MAX_EVENT_BATCH in assessment/views.py
+
 function formatTime(sec) {
   const mm = String(Math.floor(sec / 60)).padStart(2, "0");
   const ss = String(sec % 60).padStart(2, "0");
@@ -423,6 +427,7 @@ export default function ExamPage() {
     startTest,
     captureSnapshotFromVideo,
     submitTest,
+    sessionId,
     proctorState,
     requestFullscreen,
     examResult,
@@ -437,6 +442,8 @@ export default function ExamPage() {
   const [warningType, setWarningType] = useState("");
   const [isSubmitting, setIsSubmitting] = useState(false);
   const lastWarningCount = useRef(0);
+  const pendingEvents = useRef([]);
+  const loggedViolations = useRef(0);
 
   useEffect(() => {
     if (!selectedTestId) {
@@ -456,6 +463,36 @@ export default function ExamPage() {
     }
   }, [proctorState.warningCount, proctorState.violations, running]);
 
+  // Queue proctoring events locally; they are uploaded in batches below
+  useEffect(() => {
+    const violations = proctorState.violations || [];
+    if (violations.length < loggedViolations.current) loggedViolations.current = 0;
+    for (const v of violations.slice(loggedViolations.current)) {
+      pendingEvents.current.push({ event: v.type, client_ts: v.time });
+    }
+    loggedViolations.current = violations.length;
+  }, [proctorState.violations]);
+
+  // Send queued proctoring events every few seconds instead of one request per event
+  useEffect(() => {
+    if (!running) return;
+
+    const flushEvents = () => {
+      if (!sessionId || pendingEvents.current.length === 0) return;
+      const batch = pendingEvents.current.splice(0, MAX_EVENT_BATCH);
+      examAPI.logEvents(sessionId, batch).catch(() => {
+        // Keep the events for the next attempt if the backend is unreachable
+        pendingEvents.current = [...batch, ...pendingEvents.current];
+      });
+    };
+
+    const eventFlushInterval = setInterval(flushEvents, EVENT_FLUSH_INTERVAL);
+    return () => {
+      clearInterval(eventFlushInterval);
+      flushEvents();
+    };
+  }, [running, sessionId]);
+
   // Continuous face detection during exam
   useEffect(() => {
     if (!running || !videoRef.current) return;
@@ -2,6 +2,8 @@ import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import { api } from "../utils/api";
 
+const JOB_POLL_INTERVAL = 1000; // ms between looks at a running generation job
+
 export default function HRDashboard() {
   const navigate = useNavigate();
   const [isLoggedIn, setIsLoggedIn] = useState(false);
@@ -89,6 +91,21 @@ export default function HRDashboard() {
     }
   };
 
+  const loadMoreCandidates = async () => {
+    if (!candidates?.next_cursor) return;
+    try {
+      const response = await api.get(`/api/hr/candidates/${candidates.test_id}/`, {
+        params: { cursor: candidates.next_cursor }
+      });
+      setCandidates(prev => ({
+        ...response.data,
+        candidates: [...prev.candidates, ...response.data.candidates]
+      }));
+    } catch (error) {
+      console.error("Error fetching more candidates:", error);
+    }
+  };
+
   const toggleCandidateSelection = (username) => {
     setSelectedCandidates(prev => {
       const newSelection = prev.includes(username)
@@ -149,22 +166,35 @@ export default function HRDashboard() {
     }
 
     setIsGenerating(true);
+    setGeneratedQuestions([]);
+    setSelectedQuestions([]);
     try {
-      const response = await api.post("/api/hr/generate-questions/", {
+      // Generation runs as a background job; poll it for the questions saved since the last look
+      const { data: job } = await api.post("/api/hr/generation-jobs/", {
         topic: selectedTopic,
         count: 50,
         difficulty: difficulty,
         user_id: hrUser?.id
       });
-
-      if (response.data.success) {
-        setGeneratedQuestions(response.data.questions);
-        setSelectedQuestions([]);
-        alert(`Generated ${response.data.count} questions!`);
+      let after = 0;
+      for (;;) {
+        const { data } = await api.get(`/api/hr/generation-jobs/${job.job_id}/`, { params: { after } });
+        if (data.questions.length) {
+          after = data.questions[data.questions.length - 1].id;
+          setGeneratedQuestions(prev => [...prev, ...data.questions]);
+        }
+        if (data.status === "failed") {
+          throw new Error(data.error || "Generation failed");
+        }
+        if (data.status !== "queued" && data.status !== "running") {
+          alert(`Generated ${data.generated} questions!`);
+          break;
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
       }
     } catch (error) {
       console.error("Error generating questions:", error);
-      alert(error.response?.data?.error || "Failed to generate questions");
+      alert(error.response?.data?.error || error.message || "Failed to generate questions");
     } finally {
       setIsGenerating(false);
     }
@@ -658,6 +688,9 @@ export default function HRDashboard() {
                     <div className="bg-green-50 rounded-xl p-4">
                       <div className="text-2xl font-bold text-green-600">{selectedTestAnalytics.completed}</div>
                       <div className="text-sm text-slate-600">Completed</div>
+                      {selectedTestAnalytics.grading_pending > 0 && (
+                        <div className="text-xs text-amber-600 mt-1">{selectedTestAnalytics.grading_pending} grading pending</div>
+                      )}
                     </div>
                     <div className="bg-purple-50 rounded-xl p-4">
                       <div className="text-2xl font-bold text-purple-600">{selectedTestAnalytics.average_score}%</div>
@@ -695,8 +728,14 @@ export default function HRDashboard() {
                     <div className="mb-6">
                       <div className="flex items-center justify-between mb-4">
                         <h3 className="font-bold text-slate-800">👥 Candidates ({candidates.total_candidates})</h3>
-                        <div className="text-sm text-slate-500">
-                          Selected: {selectedCandidates.length}
+                        <div className="flex items-center gap-3 text-sm text-slate-500">
+                          <span>Selected: {selectedCandidates.length}</span>
+                          <a
+                            href={`${api.defaults.baseURL}/api/hr/candidates/${candidates.test_id}/?export=csv`}
+                            className="text-purple-600 font-medium hover:underline"
+                          >
+                            ⬇️ Export CSV
+                          </a>
                         </div>
                       </div>
                       
@@ -737,11 +776,15 @@ export default function HRDashboard() {
                                   </div>
                                 </div>
                                 <div className="text-right">
-                                  <div className={`text-xl font-bold ${getScoreColor(candidate.overall_score)}`}>
-                                    {candidate.overall_score}%
-                                  </div>
+                                  {candidate.status === "grading_pending" ? (
+                                    <div className="text-sm font-semibold text-amber-600">Grading pending</div>
+                                  ) : (
+                                    <div className={`text-xl font-bold ${getScoreColor(candidate.overall_score)}`}>
+                                      {candidate.overall_score}%
+                                    </div>
+                                  )}
                                   <div className="text-xs text-slate-500">
-                                    MCQ: {candidate.mcq_score}% | Sub: {candidate.subjective_avg}%
+                                    MCQ: {candidate.mcq_score}% | Sub: {candidate.status === "grading_pending" ? "…" : `${candidate.subjective_avg}%`}
                                   </div>
                                   {candidate.time_taken && (
                                     <div className="text-xs text-slate-400 mt-1">
@@ -753,6 +796,14 @@ export default function HRDashboard() {
                             </div>
                           );
                         })}
+                        {candidates.next_cursor && (
+                          <button
+                            onClick={loadMoreCandidates}
+                            className="w-full py-2 text-sm font-medium text-purple-600 border border-purple-200 rounded-xl hover:bg-purple-50"
+                          >
+                            Load more ({candidates.candidates.length} of {candidates.total_candidates})
+                          </button>
+                        )}
                       </div>
                       
                       {selectedCandidates.length > 0 && (
@@ -57,6 +57,9 @@ export const examAPI = {
   
   // Log proctoring event
   logEvent: (sessionId, event) => api.post('/api/log/', { session_id: sessionId, event }),
+
+  // Log a batch of proctoring events: [{ event, client_ts }]
+  logEvents: (sessionId, events) => api.post('/api/log/batch/', { session_id: sessionId, events }),
   
   // Upload snapshot
   uploadSnapshot: (sessionId, imageData) => {